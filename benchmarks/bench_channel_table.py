@@ -0,0 +1,96 @@
+"""
+チャンネル一覧の並べ替え・絞り込み・ページ切り出しのベンチマーク
+
+チャンネル数を変えた合成データベースを作成し、1ページ分を表示するまでの時間を比較する。
+
+- snapshot: キャッシュ済みの最新スナップショット（DataFrame）に対して pandas で絞り込み・並べ替え・切り出し
+            （画面の操作ごとの処理。スナップショットは DB に変更があったときだけ作り直す）
+- sql:      最新行のシーククエリに WHERE / ORDER BY / LIMIT / OFFSET を付けて1ページ分だけ読む
+            （件数表示のための COUNT(*) を含む。操作ごとに実行する）
+- rebuild:  スナップショットの作り直し（DB に変更があったときだけ）
+
+絞り込み・並べ替えの対象は各チャンネルの最新行の値（と残高比率）のため、SQL でも
+インデックスは使えず、シーククエリで全チャンネルの最新行を求めてから絞り込むことになる。
+
+    python benchmarks/bench_channel_table.py --channels 1000 10000 50000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from synthetic_db import build_database
+from config import CACHE_CONFIG, STATS_CONFIG
+from database.connector import close_all_connections
+from tabs.node_info_tab import (LATEST_SNAPSHOT_SEEK_QUERY, filter_channels, get_latest_node_info,
+                                get_table_page, sort_and_filter)
+
+# 1ページ分を読む SQL（シーククエリの結果を絞り込み・並べ替える）
+PAGE_QUERY = f"""
+SELECT * FROM (
+    SELECT *, ROUND(100.0 * local_balance / capacity, 2) AS local_balance_ratio
+    FROM ({LATEST_SNAPSHOT_SEEK_QUERY})
+)
+WHERE active = 1 AND local_balance_ratio BETWEEN ? AND ?
+ORDER BY local_fee DESC
+LIMIT ? OFFSET ?
+"""
+
+COUNT_QUERY = f"""
+SELECT COUNT(*) FROM (
+    SELECT *, ROUND(100.0 * local_balance / capacity, 2) AS local_balance_ratio
+    FROM ({LATEST_SNAPSHOT_SEEK_QUERY})
+)
+WHERE active = 1 AND local_balance_ratio BETWEEN ? AND ?
+"""
+
+def best_of(repeat, func):
+    """func を repeat 回実行し、最短時間（ミリ秒）を返す"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Channel list filter/sort/page benchmark')
+    parser.add_argument('--channels', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--days', type=int, default=2)
+    parser.add_argument('--interval', type=int, default=60, help='Sampling interval in minutes')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    CACHE_CONFIG['column_store'] = False
+    STATS_CONFIG['enabled'] = False
+    print(f"{'channels':>9} {'snapshot (ms)':>14} {'sql (ms)':>10} {'rebuild (ms)':>13}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for channels in args.channels:
+            path = os.path.join(tmp_dir, f"bench_{channels}.db")
+            conn = build_database(path, channels, args.days, args.interval, index=True)
+
+            snapshot = get_latest_node_info(path)
+
+            def page_from_snapshot():
+                df = filter_channels(snapshot, True, 20, 80)
+                df = sort_and_filter(df, "ﾛｰｶﾙ手数料", True)
+                get_table_page(df, 2, args.page_size)
+
+            def page_from_sql():
+                conn.execute(PAGE_QUERY, (20, 80, args.page_size, args.page_size)).fetchall()
+                conn.execute(COUNT_QUERY, (20, 80)).fetchone()
+
+            snapshot_ms = best_of(args.repeat, page_from_snapshot)
+            sql_ms = best_of(args.repeat, page_from_sql)
+            rebuild_ms = best_of(args.repeat, lambda: get_latest_node_info(path))
+            conn.close()
+            close_all_connections()
+
+            print(f"{channels:>9} {snapshot_ms:>14.1f} {sql_ms:>10.1f} {rebuild_ms:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+チャートごとの図作成時間の内訳ベンチマーク
+
+同じデータから7つのチャートを作成し、チャートごとに次の時間を比較する。
+
+- plotly: go.Figure の作成（検証あり）と to_json によるシリアライズ
+- dict:   検証なしの dict の作成と JSON 化（CHART_CONFIG['figure_builder'] = 'dict'）
+
+あわせて、go.Figure の作成をスレッドプールで並列化した場合の合計時間も表示する
+（図の作成は GIL を保持する CPU 処理のため、並列化の効果は小さい）。
+
+    python benchmarks/bench_chart_build.py --rows 1000 100000 --max-points 500 5000
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_figure_payload import make_frame
+from tabs.time_series_tab import CHART_SPECS, create_custom_plot, create_custom_plot_data
+
+def best_of(fn, repeat):
+    """fn を repeat 回実行し、最短時間（ミリ秒）と最後の戻り値を返す"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def build_all_plotly(df, max_points):
+    """7つの go.Figure を作成して JSON にする"""
+    return [
+        create_custom_plot(df, "date", y_col, title, y_label, color, allow_negative, max_points).to_json()
+        for y_col, title, y_label, color, allow_negative in CHART_SPECS
+    ]
+
+def build_all_threaded(df, max_points, executor):
+    """7つの go.Figure をスレッドプールで並列に作成して JSON にする"""
+    futures = [
+        executor.submit(lambda spec=spec: create_custom_plot(df, "date", *spec[:4], spec[4], max_points).to_json())
+        for spec in CHART_SPECS
+    ]
+    return [future.result() for future in futures]
+
+def build_all_dict(df, max_points):
+    """7つの図を検証なしで JSON にする"""
+    return [
+        create_custom_plot_data(df, "date", y_col, title, y_label, color, allow_negative, max_points).plot
+        for y_col, title, y_label, color, allow_negative in CHART_SPECS
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-chart figure build benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--max-points', type=int, nargs='+', default=[500, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    executor = ThreadPoolExecutor(max_workers=len(CHART_SPECS))
+    for rows in args.rows:
+        df = make_frame(rows)
+        for max_points in args.max_points:
+            print(f"\nrows={rows} max_points={max_points}")
+            print(f"{'chart':>20} {'build (ms)':>11} {'to_json (ms)':>13} {'dict (ms)':>10}")
+            for y_col, title, y_label, color, allow_negative in CHART_SPECS:
+                build_ms, fig = best_of(
+                    lambda: create_custom_plot(df, "date", y_col, title, y_label, color, allow_negative, max_points),
+                    args.repeat)
+                json_ms, _ = best_of(fig.to_json, args.repeat)
+                dict_ms, _ = best_of(
+                    lambda: create_custom_plot_data(df, "date", y_col, title, y_label, color, allow_negative, max_points),
+                    args.repeat)
+                print(f"{y_col:>20} {build_ms:>11.2f} {json_ms:>13.2f} {dict_ms:>10.2f}")
+
+            plotly_ms, _ = best_of(lambda: build_all_plotly(df, max_points), args.repeat)
+            threaded_ms, _ = best_of(lambda: build_all_threaded(df, max_points, executor), args.repeat)
+            dict_ms, _ = best_of(lambda: build_all_dict(df, max_points), args.repeat)
+            print(f"{'total':>20} plotly={plotly_ms:.1f}ms  plotly+threads={threaded_ms:.1f}ms  dict={dict_ms:.1f}ms")
+    executor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+期間の絞り込みと date の解析のベンチマーク（文字列の date と整数の日時インデックスの比較）
+
+合成データベースを作成し、1チャンネル分の時系列データを期間ごとに読み込んで、
+SQL（絞り込みと読み込み）と変換（date の datetime64 化）の時間を比較する。
+
+- text:  channel_datas.date を文字列で比較し、pd.to_datetime で解析する（従来の方法）
+- epoch: サイドカーDBの channel_datas_epoch を整数の範囲で引き、整数から datetime64 を作る
+
+    python benchmarks/bench_date_filter.py --channels 100 --days 365 --interval 60 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from synthetic_db import build_database
+from config import DATABASE_CONFIG, PARQUET_CONFIG
+from database.connector import get_connection, close_all_connections
+from database.epoch_index import get_epoch_index
+from tabs.time_series_tab import _fetch_time_series, get_period_start_date
+from utils.metrics import get_histogram, reset_metrics
+
+PERIODS = ["1week", "1month", "all"]
+
+def measure(conn, channel_id, start_date, db_path, repeat):
+    """_fetch_time_series を repeat 回実行し、1回あたりの (SQL, 変換, 行数) を返す（ミリ秒）"""
+    reset_metrics()
+    for _ in range(repeat):
+        df, _ = _fetch_time_series(conn, channel_id, start=start_date, db_path=db_path)
+    _, _, sql_total = get_histogram('sql', 'time_series').snapshot()
+    _, _, transform_total = get_histogram('transform', 'time_series').snapshot()
+    return sql_total / repeat * 1000, transform_total / repeat * 1000, len(df)
+
+def main():
+    parser = argparse.ArgumentParser(description='Date filter / parse benchmark (text vs integer epoch)')
+    parser.add_argument('--channels', type=int, default=100)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--interval', type=int, default=60, help='Sampling interval in minutes')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    PARQUET_CONFIG['enabled'] = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench.db")
+        DATABASE_CONFIG['sidecar_path'] = os.path.join(tmp_dir, "viewer_cache.db")
+        conn = build_database(db_path, args.channels, args.days, args.interval, index=True)
+        rows = conn.execute("SELECT COUNT(*) FROM channel_datas").fetchone()[0]
+        channel_id = conn.execute("SELECT channel_id FROM channel_lists LIMIT 1").fetchone()[0]
+        conn.close()
+
+        start = time.perf_counter()
+        get_epoch_index(db_path).refresh()
+        print(f"rows={rows} channels={args.channels} (epoch index build: {time.perf_counter() - start:.1f} s)")
+        print(f"{'period':>8} {'rows':>8} {'mode':>6} {'sql (ms)':>10} {'parse (ms)':>11} {'total (ms)':>11}")
+
+        conn = get_connection(db_path)
+        for period in PERIODS:
+            start_date = get_period_start_date(period)
+            for mode in ("text", "epoch"):
+                DATABASE_CONFIG['epoch_index'] = mode == "epoch"
+                sql_ms, transform_ms, count = measure(conn, channel_id, start_date, db_path, args.repeat)
+                print(f"{period:>8} {count:>8} {mode:>6} {sql_ms:>10.1f} {transform_ms:>11.1f} "
+                      f"{sql_ms + transform_ms:>11.1f}")
+        close_all_connections()
+
+if __name__ == "__main__":
+    main()
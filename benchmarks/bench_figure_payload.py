@@ -0,0 +1,72 @@
+"""
+時系列チャートの図作成時間と JSON ペイロードサイズのベンチマーク
+
+7つの個別の図（create_custom_plot）と、x 軸共有の統合図（create_combined_plot）を
+同じデータから作成し、作成＋シリアライズ時間と JSON サイズを比較する。
+ブラウザ側の描画時間はここでは計測しない（ペイロードサイズを目安とする）。
+
+    python benchmarks/bench_figure_payload.py --rows 1000 10000 100000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from tabs.time_series_tab import CHART_SPECS, create_custom_plot, create_combined_plot
+
+def make_frame(rows):
+    """5分間隔の合成時系列データを作成する"""
+    rng = np.random.default_rng(0)
+    capacity = 5_000_000
+    local_balance = np.clip(np.cumsum(rng.normal(0, 20_000, rows)) + capacity / 2, 0, capacity).astype(np.int64)
+    df = pd.DataFrame({
+        'date': pd.date_range(end=pd.Timestamp.now().floor('min'), periods=rows, freq='5min'),
+        'local_balance': local_balance,
+        'local_fee': np.repeat(rng.integers(0, 2000, rows // 500 + 1), 500)[:rows],
+        'local_infee': np.repeat(rng.integers(-500, 0, rows // 800 + 1), 800)[:rows],
+        'remote_fee': np.repeat(rng.integers(0, 2000, rows // 300 + 1), 300)[:rows],
+        'remote_infee': np.zeros(rows, dtype=np.int64),
+        'amboss_fee': np.repeat(rng.integers(0, 2000, rows // 1000 + 1), 1000)[:rows],
+        'active': (rng.random(rows) > 0.01).astype(np.int64),
+    })
+    df['local_balance_ratio'] = np.round(df['local_balance'] / capacity * 100, 2)
+    return df
+
+def measure(build, repeat):
+    """図の作成と to_json() を repeat 回行い、最短時間（ミリ秒）と JSON サイズを返す"""
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        figures = build()
+        size = sum(len(fig.to_json()) for fig in figures)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, size
+
+def main():
+    parser = argparse.ArgumentParser(description='Figure payload benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--max-points', type=int, default=500, help='0 disables downsampling')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"{'rows':>8} {'separate ms':>12} {'separate KB':>12} {'combined ms':>12} {'combined KB':>12}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        separate_ms, separate_size = measure(
+            lambda: [create_custom_plot(df, "date", y_col, title, y_label, color,
+                                        allow_negative=allow_negative, max_points=args.max_points)
+                     for y_col, title, y_label, color, allow_negative in CHART_SPECS],
+            args.repeat)
+        combined_ms, combined_size = measure(
+            lambda: [create_combined_plot(df, "date", max_points=args.max_points)],
+            args.repeat)
+        print(f"{rows:>8} {separate_ms:>12.1f} {separate_size / 1024:>12.1f} "
+              f"{combined_ms:>12.1f} {combined_size / 1024:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+チャンネル一覧（最新スナップショット）クエリのベンチマーク
+
+履歴の長さを変えた合成データベースを作成し、全件集計クエリと
+(channel_id, date) インデックスによるシーククエリの実行時間を比較する。
+
+    python benchmarks/bench_latest_snapshot.py --channels 100 --days 7 30 180 365
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from synthetic_db import build_database
+from database.connector import create_latest_index
+from tabs.node_info_tab import LATEST_SNAPSHOT_SCAN_QUERY, LATEST_SNAPSHOT_SEEK_QUERY
+
+def time_query(conn, query, repeat):
+    """クエリを repeat 回実行し、最短時間（ミリ秒）を返す"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(query).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Latest snapshot query benchmark')
+    parser.add_argument('--channels', type=int, default=100)
+    parser.add_argument('--days', type=int, nargs='+', default=[7, 30, 90, 180])
+    parser.add_argument('--interval', type=int, default=60, help='Sampling interval in minutes')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    print(f"{'days':>6} {'rows':>10} {'scan (ms)':>12} {'seek (ms)':>12}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for days in args.days:
+            path = os.path.join(tmp_dir, f"bench_{days}.db")
+            conn = build_database(path, args.channels, days, args.interval)
+            rows = conn.execute("SELECT COUNT(*) FROM channel_datas").fetchone()[0]
+            
+            scan_ms = time_query(conn, LATEST_SNAPSHOT_SCAN_QUERY, args.repeat)
+            create_latest_index(conn)
+            seek_ms = time_query(conn, LATEST_SNAPSHOT_SEEK_QUERY, args.repeat)
+            conn.close()
+            
+            print(f"{days:>6} {rows:>10} {scan_ms:>12.1f} {seek_ms:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+時系列データの読み込み中のメモリ使用量のベンチマーク（一括読み込みとチャンク読み込みの比較）
+
+合成データベースを作成し、1チャンネルの全期間 ("all") を読み込んだときの
+Python 側のピークメモリ（tracemalloc）と処理時間を比較する。
+
+- raw:     生データ全体の読み込み（期間が ROLLUP_CONFIG['raw_max_days'] 以下の場合の経路）
+- reduced: 読み込みながらのバケット集計（ROLLUP_CONFIG['enabled'] = False の場合の経路）
+- rollup:  SQL 側でバケット集計したデータの読み込み（既定の経路）
+
+    python benchmarks/bench_load_memory.py --channels 4 --days 1095 --interval 5
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from synthetic_db import build_database
+from config import CACHE_CONFIG, DATABASE_CONFIG, PARQUET_CONFIG, ROLLUP_CONFIG
+from database.connector import close_all_connections
+from tabs.time_series_tab import get_time_series_data, _series_cache
+
+def measure(channel_id, db_path):
+    """全期間を読み込み、(行数, ピークメモリ MB, 秒) を返す（処理時間は tracemalloc なしで計測）"""
+    _series_cache.clear()
+    start = time.perf_counter()
+    get_time_series_data(channel_id, "all", db_path)
+    elapsed = time.perf_counter() - start
+    _series_cache.clear()
+    tracemalloc.start()
+    df = get_time_series_data(channel_id, "all", db_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(df), peak / 1024 / 1024, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak memory of loading the "all" period (bulk vs chunked reads)')
+    parser.add_argument('--channels', type=int, default=4)
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--interval', type=int, default=5, help='Sampling interval in minutes')
+    parser.add_argument('--chunk-rows', type=int, default=DATABASE_CONFIG['read_chunk_rows'])
+    args = parser.parse_args()
+
+    PARQUET_CONFIG['enabled'] = False
+    CACHE_CONFIG['column_store'] = False
+    DATABASE_CONFIG['mmap_size'] = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench.db")
+        DATABASE_CONFIG['sidecar_path'] = os.path.join(tmp_dir, "viewer_cache.db")
+        conn = build_database(db_path, args.channels, args.days, args.interval, index=True)
+        channel_id = conn.execute("SELECT channel_id FROM channel_lists LIMIT 1").fetchone()[0]
+        conn.close()
+
+        print(f"{'path':>8} {'chunk_rows':>10} {'rows':>8} {'peak (MB)':>10} {'time (s)':>9}")
+        raw_max_days = ROLLUP_CONFIG['raw_max_days']
+        for path in ("raw", "reduced", "rollup"):
+            ROLLUP_CONFIG['enabled'] = path == "rollup"
+            ROLLUP_CONFIG['raw_max_days'] = args.days + 1 if path == "raw" else raw_max_days
+            for chunk_rows in (0, args.chunk_rows):
+                DATABASE_CONFIG['read_chunk_rows'] = chunk_rows
+                rows, peak, elapsed = measure(channel_id, db_path)
+                print(f"{path:>8} {chunk_rows:>10} {rows:>8} {peak:>10.1f} {elapsed:>9.2f}")
+        close_all_connections()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+起動時間のベンチマーク（python -X importtime）
+
+新しいプロセスで app の import と create_app() を実行し、
+-X importtime の出力から import 時間の合計と時間のかかったモジュールを表示する。
+あわせて UI 構築までの経過時間と、plotly / matplotlib が読み込まれたかを表示する。
+
+    python benchmarks/bench_startup.py --top 15 --repeat 3 [--db data/lightning_node.db]
+
+--db を省略した場合は小さな合成データベースを作成して使う。
+"""
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+STAGES = {
+    'import app': "import app",
+    'create_app()': "import app; app.create_app()",
+}
+
+# DATABASE_CONFIG['path'] を差し替えるコード（計測には含めない）
+SET_DB_PATH = "from config import DATABASE_CONFIG; DATABASE_CONFIG['path'] = {db_path!r}"
+
+# 読み込まれたかを確認するモジュール
+WATCHED_MODULES = ['gradio', 'pandas', 'plotly', 'plotly.graph_objs', 'matplotlib']
+
+def parse_importtime(stderr):
+    """-X importtime の出力を [(自身の時間, 累積時間, モジュール名, 深さ)] にする（マイクロ秒）"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(self_us), int(cumulative_us), name.strip(), depth))
+    return entries
+
+def run_stage(code, db_path):
+    """新しいプロセスで code を実行し、(経過時間 [秒], import 一覧) を返す"""
+    script = (f"{SET_DB_PATH.format(db_path=db_path)}; import time; _start = time.perf_counter(); "
+              f"{code}; print(time.perf_counter() - _start)")
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=SRC_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{code} failed:\n{result.stderr[-2000:]}")
+    return float(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time benchmark (python -X importtime)')
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to show')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--db', help='Database to open (default: a small synthetic database)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = args.db
+        if db_path is None:
+            from synthetic_db import build_database
+            db_path = os.path.join(tmp_dir, "startup.db")
+            build_database(db_path, 10, 7, index=True).close()
+        report(db_path, args.top, args.repeat)
+
+def report(db_path, top, repeat):
+    """各段階の起動時間と import 時間を表示する"""
+    for label, code in STAGES.items():
+        runs = [run_stage(code, db_path) for _ in range(repeat)]
+        elapsed, entries = min(runs, key=lambda run: run[0])
+        import_total = sum(cumulative for _, cumulative, _, depth in entries if depth == 0)
+        loaded = {name for _, _, name, _ in entries}
+
+        print(f"\n== {label}: {elapsed * 1000:.0f} ms (imports {import_total / 1000:.0f} ms, best of {repeat})")
+        print("loaded: " + ", ".join(f"{name}={'yes' if name in loaded else 'no'}" for name in WATCHED_MODULES))
+        print(f"{'cumulative (ms)':>16} {'self (ms)':>10}  module")
+        for self_us, cumulative_us, name, _ in sorted(entries, key=lambda e: e[1], reverse=True)[:top]:
+            print(f"{cumulative_us / 1000:>16.1f} {self_us / 1000:>10.1f}  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+pytest-benchmark 用の共通フィクスチャ
+
+合成データベースの規模は環境変数で変更できる。
+
+    BENCH_CHANNELS=500 BENCH_DAYS=365 python -m pytest benchmarks --benchmark-only
+"""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from synthetic_db import build_database
+from config import CACHE_CONFIG, DATABASE_CONFIG, EVENTS_CONFIG, ROLLUP_CONFIG, SCHEDULER_CONFIG, STATS_CONFIG
+from database.connector import close_all_connections
+
+@pytest.fixture(scope="session")
+def synthetic_db(tmp_path_factory):
+    """合成データベースを作成し、そのパスを返す"""
+    # 計測対象以外のキャッシュやバックグラウンド処理は使わない
+    SCHEDULER_CONFIG['enabled'] = False
+    CACHE_CONFIG['column_store'] = False
+    CACHE_CONFIG['figure_cache'] = False
+    ROLLUP_CONFIG['materialize'] = False
+    STATS_CONFIG['enabled'] = False
+    EVENTS_CONFIG['enabled'] = False
+
+    bench_dir = tmp_path_factory.mktemp("bench")
+    DATABASE_CONFIG['sidecar_path'] = str(bench_dir / "viewer_cache.db")
+    path = str(bench_dir / "lightning_node.db")
+    conn = build_database(
+        path,
+        int(os.environ.get('BENCH_CHANNELS', 100)),
+        int(os.environ.get('BENCH_DAYS', 90)),
+        int(os.environ.get('BENCH_INTERVAL', 60)),
+        index=True
+    )
+    conn.close()
+    yield path
+    close_all_connections()
+
+@pytest.fixture(scope="session")
+def channel_name(synthetic_db):
+    """計測に使うチャンネル名"""
+    return "channel-1"
@@ -0,0 +1,112 @@
+"""
+複数セッションからの同時アクセスを想定した負荷テスト
+
+N 個の仮想クライアントが、ランダムなチャンネルと期間でチャート更新（--target data なら
+時系列データの取得のみ）を繰り返し、リクエストごとの待ち時間を含む応答時間の p50 / p99 を計測する。
+図の作成は GIL を保持する CPU 処理のため、並行化の効果は主に DB アクセス部分に表れる。
+
+- sync:  Gradio の既定（イベントごとの同時実行数 1）と同じく、リクエストを1件ずつ処理する
+- async: 非同期ハンドラと同じく、DB アクセス用スレッドプールで並行処理する
+
+    python benchmarks/load_test.py --clients 8 --requests 5 --channels 50 --days 90 [--target data] [--figure-cache]
+
+--figure-cache を指定すると作成済みチャートのキャッシュを有効にして計測する
+（同じチャンネル・期間の2回目以降の表示はキャッシュから返す）。
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from synthetic_db import build_database
+from config import CACHE_CONFIG, DATABASE_CONFIG, SCHEDULER_CONFIG
+from database.connector import close_all_connections
+from database.async_access import run_db, shutdown_db_executor
+from tabs.time_series_tab import build_charts, get_channel_info, get_time_series_data, _figure_cache, _series_cache
+
+PERIODS = ["1week", "1month", "all"]
+
+def load_data(channel_name, period, db_path):
+    """チャートを作らずに時系列データだけを取得する"""
+    channel_id = get_channel_info(channel_name, db_path)["id"]
+    return get_time_series_data(channel_id, period, db_path, refresh=True)
+
+def load_charts(channel_name, period, db_path):
+    """チャート更新ハンドラと同じ処理を行う"""
+    return build_charts(channel_name, period, False, True, db_path)
+
+async def run_client(client_id, target, channel_names, num_requests, limit, db_path, latencies):
+    """1クライアント分のリクエストを順に送る"""
+    rng = random.Random(client_id)
+    for _ in range(num_requests):
+        channel_name = rng.choice(channel_names)
+        period = rng.choice(PERIODS)
+        start = time.perf_counter()
+        async with limit:
+            await run_db(target, channel_name, period, db_path)
+        latencies.append(time.perf_counter() - start)
+
+async def run_load(target, channel_names, num_clients, num_requests, concurrency, db_path):
+    """全クライアントを同時に開始し、応答時間の一覧と全体の所要時間を返す"""
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_client(i, target, channel_names, num_requests, limit, db_path, latencies)
+        for i in range(num_clients)
+    ])
+    return latencies, time.perf_counter() - start
+
+def report(label, latencies, elapsed):
+    """p50 / p99 とスループットを表示する"""
+    ms = np.asarray(latencies) * 1000
+    print(f"{label:>8} {len(ms):>6} {np.percentile(ms, 50):>10.1f} {np.percentile(ms, 99):>10.1f} "
+          f"{len(ms) / elapsed:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent session load test')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=5, help='Requests per client')
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--interval', type=int, default=60, help='Sampling interval in minutes')
+    parser.add_argument('--target', choices=['charts', 'data'], default='charts')
+    parser.add_argument('--workers', type=int, default=DATABASE_CONFIG.get('max_workers', 4))
+    parser.add_argument('--figure-cache', action='store_true', help='Reuse rendered figures for repeat views')
+    args = parser.parse_args()
+
+    DATABASE_CONFIG['max_workers'] = args.workers
+    CACHE_CONFIG['figure_cache'] = args.figure_cache
+    SCHEDULER_CONFIG['enabled'] = False
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "load_test.db")
+        DATABASE_CONFIG['sidecar_path'] = os.path.join(tmp_dir, "viewer_cache.db")
+        conn = build_database(db_path, args.channels, args.days, args.interval, index=True)
+        channel_names = [row[0] for row in conn.execute("SELECT channel_name FROM channel_lists")]
+        conn.close()
+
+        target = load_charts if args.target == 'charts' else load_data
+        print(f"target={args.target} clients={args.clients} requests/client={args.requests} workers={args.workers}")
+        print(f"{'mode':>8} {'count':>6} {'p50 (ms)':>10} {'p99 (ms)':>10} {'req/s':>8}")
+        for label, concurrency in (("sync", 1), ("async", args.workers)):
+            # 各モードともキャッシュが空の状態から計測する
+            _series_cache.clear()
+            _figure_cache.clear()
+            latencies, elapsed = asyncio.run(
+                run_load(target, channel_names, args.clients, args.requests, concurrency, db_path))
+            report(label, latencies, elapsed)
+        if args.figure_cache:
+            print(f"figure cache: {_figure_cache.stats()}")
+
+        shutdown_db_executor()
+        close_all_connections()
+
+if __name__ == "__main__":
+    main()
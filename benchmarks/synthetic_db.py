@@ -0,0 +1,151 @@
+"""
+ベンチマーク用の合成 lightning_node.db を作成する
+
+channel_lists と channel_datas を実データと同じスキーマで作成する。
+channel_datas の行は実際の収集と同じく時刻ごとに全チャンネル分を挿入し、
+ローカル残高はランダムウォーク、手数料はときどき変わるステップ系列、
+アクティブ状態はまれに切り替わる値として生成する。
+
+    python benchmarks/synthetic_db.py data/synthetic.db --channels 100 --days 365 --interval 60
+"""
+import os
+import sys
+import sqlite3
+import argparse
+import numpy as np
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from database.connector import create_latest_index
+
+# 1回の executemany で挿入する時刻数
+BLOCK_STEPS = 256
+
+def _step_series(rng, state, steps, change_prob, low, high):
+    """ときどき値が変わるステップ系列を (steps, チャンネル数) の配列で生成する"""
+    changes = rng.random((steps, state.size)) < change_prob
+    values = rng.integers(low, high, (steps, state.size))
+    out = np.empty((steps, state.size), dtype=np.int64)
+    current = state.copy()
+    for i in range(steps):
+        current = np.where(changes[i], values[i], current)
+        out[i] = current
+    state[:] = current
+    return out
+
+def _active_series(rng, state, steps, down_prob=0.002, up_prob=0.05):
+    """まれに非アクティブになり、しばらくして戻るアクティブ状態を生成する"""
+    draws = rng.random((steps, state.size))
+    out = np.empty((steps, state.size), dtype=np.int64)
+    current = state.copy()
+    for i in range(steps):
+        current = np.where(current == 1, draws[i] >= down_prob, draws[i] < up_prob).astype(np.int64)
+        out[i] = current
+    state[:] = current
+    return out
+
+def build_database(path, num_channels, days, interval_minutes=60, seed=0, index=False):
+    """
+    合成データベースを作成する
+
+    Args:
+        path: 作成するデータベースのパス（既存のファイルは上書きしない）
+        num_channels: チャンネル数
+        days: 履歴の日数
+        interval_minutes: 収集間隔（分）
+        seed: 乱数シード
+        index: channel_datas(channel_id, date) のインデックスを作成するか
+
+    Returns:
+        書き込み可能な sqlite3.Connection
+    """
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE channel_lists (channel_name TEXT, channel_id TEXT, capacity INTEGER)")
+    conn.execute("""
+        CREATE TABLE channel_datas (
+            channel_id TEXT, date TEXT,
+            local_balance INTEGER, local_fee INTEGER, local_infee INTEGER,
+            remote_balance INTEGER, remote_fee INTEGER, remote_infee INTEGER,
+            num_updates INTEGER, amboss_fee INTEGER, active INTEGER
+        )
+    """)
+
+    channel_ids = [f"{800000 + i}x{i}x0" for i in range(num_channels)]
+    capacities = 1_000_000 * (1 + np.arange(num_channels) % 5)
+    conn.executemany(
+        "INSERT INTO channel_lists VALUES (?, ?, ?)",
+        [(f"channel-{i}", channel_ids[i], int(capacities[i])) for i in range(num_channels)]
+    )
+
+    # チャンネルごとの状態
+    local_balance = rng.integers(0, capacities)
+    local_fee = rng.integers(0, 2000, num_channels)
+    local_infee = -rng.integers(0, 500, num_channels)
+    remote_fee = rng.integers(0, 2000, num_channels)
+    remote_infee = -rng.integers(0, 500, num_channels)
+    amboss_fee = rng.integers(0, 2000, num_channels)
+    active = np.ones(num_channels, dtype=np.int64)
+    num_updates = np.zeros(num_channels, dtype=np.int64)
+
+    end = datetime.now().replace(second=0, microsecond=0)
+    total_steps = days * 24 * 60 // interval_minutes + 1
+    start = end - timedelta(minutes=interval_minutes * (total_steps - 1))
+    channel_column = np.array(channel_ids, dtype=object)
+
+    for block_start in range(0, total_steps, BLOCK_STEPS):
+        steps = min(BLOCK_STEPS, total_steps - block_start)
+        dates = [
+            (start + timedelta(minutes=interval_minutes * (block_start + i))).strftime("%Y-%m-%d %H:%M:%S")
+            for i in range(steps)
+        ]
+
+        # ローカル残高は容量の範囲内のランダムウォーク
+        walk = np.cumsum(rng.normal(0, 0.01, (steps, num_channels)) * capacities, axis=0)
+        balances = np.clip(local_balance + walk, 0, capacities).astype(np.int64)
+        local_balance = balances[-1]
+        updates = num_updates + np.cumsum(rng.integers(0, 3, (steps, num_channels)), axis=0)
+        num_updates = updates[-1]
+
+        columns = [
+            np.repeat(np.array(dates, dtype=object), num_channels),
+            np.tile(channel_column, steps),
+            balances.ravel(),
+            _step_series(rng, local_fee, steps, 0.01, 0, 2000).ravel(),
+            _step_series(rng, local_infee, steps, 0.005, -500, 1).ravel(),
+            (capacities - balances).ravel(),
+            _step_series(rng, remote_fee, steps, 0.01, 0, 2000).ravel(),
+            _step_series(rng, remote_infee, steps, 0.005, -500, 1).ravel(),
+            updates.ravel(),
+            _step_series(rng, amboss_fee, steps, 0.01, 0, 2000).ravel(),
+            _active_series(rng, active, steps).ravel(),
+        ]
+        rows = zip(columns[1], columns[0], *(column.tolist() for column in columns[2:]))
+        conn.executemany("INSERT INTO channel_datas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    conn.commit()
+    if index:
+        create_latest_index(conn)
+    return conn
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic lightning_node.db')
+    parser.add_argument('path')
+    parser.add_argument('--channels', type=int, default=100, help='Number of channels (10-5000)')
+    parser.add_argument('--days', type=int, default=90, help='History length in days')
+    parser.add_argument('--interval', type=int, default=60, help='Sampling interval in minutes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-index', action='store_true', help='Do not create the (channel_id, date) index')
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+
+    conn = build_database(args.path, args.channels, args.days, args.interval, args.seed, index=not args.no_index)
+    rows = conn.execute("SELECT COUNT(*) FROM channel_datas").fetchone()[0]
+    conn.close()
+    print(f"{args.path}: {args.channels} channels, {rows} rows")
+
+if __name__ == "__main__":
+    main()
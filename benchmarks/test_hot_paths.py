@@ -0,0 +1,133 @@
+"""
+主要な処理のベンチマーク（pytest-benchmark）
+
+    python -m pytest benchmarks --benchmark-only
+    python -m pytest benchmarks --benchmark-autosave   # 結果を保存して --benchmark-compare で比較
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from bench_figure_payload import make_frame
+from config import CACHE_CONFIG, DATABASE_CONFIG
+from database.connector import get_connection
+from database.epoch_index import get_epoch_index
+from tabs.node_info_tab import get_latest_node_info
+from tabs.time_series_tab import (CHART_SPECS, build_charts, chart_events, comparison_plot_figure, create_combined_plot,
+                                  create_custom_plot, create_custom_plot_data, get_channel_info, get_period_start_date,
+                                  get_time_series_data, _fetch_time_series, _series_cache)
+from utils.plot_data import figure_to_plot_data
+from utils.series_cache import SeriesCache, SeriesCacheEntry
+
+PERIODS = ["1week", "1month", "all"]
+
+def test_get_latest_node_info(benchmark, synthetic_db):
+    df = benchmark(get_latest_node_info, synthetic_db)
+    assert not df.empty
+
+@pytest.mark.parametrize("period", PERIODS)
+def test_get_time_series_data_cold(benchmark, synthetic_db, channel_name, period):
+    """キャッシュが空の状態からの取得"""
+    channel_id = get_channel_info(channel_name, synthetic_db)["id"]
+    df = benchmark.pedantic(
+        get_time_series_data, args=(channel_id, period, synthetic_db),
+        setup=_series_cache.clear, rounds=10
+    )
+    assert not df.empty
+
+@pytest.mark.parametrize("period", PERIODS)
+def test_get_time_series_data_warm(benchmark, synthetic_db, channel_name, period):
+    """キャッシュ済みで DB に変更がない状態での更新"""
+    channel_id = get_channel_info(channel_name, synthetic_db)["id"]
+    get_time_series_data(channel_id, period, synthetic_db)
+    df = benchmark(get_time_series_data, channel_id, period, synthetic_db)
+    assert not df.empty
+
+@pytest.mark.parametrize("period", PERIODS)
+@pytest.mark.parametrize("mode", ["text", "epoch"])
+def test_fetch_time_series(benchmark, synthetic_db, channel_name, period, mode):
+    """期間の絞り込みと date の変換（文字列の date と整数の日時インデックス）"""
+    channel_id = get_channel_info(channel_name, synthetic_db)["id"]
+    get_epoch_index(synthetic_db).refresh()
+    DATABASE_CONFIG['epoch_index'] = mode == "epoch"
+    try:
+        df, _ = benchmark(_fetch_time_series, get_connection(synthetic_db), channel_id,
+                          get_period_start_date(period), db_path=synthetic_db)
+    finally:
+        DATABASE_CONFIG['epoch_index'] = False
+    assert not df.empty
+
+@pytest.mark.parametrize("rows", [1_000, 100_000])
+@pytest.mark.parametrize("builder", ["plotly", "dict"])
+def test_create_custom_plot(benchmark, rows, builder):
+    df = make_frame(rows)
+    y_col, title, y_label, color, allow_negative = CHART_SPECS[0]
+    create_plot = create_custom_plot if builder == "plotly" else create_custom_plot_data
+    benchmark(create_plot, df, "date", y_col, title, y_label, color, allow_negative)
+
+@pytest.mark.parametrize("builder", ["plotly", "dict"])
+def test_custom_plot_has_no_typed_arrays(builder):
+    """図の JSON に typed array（bdata）を含めない（gradio 同梱の plotly.js 2.10 は解釈できない）"""
+    df = make_frame(5_000)
+    # イベントの点（customdata を含む）も重ねる
+    events = pd.DataFrame({
+        'channel_id': 'channel-1',
+        'date': df['date'].to_numpy()[::50],
+        'event_type': np.resize(['local_fee', 'local_infee', 'balance_jump', 'offline', 'online'], 100),
+        'old_value': np.arange(100, dtype=np.int64),
+        'new_value': np.arange(100, dtype=np.int64) + 1,
+    })
+    for y_col, title, y_label, color, allow_negative in CHART_SPECS:
+        chart = chart_events(events, y_col, capacity=5_000_000)
+        if builder == "plotly":
+            payload = create_custom_plot(df, "date", y_col, title, y_label, color, allow_negative,
+                                         events=chart).to_json()
+        else:
+            payload = create_custom_plot_data(df, "date", y_col, title, y_label, color, allow_negative,
+                                              events=chart).plot
+        assert 'bdata' not in payload, y_col
+
+@pytest.mark.parametrize("builder", ["plotly", "dict"])
+def test_comparison_plot_has_no_typed_arrays(builder):
+    """比較チャートの図の JSON にも typed array（bdata）を含めない"""
+    series = [(f"channel-{index}", make_frame(rows)) for index, rows in enumerate((5_000, 800, 50))]
+    figure = comparison_plot_figure(series, "date", "local_balance_ratio", "比較", "%")
+    if builder == "plotly":
+        import plotly.graph_objects as go
+        payload = go.Figure(figure).to_json()
+    else:
+        payload = figure_to_plot_data(figure).plot
+    assert 'bdata' not in payload
+
+def test_combined_plot_has_no_typed_arrays():
+    """統合表示の図の JSON にも typed array（bdata）を含めない"""
+    assert 'bdata' not in create_combined_plot(make_frame(5_000), "date").to_json()
+
+def test_series_cache_keeps_lock_after_eviction():
+    """エントリを破棄してもチャンネル単位のロックは同じものを返す（同時読み込みを防ぐため）"""
+    cache = SeriesCache(max_channels=1)
+    lock = cache.lock_for('a')
+    cache.put('a', SeriesCacheEntry(pd.DataFrame(), "2024-01-01", None, 0))
+    cache.put('b', SeriesCacheEntry(pd.DataFrame(), "2024-01-01", None, 0))
+    assert cache.get('a') is None
+    assert cache.lock_for('a') is lock
+
+@pytest.mark.parametrize("period", PERIODS)
+@pytest.mark.parametrize("combined", [False, True], ids=["separate", "combined"])
+def test_update_charts(benchmark, synthetic_db, channel_name, period, combined):
+    """チャート更新ハンドラと同じ処理（データ取得と図の作成）"""
+    figures = benchmark(build_charts, channel_name, period, combined, True, synthetic_db)
+    assert any(figure is not None for figure in figures)
+
+@pytest.mark.parametrize("period", PERIODS)
+def test_update_charts_figure_cache(benchmark, synthetic_db, channel_name, period):
+    """作成済みチャートのキャッシュにヒットする場合のチャート更新"""
+    CACHE_CONFIG['figure_cache'] = True
+    try:
+        build_charts(channel_name, period, False, True, synthetic_db)
+        figures = benchmark(build_charts, channel_name, period, False, True, synthetic_db)
+    finally:
+        CACHE_CONFIG['figure_cache'] = False
+    assert all(figure is not None for figure in figures[:-1])
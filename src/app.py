@@ -1,10 +1,15 @@
-import gradio as gr
-from tabs.node_info_tab import create_node_info_tab
-from tabs.time_series_tab import create_time_series_tab
 import os
+import sys
 import json
+import sqlite3
 import argparse
-from config import SERVER_CONFIG, DATABASE_CONFIG, GRADIO_TITLE, GRADIO_THEME, GRADIO_ENABLE_QUEUE
+import logging
+from database.connector import connect_writable, has_latest_index, create_latest_index
+from database.change_detector import get_db_version
+from utils.scheduler import RefreshScheduler, set_scheduler
+from utils.metrics import render_metrics
+from config import (SERVER_CONFIG, DATABASE_CONFIG, ROLLUP_CONFIG, SCHEDULER_CONFIG, STATS_CONFIG, EVENTS_CONFIG,
+                    LOG_CONFIG, METRICS_CONFIG, GRADIO_TITLE, GRADIO_THEME, GRADIO_ENABLE_QUEUE)
 
 def load_user_config():
     """ユーザー設定ファイルを読み込む"""
@@ -25,8 +30,96 @@ def load_user_config():
     except Exception as e:
         print(f"設定読み込みエラー: {e}")
 
+def setup_logging():
+    """LOG_CONFIG に従ってログの出力先とレベルを設定する"""
+    handlers = [logging.StreamHandler()]
+    log_file = LOG_CONFIG.get('file')
+    if log_file:
+        log_dir = os.path.dirname(log_file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    
+    logging.basicConfig(
+        level=getattr(logging, LOG_CONFIG.get('level', 'INFO').upper(), logging.INFO),
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s',
+        handlers=handlers
+    )
+
+def create_server(app):
+    """Gradio アプリと /metrics エンドポイントを1つの FastAPI アプリにまとめる"""
+    import gradio as gr
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+    
+    server = FastAPI()
+    
+    @server.get(METRICS_CONFIG['path'], response_class=PlainTextResponse)
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+    
+    return gr.mount_gradio_app(server, app, path="/")
+
+def check_latest_index(db_path, create=False):
+    """最新スナップショット用インデックスの有無を確認し、必要に応じて作成する"""
+    if not os.path.exists(db_path):
+        return
+    
+    conn = connect_writable(db_path)
+    try:
+        if has_latest_index(conn):
+            return
+        
+        # 対話実行時のみ作成するか確認する
+        if not create and sys.stdin.isatty():
+            answer = input("channel_datas(channel_id, date) のインデックスがありません。作成しますか？ [y/N]: ")
+            create = answer.strip().lower() in ('y', 'yes')
+        
+        if create:
+            print("インデックスを作成しています（データ量によって時間がかかります）...")
+            create_latest_index(conn)
+            print("インデックスを作成しました")
+        else:
+            print("警告: channel_datas(channel_id, date) のインデックスがないため、チャンネル一覧の更新が遅くなります")
+            print("      --create-index を指定して起動するとインデックスを作成します")
+    except sqlite3.Error as e:
+        print(f"インデックス確認エラー: {e}")
+    finally:
+        conn.close()
+
+def create_scheduler(db_path):
+    """最新スナップショットとチャート用キャッシュを更新するバックグラウンドスケジューラを作成する"""
+    from tabs.node_info_tab import refresh_latest_snapshot
+    from tabs.time_series_tab import warm_series_cache
+    from database.rollups import get_rollup_store
+    from database.channel_stats import get_channel_stats_store
+    from database.channel_events import get_channel_event_store
+    from database.epoch_index import epoch_index_enabled, get_epoch_index
+    
+    scheduler = RefreshScheduler(
+        poll=lambda: get_db_version(db_path),
+        interval=SCHEDULER_CONFIG['interval']
+    )
+    # チャンネル統計（チャンネル一覧の表示時に最新の統計を結合する）
+    if STATS_CONFIG['enabled'] and DATABASE_CONFIG.get('sidecar_path'):
+        scheduler.add_job("チャンネル統計", lambda: get_channel_stats_store(db_path).refresh())
+    scheduler.add_job("チャンネル一覧", lambda: refresh_latest_snapshot(db_path))
+    if EVENTS_CONFIG['enabled'] and DATABASE_CONFIG.get('sidecar_path'):
+        scheduler.add_job("イベント", lambda: get_channel_event_store(db_path).refresh())
+    if epoch_index_enabled():
+        scheduler.add_job("日時インデックス", lambda: get_epoch_index(db_path).refresh())
+    scheduler.add_job("時系列キャッシュ", lambda: warm_series_cache(db_path))
+    if ROLLUP_CONFIG['materialize'] and DATABASE_CONFIG.get('sidecar_path'):
+        scheduler.add_job("集計テーブル", lambda: get_rollup_store(db_path).refresh())
+    return scheduler
+
 def create_app():
     """アプリケーションを作成する"""
+    # gradio と各タブ（pandas, plotly など）は UI 構築時に読み込む
+    import gradio as gr
+    from tabs.node_info_tab import create_node_info_tab
+    from tabs.time_series_tab import create_time_series_tab
+    from tabs.fleet_tab import create_fleet_tab
     
     # データベースファイルの存在確認
     db_path = DATABASE_CONFIG['path']
@@ -55,6 +148,9 @@ def create_app():
             
             with gr.TabItem("時系列データ"):
                 time_series_tab = create_time_series_tab(db_path=DATABASE_CONFIG['path'])
+            
+            with gr.TabItem("ノード全体"):
+                create_fleet_tab(db_path=DATABASE_CONFIG['path'])
     
     return app
 
@@ -72,6 +168,10 @@ if __name__ == "__main__":
                         help='Enable sharing option')
     parser.add_argument('--debug', action='store_true', 
                         help='Enable debug mode')
+    parser.add_argument('--create-index', action='store_true', 
+                        help='Create the channel_datas(channel_id, date) index if it is missing')
+    parser.add_argument('--metrics', action='store_true', 
+                        help=f'Serve Prometheus metrics at {METRICS_CONFIG["path"]}')
     args = parser.parse_args()
     
     # コマンドライン引数を設定に反映
@@ -79,14 +179,39 @@ if __name__ == "__main__":
     port = args.port
     share = args.share or SERVER_CONFIG.get('share', False)
     debug = args.debug or SERVER_CONFIG.get('debug', False)
+    metrics = args.metrics or METRICS_CONFIG.get('enabled', False)
+    
+    setup_logging()
     
     print(f"データベースパス: {DATABASE_CONFIG['path']}")
     print(f"サーバー起動: {host}:{port} (共有: {share}, デバッグモード: {debug})")
     
+    # 最新スナップショット用インデックスの確認
+    check_latest_index(DATABASE_CONFIG['path'], create=args.create_index)
+    
     app = create_app()
-    app.launch(
-        server_name=host,
-        server_port=port,
-        share=share,
-        debug=debug
-    )
\ No newline at end of file
+    
+    # 非同期ハンドラを複数セッションで並行実行できるようにする
+    if GRADIO_ENABLE_QUEUE:
+        app.queue(default_concurrency_limit=SERVER_CONFIG.get('concurrency_limit', 1))
+    
+    # バックグラウンド更新を開始
+    if SCHEDULER_CONFIG['enabled']:
+        scheduler = create_scheduler(DATABASE_CONFIG['path'])
+        set_scheduler(scheduler)
+        scheduler.start()
+    
+    if metrics:
+        # /metrics を同じサーバーで公開する（共有リンクは使用できない）
+        import uvicorn
+        if share:
+            print("警告: --metrics 指定時は共有リンクを作成しません")
+        print(f"メトリクス: http://{host}:{port}{METRICS_CONFIG['path']}")
+        uvicorn.run(create_server(app), host=host, port=port, log_level="debug" if debug else "info")
+    else:
+        app.launch(
+            server_name=host,
+            server_port=port,
+            share=share,
+            debug=debug
+        )
\ No newline at end of file
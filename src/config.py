@@ -8,12 +8,20 @@ SERVER_CONFIG = {
     'port': 7861,         # デフォルトポート
     'share': False,       # 共有リンク生成有無
     'debug': False,       # デバッグモード
+    'concurrency_limit': 4,  # イベントごとの同時実行数（Gradio の既定値は1）
 }
 
 # データベース設定
 DATABASE_CONFIG = {
     #'path': 'X:/LightningNetwork/lightning-node-db/data/lightning_node.db',
     'path': 'D:/PY2015/lightning-node-db/data/lightning_node.db',
+    'mmap_size': 256 * 1024 * 1024,  # 読み取り専用接続の mmap サイズ (bytes)
+    'busy_timeout': 5.0,             # ロック待ちのタイムアウト (秒)
+    'sidecar_path': 'data/viewer_cache.db',  # ビューア用の集計データ等を保存するDB
+    'max_workers': 4,                # DB アクセス用スレッドプールのスレッド数
+    'read_chunk_rows': 50000,        # 時系列データを読み込むときに1回に取り出す行数（0 なら一括、読み込み中のメモリ使用量を抑える）
+    'epoch_index': False,            # サイドカーDBの整数の日時インデックスで期間を絞り込む（date の文字列解析を省く、作成はバックグラウンド更新のみ）
+    'epoch_chunk_rows': 200000,      # インデックス作成時に1回に読み込む行数
 }
 
 # チャート設定
@@ -27,6 +35,79 @@ CHART_CONFIG = {
         'amboss': 'teal',
     },
     'max_points': 500,  # 表示する最大データポイント数
+    'webgl_threshold': 400,   # 間引いた後の点数がこれを超えるチャートは WebGL (Scattergl) で描画（max_points より小さくする）
+    'render_mode': 'separate',  # 'separate': チャートごとに表示, 'combined': 1つの図にまとめて表示
+    'figure_builder': 'dict',  # 'dict': 検証なしで図の JSON を直接作成, 'plotly': go.Figure で作成
+    'compare_max_channels': 8,  # 比較チャートで重ねて表示できる最大チャンネル数
+    # チャートごとの間引き方式 ('lttb': 連続値, 'minmax': ステップ系列, 'none': 間引かない)
+    'downsample': {
+        'local_balance_ratio': 'lttb',
+        'local_fee': 'minmax',
+        'local_infee': 'minmax',
+        'remote_fee': 'minmax',
+        'remote_infee': 'minmax',
+        'amboss_fee': 'minmax',
+        'active': 'minmax',
+    },
+}
+
+# チャンネルごとの統計（残高変化・手数料変更回数・稼働率）の設定
+STATS_CONFIG = {
+    'enabled': True,           # サイドカーDBに統計を保持し、チャンネル一覧に表示する
+    'refresh_interval': 60,    # 統計を更新する最短間隔 (秒)
+    'chunk_rows': 200000,      # 1回に読み込む channel_datas の行数（初回の集計時のメモリ使用量を抑える）
+}
+
+# イベント（手数料変更・残高の大きな変化・オフライン/オンライン）の抽出設定
+EVENTS_CONFIG = {
+    'enabled': True,                  # サイドカーDBにイベントを抽出し、チャートに注釈として表示する
+    'balance_jump_pct': 10,           # 1回の変化が容量のこの割合 (%) 以上ならリバランス相当の変化とみなす
+    'balance_jump_min_sats': 100000,  # 上記の閾値の最小値 (sat)
+    'chunk_rows': 200000,             # 1回に読み込む channel_datas の行数
+}
+
+# Parquet スナップショットの設定（python src/export_parquet.py で書き出す、pyarrow が必要）
+PARQUET_CONFIG = {
+    'enabled': False,          # 時系列データの締まった月を Parquet から読む
+    'path': 'data/parquet',    # 書き出し先のディレクトリ
+    'chunk_rows': 200000,      # 書き出し時に1回に読み込む channel_datas の行数
+}
+
+# チャンネル一覧の表示設定
+TABLE_CONFIG = {
+    'page_size': 50,                    # 1ページに表示するチャンネル数
+    'page_sizes': [25, 50, 100, 500],   # 選択できるページサイズ
+}
+
+# ノード全体（フリート）タブの設定
+FLEET_CONFIG = {
+    'max_buckets': 400,   # 推移チャートの最大バケット数（期間に応じて 1時間/6時間/1日/1週間 から選ぶ）
+    'ratio_bins': 10,     # 残高比率の分布のビン数
+    'present_hours': 24,  # 最新行からこの時間以内に記録のあるチャンネルを現在のチャンネルとして数える
+}
+
+# キャッシュ設定
+CACHE_CONFIG = {
+    'series_max_channels': 32,  # 時系列データをキャッシュする最大チャンネル数
+    'column_store': False,      # channel_datas 全体を列指向でメモリに保持する（チャンネル数が多いノード向け）
+    'figure_cache': True,                   # 作成済みのチャートを (チャンネル, 期間, 最新行の日時) ごとに再利用する
+    'figure_max_entries': 64,               # キャッシュするチャートの組数（1組 = 1回の表示分）
+    'figure_max_bytes': 64 * 1024 * 1024,   # キャッシュするチャートの JSON の合計サイズの上限
+}
+
+# 長期間表示の集計設定
+ROLLUP_CONFIG = {
+    'enabled': True,          # 長期間はSQL側でバケット集計したデータを使う（False なら読み込みながら集計する）
+    'raw_max_days': 31,       # この日数以下は生データを表示
+    'hourly_max_days': 180,   # この日数以下は1時間単位、超える場合は1日単位で集計
+    'materialize': False,     # サイドカーDBに集計テーブルを保持して差分更新する
+    'refresh_interval': 60,   # 集計テーブルの更新間隔 (秒)
+}
+
+# バックグラウンド更新設定
+SCHEDULER_CONFIG = {
+    'enabled': True,  # DB を定期的に確認し、最新データとチャート用キャッシュを事前に更新する
+    'interval': 60,   # 確認間隔 (秒)。開いている画面もこの間隔で更新する
 }
 
 # ログ設定
@@ -35,6 +116,14 @@ LOG_CONFIG = {
     'file': 'logs/app.log',
 }
 
+# メトリクス設定
+METRICS_CONFIG = {
+    'enabled': False,     # /metrics エンドポイントを公開するか（--metrics でも有効化）
+    'path': '/metrics',   # エンドポイントのパス
+    # 処理時間ヒストグラムのバケット境界 (秒)
+    'buckets': [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+}
+
 # Configuration settings for the Gradio application
 
 GRADIO_TITLE = "Lightning Node Viewer"
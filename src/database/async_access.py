@@ -0,0 +1,39 @@
+"""
+非同期ハンドラ用のデータアクセス
+
+sqlite3 と pandas の処理は同期処理のため、上限付きのスレッドプールで実行し、
+イベントループをブロックせずに複数セッションの処理を並行させる。
+接続はスレッドごとに作成されるため、同時に開く接続数もスレッド数で抑えられる。
+"""
+import asyncio
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config import DATABASE_CONFIG
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_db_executor():
+    """DB アクセス用のスレッドプールを取得する（初回呼び出し時に作成）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DATABASE_CONFIG.get('max_workers', 4),
+                thread_name_prefix='db'
+            )
+        return _executor
+
+async def run_db(fn, *args, **kwargs):
+    """同期のデータアクセス関数をスレッドプールで実行し、結果を待つ"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(fn, *args, **kwargs))
+
+def shutdown_db_executor(wait=True):
+    """スレッドプールを終了する"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -0,0 +1,65 @@
+import functools
+import threading
+from database.connector import open_read_only, resolve_db_path
+
+class ChangeDetector:
+    """
+    DB の変更を PRAGMA data_version で検出する
+    
+    data_version は同じ接続で読む限り、他の接続（lightning-node-db）がコミットするたびに
+    値が変わる。そのため専用の接続を1つ持ち、1回の PRAGMA で変更の有無を判定する。
+    """
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = open_read_only(db_path)
+        self._lock = threading.Lock()
+    
+    def version(self):
+        """現在のデータバージョンを返す（前回と異なれば DB が更新されている）"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+# DB パスごとの検出器
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+def get_change_detector(db_path=None):
+    """DB パスに対応する変更検出器を取得する"""
+    db_path = resolve_db_path(db_path)
+    with _detectors_lock:
+        detector = _detectors.get(db_path)
+        if detector is None:
+            detector = _detectors[db_path] = ChangeDetector(db_path)
+        return detector
+
+def get_db_version(db_path=None):
+    """DB の現在のデータバージョンを返す"""
+    return get_change_detector(db_path).version()
+
+def cached_by_data_version(fn):
+    """
+    db_path を第1引数に取る関数の結果を、DB のデータバージョンが変わるまで再利用するデコレータ
+    
+    結果は (db_path, 残りの引数) ごとに保持する。DB に変更がなければ
+    PRAGMA data_version を1回実行するだけで前回の結果を返す。
+    """
+    cache = {}
+    lock = threading.Lock()
+    
+    @functools.wraps(fn)
+    def wrapper(db_path=None, *args):
+        db_path = resolve_db_path(db_path)
+        key = (db_path, *args)
+        version = get_db_version(db_path)
+        with lock:
+            cached = cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        result = fn(db_path, *args)
+        with lock:
+            cache[key] = (version, result)
+        return result
+    
+    return wrapper
@@ -0,0 +1,109 @@
+import time
+import pandas as pd
+from config import DATABASE_CONFIG
+from utils.metrics import observe, span
+
+# channel_datas の数値カラムと読み込み時の型
+#   残高・更新回数: int64 (sat / 回), 手数料: int32 (ppm / sat), active: bool
+CHANNEL_DATA_DTYPES = {
+    'local_balance': 'int64',
+    'local_fee': 'int32',
+    'local_infee': 'int32',
+    'remote_balance': 'int64',
+    'remote_fee': 'int32',
+    'remote_infee': 'int32',
+    'num_updates': 'int64',
+    'amboss_fee': 'int32',
+    'active': 'bool',
+}
+
+# 異常な極端値を除去するための手数料の範囲 (最小, 最大)
+FEE_LIMITS = {
+    # 手数料率はゼロ以上、100万ppm(100%)以下
+    'local_fee': (0, 1000000),
+    'remote_fee': (0, 1000000),
+    'amboss_fee': (0, 1000000),
+    # 入金/出金手数料はマイナス値も許容（出金の場合）
+    'local_infee': (-1000000, 1000000),
+    'remote_infee': (-1000000, 1000000),
+}
+
+def channel_data_expr(column, alias=None):
+    """
+    数値カラムを読み込むための SELECT 式を返す
+    
+    NULL や数値でない値は 0 にし、手数料は FEE_LIMITS の範囲に収める。
+    SQLite 側で値を確定させておくことで、読み込み時に dtype を直接指定できる。
+    """
+    ref = f"{alias}.{column}" if alias else column
+    expr = f"CAST(COALESCE({ref}, 0) AS INTEGER)"
+    if column in FEE_LIMITS:
+        low, high = FEE_LIMITS[column]
+        expr = f"MIN(MAX({expr}, {low}), {high})"
+    return expr
+
+def channel_data_select(alias=None):
+    """channel_datas の全数値カラムの SELECT 句を返す"""
+    return ",\n        ".join(
+        f"{channel_data_expr(column, alias)} AS {column}" for column in CHANNEL_DATA_DTYPES
+    )
+
+def iter_channel_datas(conn, query, params=(), dtype=None, chunk_rows=None, name='channel_datas'):
+    """
+    クエリ結果を chunk_rows 行ずつ型付きの DataFrame として返すジェネレータ
+    
+    カーソルから chunk_rows 行ずつ取り出すため、読み込み中に Python のタプルとして保持するのは
+    1チャンク分の行だけになる（一括の read_sql_query は全行のタプルのリストを作ってから変換する）。
+    型と date の変換は read_channel_datas と同じ。処理時間は全チャンクの合計を name で記録する。
+    
+    Args:
+        chunk_rows: 1回に取り出す行数（未指定なら DATABASE_CONFIG['read_chunk_rows']）
+    
+    Yields:
+        (DataFrame, チャンクの最終行の date の文字列)（結果が空なら空の DataFrame と None を1回）
+    """
+    chunk_rows = chunk_rows or DATABASE_CONFIG['read_chunk_rows']
+    sql_seconds = transform_seconds = 0.0
+    try:
+        start = time.perf_counter()
+        chunks = pd.read_sql_query(query, conn, params=params, chunksize=chunk_rows,
+                                   dtype={**CHANNEL_DATA_DTYPES, **(dtype or {})})
+        for df in chunks:
+            middle = time.perf_counter()
+            sql_seconds += middle - start
+            last_date = df['date'].iloc[-1] if not df.empty else None
+            df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+            transform_seconds += time.perf_counter() - middle
+            yield df, last_date
+            start = time.perf_counter()
+    finally:
+        observe('sql', name, sql_seconds)
+        observe('transform', name, transform_seconds)
+
+def read_channel_datas(conn, query, params=(), dtype=None, name='channel_datas', chunk_rows=None):
+    """
+    クエリ結果を型付きの DataFrame として読み込む
+    
+    数値カラムは CHANNEL_DATA_DTYPES（と dtype で追加した型）で読み込み、
+    date は datetime64 に変換する。クエリと変換の処理時間は name で記録する。
+    DATABASE_CONFIG['read_chunk_rows']（または chunk_rows）が正なら iter_channel_datas で
+    チャンクごとに型付きの配列にしてから連結し、読み込み中のメモリ使用量を抑える。
+    
+    Returns:
+        (DataFrame, 最終行の date の文字列 または None)
+    """
+    if chunk_rows or DATABASE_CONFIG['read_chunk_rows']:
+        frames, last_date = [], None
+        for df, last_date in iter_channel_datas(conn, query, params, dtype, chunk_rows, name):
+            frames.append(df)
+        if len(frames) == 1:
+            return frames[0], last_date
+        with span('transform', f"{name}_concat"):
+            return pd.concat(frames, ignore_index=True), last_date
+    
+    with span('sql', name):
+        df = pd.read_sql_query(query, conn, params=params, dtype={**CHANNEL_DATA_DTYPES, **(dtype or {})})
+    with span('transform', name):
+        last_date = df['date'].iloc[-1] if not df.empty else None
+        df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+    return df, last_date
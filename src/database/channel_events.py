@@ -0,0 +1,221 @@
+"""
+channel_datas から手数料変更・残高の大きな変化・オフライン/オンラインのイベントを抽出する
+
+channel_datas の新しい行（rowid が前回より大きい行）だけをチャンクごとに読み、
+同じチャンネルの直前の行との差分からイベントを求めてサイドカーDBの channel_events に追加する。
+チャートの注釈や一覧は channel_events を (channel_id, date) のインデックスで引くため、
+生の履歴を読み直さずに済む。
+"""
+import numpy as np
+import pandas as pd
+from config import EVENTS_CONFIG
+from database.channel_datas import channel_data_expr
+from database.sidecar import SidecarStore, SidecarRegistry
+from utils.metrics import span
+
+# イベントの種類と表示名
+EVENT_TYPES = {
+    'local_fee': "ﾛｰｶﾙ手数料変更",
+    'local_infee': "ﾛｰｶﾙ入金手数料変更",
+    'balance_jump': "残高の大きな変化",
+    'offline': "オフライン",
+    'online': "オンライン",
+}
+
+# 差分を取るカラム（channel_events_last に直前の値を保存する）
+TRACKED_COLUMNS = ['local_fee', 'local_infee', 'local_balance', 'active']
+
+class ChannelEventStore(SidecarStore):
+    """
+    サイドカーDBに保持するチャンネルのイベント
+
+    チャンク・更新をまたぐ比較のため、チャンネルごとの最後の値を channel_events_last に保存する。
+    events() は読み取り専用の別の接続で読むため、初回の全履歴の取り込み中もチャートの作成は待たされない。
+    """
+
+    NAME = "イベントの抽出"
+    STATE_TABLE = 'channel_events_state'
+    TABLES = ('channel_events', 'channel_events_last')
+
+    def _create_tables(self):
+        """イベントテーブルを作成する"""
+        self._conn.executescript("""
+        CREATE TABLE IF NOT EXISTS channel_events (
+            channel_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            old_value INTEGER,
+            new_value INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_channel_events_channel_date ON channel_events (channel_id, date);
+        CREATE INDEX IF NOT EXISTS idx_channel_events_type_date ON channel_events (event_type, date);
+        CREATE TABLE IF NOT EXISTS channel_events_last (
+            channel_id TEXT PRIMARY KEY,
+            local_fee INTEGER,
+            local_infee INTEGER,
+            local_balance INTEGER,
+            active INTEGER
+        );
+        """)
+
+    def _read_new_rows(self, last_rowid, limit):
+        """前回より新しい行を容量とともに rowid 順に最大 limit 行読む"""
+        columns = ",\n            ".join(f"{channel_data_expr(column, 'cd')} AS {column}" for column in TRACKED_COLUMNS)
+        query = f"""
+        SELECT
+            cd.rowid AS row_id,
+            cd.channel_id,
+            cd.date,
+            {columns},
+            COALESCE(cl.capacity, 0) AS capacity
+        FROM
+            src.channel_datas cd
+        LEFT JOIN
+            src.channel_lists cl ON cl.channel_id = cd.channel_id
+        WHERE
+            cd.rowid > ?
+        ORDER BY
+            cd.rowid
+        LIMIT ?
+        """
+        with span('sql', 'channel_events'):
+            return pd.read_sql_query(query, self._conn, params=(last_rowid, limit), dtype={
+                'row_id': 'int64', 'capacity': 'int64', **{column: 'int64' for column in TRACKED_COLUMNS},
+            })
+
+    def _ingest(self, rows):
+        """読み込んだ行からイベントを求めて追加する（トランザクション内で呼ぶ）"""
+        with span('transform', 'channel_events'):
+            # チャンネルごとに rowid 順を保ったまま並べる
+            codes, channel_ids = pd.factorize(rows['channel_id'])
+            order = np.argsort(codes, kind='stable')
+            codes = codes[order]
+            rows = rows.iloc[order].reset_index(drop=True)
+
+            # 各チャンネルの直前の値（前回の更新までの最後の行）
+            last = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    f"SELECT channel_id, {', '.join(TRACKED_COLUMNS)} FROM channel_events_last")
+            }
+            first = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            stored = [last.get(channel_ids[code]) for code in codes[first]]
+
+            channel_column = rows['channel_id'].to_numpy()
+            date_column = rows['date'].to_numpy()
+            previous = {}
+            for index, column in enumerate(TRACKED_COLUMNS):
+                values = rows[column].to_numpy()
+                shifted = np.r_[values[:1], values[:-1]]
+                # チャンネルの先頭行は保存済みの最後の値と比較する（なければ変化なしとする）
+                shifted[first] = [
+                    value if saved is None else saved[index] for saved, value in zip(stored, values[first])
+                ]
+                previous[column] = shifted
+
+            # 残高の変化の閾値: 容量の balance_jump_pct %（最低 balance_jump_min_sats）
+            threshold = np.maximum(rows['capacity'].to_numpy() * EVENTS_CONFIG['balance_jump_pct'] / 100,
+                                   EVENTS_CONFIG['balance_jump_min_sats'])
+            active = rows['active'].to_numpy() != 0
+            was_active = previous['active'] != 0
+            balance = rows['local_balance'].to_numpy()
+            masks = {
+                'local_fee': rows['local_fee'].to_numpy() != previous['local_fee'],
+                'local_infee': rows['local_infee'].to_numpy() != previous['local_infee'],
+                'balance_jump': np.abs(balance - previous['local_balance']) >= threshold,
+                'offline': was_active & ~active,
+                'online': ~was_active & active,
+            }
+            source_columns = {'local_fee': 'local_fee', 'local_infee': 'local_infee',
+                              'balance_jump': 'local_balance', 'offline': 'active', 'online': 'active'}
+
+            events = []
+            for event_type, mask in masks.items():
+                positions = np.flatnonzero(mask)
+                if positions.size == 0:
+                    continue
+                column = source_columns[event_type]
+                events.append(pd.DataFrame({
+                    'channel_id': channel_column[positions],
+                    'date': date_column[positions],
+                    'event_type': event_type,
+                    'old_value': previous[column][positions],
+                    'new_value': rows[column].to_numpy()[positions],
+                }))
+            last_rows = rows.iloc[np.r_[first[1:] - 1, len(rows) - 1]]
+
+        if events:
+            self._conn.executemany(
+                "INSERT INTO channel_events (channel_id, date, event_type, old_value, new_value) VALUES (?, ?, ?, ?, ?)",
+                pd.concat(events, ignore_index=True).itertuples(index=False, name=None),
+            )
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO channel_events_last (channel_id, {', '.join(TRACKED_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+            last_rows[['channel_id', *TRACKED_COLUMNS]].itertuples(index=False, name=None),
+        )
+        # rows はチャンネル順に並べ替え済みのため、最後の行ではなく最大の date を記録する
+        self._set_state('last_date', rows['date'].max())
+        return sum(len(frame) for frame in events)
+
+    def refresh(self):
+        """
+        新しい行からイベントを抽出して追加する
+
+        Returns:
+            追加したイベント数
+        """
+        return self._ingest_new_rows(self._read_new_rows, self._ingest, EVENTS_CONFIG['chunk_rows'])
+
+    def ingested_until(self):
+        """イベントを抽出済みの最後の行の date（まだなければ None）"""
+        return self._read_state('last_date')
+
+    def events(self, channel_id=None, start_date=None, event_types=None, limit=None):
+        """
+        イベントを date 順に取得する
+
+        Args:
+            channel_id: チャンネルID（None なら全チャンネル）
+            start_date: 取得開始日（None なら全期間）
+            event_types: イベントの種類のリスト（None なら全種類）
+            limit: 最大件数（新しいものから数える、None なら制限なし）
+
+        Returns:
+            channel_id, date (datetime64), event_type, old_value, new_value の DataFrame
+        """
+        conditions, params = [], []
+        if channel_id is not None:
+            conditions.append("channel_id = ?")
+            params.append(channel_id)
+        if start_date is not None:
+            conditions.append("date >= ?")
+            params.append(start_date)
+        if event_types:
+            conditions.append(f"event_type IN ({', '.join('?' * len(event_types))})")
+            params.extend(event_types)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+        SELECT channel_id, date, event_type, old_value, new_value
+        FROM (
+            SELECT channel_id, date, event_type, old_value, new_value
+            FROM channel_events
+            {where}
+            ORDER BY date DESC
+            {'LIMIT ?' if limit else ''}
+        )
+        ORDER BY date
+        """
+        if limit:
+            params.append(limit)
+        with span('sql', 'channel_events_query'):
+            df = pd.read_sql_query(query, self._reader(), params=params,
+                                   dtype={'old_value': 'int64', 'new_value': 'int64'})
+        df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+        return df
+
+# DB パスごとのイベントストア
+_event_stores = SidecarRegistry(ChannelEventStore)
+
+def get_channel_event_store(db_path=None):
+    """DB パスに対応するイベントストアを取得する"""
+    return _event_stores.get(db_path)
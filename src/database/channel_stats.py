@@ -0,0 +1,219 @@
+"""
+チャンネルごとの統計（残高の変化、手数料変更回数、稼働率）をサイドカーDBに保持する
+
+channel_datas の新しい行（rowid が前回より大きい行）だけを読み、チャンネル・日ごとの
+集計 (channel_daily_stats) に加算する。一覧表示用の統計 (channel_summary) は
+直近30日分の日次集計から作り直すため、チャンネル数 × 30 行程度の処理で済む。
+"""
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from config import STATS_CONFIG
+from database.channel_datas import channel_data_expr
+from database.sidecar import SidecarStore, SidecarRegistry
+from utils.metrics import span
+
+# 一覧表示用の統計カラムと表示名
+SUMMARY_COLUMNS = {
+    'balance_drift_7d': "7日残高変化",
+    'local_fee_changes_30d': "30日ﾛｰｶﾙ手数料変更",
+    'remote_fee_changes_30d': "30日ﾘﾓｰﾄ手数料変更",
+    'active_pct_30d': "30日稼働率(%)",
+}
+
+SUMMARY_QUERY = """
+SELECT
+    s.channel_id,
+    (SELECT last_balance FROM channel_daily_stats
+     WHERE channel_id = s.channel_id ORDER BY day DESC LIMIT 1)
+    - (SELECT first_balance FROM channel_daily_stats
+       WHERE channel_id = s.channel_id AND day >= :day_7d ORDER BY day LIMIT 1) AS balance_drift_7d,
+    SUM(s.local_fee_changes) AS local_fee_changes_30d,
+    SUM(s.remote_fee_changes) AS remote_fee_changes_30d,
+    ROUND(100.0 * SUM(s.active_samples) / SUM(s.samples), 1) AS active_pct_30d
+FROM
+    channel_daily_stats s
+WHERE
+    s.day >= :day_30d
+GROUP BY
+    s.channel_id
+"""
+
+class ChannelStatsStore(SidecarStore):
+    """
+    サイドカーDBに保持するチャンネルごとの統計
+
+    手数料変更は同じチャンネルの直前の行との比較で数え、チャンク・更新をまたぐ比較のために
+    チャンネルごとの最後の手数料を channel_stats_last に保存する。
+    summary() は読み取り専用の別の接続で読むため、初回の全履歴の取り込み中も
+    一覧の表示は待たされない（取り込み済みの分までの統計を返す）。
+    """
+
+    NAME = "チャンネル統計"
+    STATE_TABLE = 'channel_stats_state'
+    TABLES = ('channel_daily_stats', 'channel_stats_last', 'channel_summary')
+
+    def __init__(self, db_path, sidecar_path):
+        self._last_refresh = 0.0
+        super().__init__(db_path, sidecar_path)
+
+    def _create_tables(self):
+        """統計テーブルを作成する"""
+        self._conn.executescript("""
+        CREATE TABLE IF NOT EXISTS channel_daily_stats (
+            channel_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            first_balance INTEGER,
+            last_balance INTEGER,
+            local_fee_changes INTEGER,
+            remote_fee_changes INTEGER,
+            active_samples INTEGER,
+            samples INTEGER,
+            PRIMARY KEY (channel_id, day)
+        );
+        CREATE TABLE IF NOT EXISTS channel_stats_last (
+            channel_id TEXT PRIMARY KEY,
+            local_fee INTEGER,
+            remote_fee INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS channel_summary (
+            channel_id TEXT PRIMARY KEY,
+            balance_drift_7d INTEGER,
+            local_fee_changes_30d INTEGER,
+            remote_fee_changes_30d INTEGER,
+            active_pct_30d REAL
+        );
+        """)
+
+    def _read_new_rows(self, last_rowid, limit):
+        """前回より新しい行を rowid 順に最大 limit 行読む"""
+        query = f"""
+        SELECT
+            rowid AS row_id,
+            channel_id,
+            substr(date, 1, 10) AS day,
+            {channel_data_expr('local_balance')} AS local_balance,
+            {channel_data_expr('local_fee')} AS local_fee,
+            {channel_data_expr('remote_fee')} AS remote_fee,
+            {channel_data_expr('active')} AS active
+        FROM
+            src.channel_datas
+        WHERE
+            rowid > ?
+        ORDER BY
+            rowid
+        LIMIT ?
+        """
+        with span('sql', 'channel_stats'):
+            return pd.read_sql_query(query, self._conn, params=(last_rowid, limit), dtype={
+                'row_id': 'int64', 'local_balance': 'int64', 'local_fee': 'int64',
+                'remote_fee': 'int64', 'active': 'int64',
+            })
+
+    def _ingest(self, rows):
+        """読み込んだ行を日次集計に加算する（トランザクション内で呼ぶ）"""
+        with span('transform', 'channel_stats'):
+            # チャンネルごとに rowid 順を保ったまま並べる
+            codes, channel_ids = pd.factorize(rows['channel_id'])
+            order = np.argsort(codes, kind='stable')
+            codes = codes[order]
+            rows = rows.iloc[order].reset_index(drop=True)
+
+            # 各チャンネルの直前の手数料（前回の更新までの最後の値）
+            last = {
+                channel_id: (local_fee, remote_fee)
+                for channel_id, local_fee, remote_fee in self._conn.execute(
+                    "SELECT channel_id, local_fee, remote_fee FROM channel_stats_last")
+            }
+            first = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+            stored = [last.get(channel_ids[code]) for code in codes[first]]
+
+            changes = {}
+            for column, index in (('local_fee', 0), ('remote_fee', 1)):
+                values = rows[column].to_numpy()
+                previous = np.r_[values[:1], values[:-1]]
+                # チャンネルの先頭行は保存済みの最後の値と比較する（なければ変更なしとする）
+                previous[first] = [
+                    value if saved is None else saved[index] for saved, value in zip(stored, values[first])
+                ]
+                changes[column] = (values != previous).astype(np.int64)
+
+            rows = rows.assign(
+                local_fee_changes=changes['local_fee'],
+                remote_fee_changes=changes['remote_fee'],
+            )
+            daily = rows.groupby(['channel_id', 'day'], sort=False).agg(
+                first_balance=('local_balance', 'first'),
+                last_balance=('local_balance', 'last'),
+                local_fee_changes=('local_fee_changes', 'sum'),
+                remote_fee_changes=('remote_fee_changes', 'sum'),
+                active_samples=('active', 'sum'),
+                samples=('active', 'size'),
+            ).reset_index()
+            last_rows = rows.iloc[np.r_[first[1:] - 1, len(rows) - 1]]
+
+        self._conn.executemany("""
+        INSERT INTO channel_daily_stats
+            (channel_id, day, first_balance, last_balance, local_fee_changes, remote_fee_changes, active_samples, samples)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (channel_id, day) DO UPDATE SET
+            last_balance = excluded.last_balance,
+            local_fee_changes = local_fee_changes + excluded.local_fee_changes,
+            remote_fee_changes = remote_fee_changes + excluded.remote_fee_changes,
+            active_samples = active_samples + excluded.active_samples,
+            samples = samples + excluded.samples
+        """, daily.itertuples(index=False, name=None))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO channel_stats_last (channel_id, local_fee, remote_fee) VALUES (?, ?, ?)",
+            last_rows[['channel_id', 'local_fee', 'remote_fee']].itertuples(index=False, name=None),
+        )
+        return len(rows)
+
+    def _rebuild_summary(self, today):
+        """直近の日次集計から一覧表示用の統計を作り直す"""
+        day_7d = (today - timedelta(days=7)).strftime("%Y-%m-%d")
+        day_30d = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+        self._conn.execute("DELETE FROM channel_summary")
+        self._conn.execute(
+            f"INSERT INTO channel_summary ({', '.join(['channel_id', *SUMMARY_COLUMNS])}) {SUMMARY_QUERY}",
+            {'day_7d': day_7d, 'day_30d': day_30d},
+        )
+        self._set_state('summary_day', today.strftime("%Y-%m-%d"))
+
+    def refresh(self):
+        """
+        新しい行を日次集計に加算し、一覧表示用の統計を更新する
+
+        Returns:
+            加算した行数
+        """
+        today = datetime.now()
+        total = self._ingest_new_rows(self._read_new_rows, self._ingest, STATS_CONFIG['chunk_rows'])
+
+        # 新しい行があったか、日付が変わって集計期間がずれた場合に作り直す
+        with self._lock:
+            if total or self._get_state('summary_day', None) != today.strftime("%Y-%m-%d"):
+                with self._conn:
+                    self._rebuild_summary(today)
+        self._last_refresh = time.monotonic()
+        return total
+
+    def refresh_in_background(self):
+        """更新の間隔（STATS_CONFIG['refresh_interval']）が過ぎていれば別スレッドで refresh() を始める"""
+        if time.monotonic() - self._last_refresh < STATS_CONFIG['refresh_interval']:
+            return
+        super().refresh_in_background()
+
+    def summary(self):
+        """チャンネルごとの統計を DataFrame で返す（channel_id と SUMMARY_COLUMNS のカラム）"""
+        return pd.read_sql_query(
+            f"SELECT {', '.join(['channel_id', *SUMMARY_COLUMNS])} FROM channel_summary", self._reader()
+        )
+
+# DB パスごとの統計ストア
+_stats_stores = SidecarRegistry(ChannelStatsStore)
+
+def get_channel_stats_store(db_path=None):
+    """DB パスに対応する統計ストアを取得する"""
+    return _stats_stores.get(db_path)
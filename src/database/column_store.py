@@ -0,0 +1,275 @@
+import threading
+import numpy as np
+import pandas as pd
+from database.connector import get_connection, resolve_db_path
+from database.channel_datas import CHANNEL_DATA_DTYPES, channel_data_select
+from database.change_detector import get_db_version
+from utils.metrics import span
+
+# 並び替えキーの構成: (チャンネル番号 << 34) | epoch 秒（2^34 秒 ≒ 西暦2514年まで）
+_KEY_SHIFT = 34
+
+# 追加分のセグメントの合計行数が本体の行数のこの割合を超えたら本体に統合する
+_MERGE_RATIO = 0.25
+# 追加分のセグメント数の上限（超えたらセグメント同士を1つにまとめる）
+_MAX_SEGMENTS = 16
+
+class _Segment:
+    """(channel_id, date) 順に並んだ行の列配列"""
+    
+    def __init__(self, keys, codes, dates, columns, channel_count):
+        self.keys = keys        # 並び替えキー (int64, 昇順)
+        self.codes = codes      # チャンネル番号 (int32)
+        self.dates = dates      # date (datetime64[ns])
+        self.columns = columns  # {カラム名: ndarray}
+        # チャンネル番号 i の行は offsets[i]:offsets[i + 1]
+        self.offsets = np.searchsorted(codes, np.arange(channel_count + 1)).astype(np.int64)
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def bounds(self, code):
+        """チャンネル番号の行の範囲 (lo, hi)（このセグメントの作成後に採番されたチャンネルは空）"""
+        if code + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[code], self.offsets[code + 1]
+
+def _sorted_segment(keys, codes, dates, columns, channel_count):
+    """並び替えキー順に並べ替えてセグメントを作成する"""
+    order = np.argsort(keys, kind='stable')
+    return _Segment(keys[order], codes[order], dates[order],
+                    {col: values[order] for col, values in columns.items()}, channel_count)
+
+def _merge_segments(segments, channel_count):
+    """複数のセグメントを1つにまとめる（追加分のセグメント同士の統合用）"""
+    return _sorted_segment(
+        np.concatenate([segment.keys for segment in segments]),
+        np.concatenate([segment.codes for segment in segments]),
+        np.concatenate([segment.dates for segment in segments]),
+        {col: np.concatenate([segment.columns[col] for segment in segments]) for col in CHANNEL_DATA_DTYPES},
+        channel_count,
+    )
+
+def _insert_segment(base, segment, channel_count):
+    """並び替え済みのセグメントを本体の並びに挿入する（本体全体をコピーする）"""
+    positions = np.searchsorted(base.keys, segment.keys, side='right')
+    return _Segment(
+        np.insert(base.keys, positions, segment.keys),
+        np.insert(base.codes, positions, segment.codes),
+        np.insert(base.dates, positions, segment.dates),
+        {col: np.insert(base.columns[col], positions, segment.columns[col]) for col in CHANNEL_DATA_DTYPES},
+        channel_count,
+    )
+
+class _Snapshot:
+    """ある時点のストア内容（更新時は丸ごと差し替える）"""
+    
+    def __init__(self, base, segments, max_rowid):
+        self.base = base            # 統合済みの本体 (_Segment)
+        self.segments = segments    # 本体に未統合の追加分 (_Segment のタプル、古い順)
+        self.max_rowid = max_rowid
+    
+    def parts(self):
+        """本体と追加分のセグメント（古い順）"""
+        return (self.base, *self.segments)
+
+class ChannelColumnStore:
+    """
+    channel_datas 全体を (channel_id, date) 順の NumPy 列配列として保持するストア
+    
+    チャンネルごとの開始位置（offsets）を持つため、任意のチャンネル・期間の切り出しは
+    配列のスライス（コピーなしのビュー）になる。refresh() は DB の最大 rowid より
+    新しい行だけを読み込み、並べ替えた追加分のセグメントとして保持する。
+    追加分の合計が本体の _MERGE_RATIO を超えたときだけ本体に統合するため、
+    本体全体のコピーは行数が一定の割合増えるごとに1回になる（1行あたりの更新コストは償却 O(1)）。
+    """
+    
+    def __init__(self, db_path=None):
+        self.db_path = resolve_db_path(db_path)
+        self._lock = threading.Lock()
+        self._channel_ids = []  # チャンネル番号 -> channel_id
+        self._codes = {}        # channel_id -> チャンネル番号
+        self._data_version = None  # 最後に新しい行を確認したときの DB のデータバージョン
+        self._snapshot = _Snapshot(
+            base=_Segment(
+                keys=np.empty(0, dtype=np.int64),
+                codes=np.empty(0, dtype=np.int32),
+                dates=np.empty(0, dtype='datetime64[ns]'),
+                columns={col: np.empty(0, dtype=dtype) for col, dtype in CHANNEL_DATA_DTYPES.items()},
+                channel_count=0,
+            ),
+            segments=(),
+            max_rowid=0,
+        )
+    
+    def _code_for(self, channel_id):
+        """channel_id のチャンネル番号を取得する（未登録なら採番）"""
+        code = self._codes.get(channel_id)
+        if code is None:
+            code = self._codes[channel_id] = len(self._channel_ids)
+            self._channel_ids.append(channel_id)
+        return code
+    
+    def refresh(self):
+        """
+        前回読み込んだ最大 rowid より新しい行を読み込む
+        
+        DB のデータバージョンが前回から変わっていなければクエリを実行しない。
+        
+        Returns:
+            追加した行数
+        """
+        with self._lock:
+            # DB に変更がなければ何もしない
+            data_version = get_db_version(self.db_path)
+            if data_version == self._data_version:
+                return 0
+            
+            snapshot = self._snapshot
+            query = f"""
+            SELECT 
+                rowid AS row_id,
+                channel_id,
+                date,
+                {channel_data_select()}
+            FROM 
+                channel_datas
+            WHERE 
+                rowid > ?
+            """
+            with span('sql', 'column_store'):
+                new = pd.read_sql_query(
+                    query,
+                    get_connection(self.db_path),
+                    params=(snapshot.max_rowid,),
+                    dtype=CHANNEL_DATA_DTYPES,
+                )
+            self._data_version = data_version
+            if new.empty:
+                return 0
+            
+            with span('transform', 'column_store'):
+                new_codes = np.fromiter(
+                    (self._code_for(channel_id) for channel_id in new['channel_id']),
+                    dtype=np.int32,
+                    count=len(new),
+                )
+                new_dates = pd.to_datetime(new['date'], format='ISO8601').to_numpy(dtype='datetime64[ns]')
+                new_keys = (new_codes.astype(np.int64) << _KEY_SHIFT) | (new_dates.astype(np.int64) // 10**9)
+                channel_count = len(self._channel_ids)
+                
+                # 追加分は並べ替えてセグメントとして保持する（本体はコピーしない）
+                segment = _sorted_segment(new_keys, new_codes, new_dates,
+                                          {col: new[col].to_numpy() for col in CHANNEL_DATA_DTYPES},
+                                          channel_count)
+                base, segments = snapshot.base, snapshot.segments + (segment,)
+                if sum(len(part) for part in segments) > _MERGE_RATIO * len(base):
+                    # 追加分が本体に比べて十分大きくなったら本体に統合する
+                    base = _insert_segment(base, _merge_segments(segments, channel_count), channel_count)
+                    segments = ()
+                elif len(segments) > _MAX_SEGMENTS:
+                    segments = (_merge_segments(segments, channel_count),)
+            
+            self._snapshot = _Snapshot(base, segments, max_rowid=int(new['row_id'].max()))
+            return len(new)
+    
+    @property
+    def row_count(self):
+        """保持している行数"""
+        return sum(len(part) for part in self._snapshot.parts())
+    
+    def channel_frame(self, channel_id, start_date=None):
+        """
+        チャンネルの行を DataFrame として返す（配列はストアと共有するため変更しないこと）
+        
+        行が本体だけにある場合はスライス（ビュー）を返し、追加分のセグメントにもある場合は連結する。
+        
+        Args:
+            channel_id: チャンネルID
+            start_date: 開始日（省略時は全期間）
+        """
+        snapshot = self._snapshot
+        code = self._codes.get(channel_id)
+        if code is None:
+            return pd.DataFrame()
+        
+        start = None if start_date is None else np.datetime64(pd.Timestamp(start_date))
+        slices = []
+        for part in snapshot.parts():
+            lo, hi = part.bounds(code)
+            if start is not None:
+                lo += np.searchsorted(part.dates[lo:hi], start)
+            if lo < hi:
+                slices.append((part, lo, hi))
+        if not slices:
+            return pd.DataFrame()
+        
+        if len(slices) == 1:
+            part, lo, hi = slices[0]
+            data = {'date': part.dates[lo:hi]}
+            data.update({col: values[lo:hi] for col, values in part.columns.items()})
+            return pd.DataFrame(data, copy=False)
+        
+        dates = np.concatenate([part.dates[lo:hi] for part, lo, hi in slices])
+        columns = {col: np.concatenate([part.columns[col][lo:hi] for part, lo, hi in slices])
+                   for col in CHANNEL_DATA_DTYPES}
+        # 後から古い日時の行が追加された場合だけ並べ替える
+        if (dates[1:] < dates[:-1]).any():
+            order = np.argsort(dates, kind='stable')
+            dates = dates[order]
+            columns = {col: values[order] for col, values in columns.items()}
+        return pd.DataFrame({'date': dates, **columns}, copy=False)
+    
+    def latest_frame(self):
+        """チャンネルごとの最新行を DataFrame として返す"""
+        snapshot = self._snapshot
+        channel_count = len(self._channel_ids)
+        # チャンネルごとに最新行を持つ部分（本体・セグメント）とその位置
+        owner = np.full(channel_count, -1, dtype=np.int64)
+        position = np.zeros(channel_count, dtype=np.int64)
+        last_dates = np.full(channel_count, np.datetime64('NaT'), dtype='datetime64[ns]')
+        parts = snapshot.parts()
+        for index, part in enumerate(parts):
+            offsets = part.offsets
+            codes = np.flatnonzero(np.diff(offsets) > 0)
+            last = offsets[codes + 1] - 1
+            # 日時が同じ場合は後から追加された行を優先する
+            newer = np.isnat(last_dates[codes]) | (part.dates[last] >= last_dates[codes])
+            codes, last = codes[newer], last[newer]
+            owner[codes] = index
+            position[codes] = last
+            last_dates[codes] = part.dates[last]
+        
+        has_rows = np.flatnonzero(owner >= 0)
+        data = {
+            'channel_id': [self._channel_ids[code] for code in has_rows],
+            'date': last_dates[has_rows],
+        }
+        for col in CHANNEL_DATA_DTYPES:
+            values = np.empty(len(has_rows), dtype=parts[0].columns[col].dtype)
+            for index, part in enumerate(parts):
+                mask = owner[has_rows] == index
+                values[mask] = part.columns[col][position[has_rows][mask]]
+            data[col] = values
+        return pd.DataFrame(data)
+
+# DB パスごとのストア
+_column_stores = {}
+_column_stores_lock = threading.Lock()
+
+def get_column_store(db_path=None, refresh=True):
+    """
+    DB パスに対応するストアを取得する
+    
+    Args:
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+        refresh: 取得前に新しい行を読み込むか
+    """
+    db_path = resolve_db_path(db_path)
+    with _column_stores_lock:
+        store = _column_stores.get(db_path)
+        if store is None:
+            store = _column_stores[db_path] = ChannelColumnStore(db_path)
+    if refresh:
+        store.refresh()
+    return store
@@ -1,24 +1,107 @@
 import sqlite3
+import threading
+from pathlib import Path
+from config import DATABASE_CONFIG
 
-def connect_to_db(db_file):
-    """Connect to the SQLite database."""
-    conn = sqlite3.connect(db_file)
+# 最新スナップショット取得用の複合インデックス
+LATEST_INDEX_NAME = "idx_channel_datas_channel_id_date"
+
+# スレッドごとの読み取り専用接続 {db_path: connection}
+_thread_local = threading.local()
+
+# 全スレッドで開いた接続（終了時にまとめて閉じるため）
+_all_connections = []
+_all_connections_lock = threading.Lock()
+
+# close_all_connections() のたびに進め、他スレッドが閉じた接続を再利用しないようにする
+_generation = 0
+
+def resolve_db_path(db_path=None):
+    """DB パスを解決する（未指定なら DATABASE_CONFIG['path']）"""
+    return db_path or DATABASE_CONFIG['path']
+
+def read_only_uri(db_path):
+    """読み取り専用で開くための SQLite URI を作成する"""
+    return f"{Path(db_path).resolve().as_uri()}?mode=ro"
+
+def open_read_only(db_path):
+    """読み取り専用接続を開き、参照用の PRAGMA を設定する"""
+    # isolation_level=None（自動コミット）にして読み取りトランザクションを持ち越さない。
+    # WAL モードでは開きっぱなしのトランザクションが古いスナップショットを固定し、
+    # lightning-node-db 側のチェックポイントも妨げるため。
+    conn = sqlite3.connect(
+        read_only_uri(db_path),
+        uri=True,
+        isolation_level=None,
+        check_same_thread=False,
+        timeout=DATABASE_CONFIG.get('busy_timeout', 5.0),
+    )
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA mmap_size = {int(DATABASE_CONFIG.get('mmap_size', 0))}")
     return conn
 
-def fetch_channel_lists(conn):
-    """Fetch all channel lists from the database."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM channel_lists")
-    rows = cursor.fetchall()
-    return rows
+def get_connection(db_path=None):
+    """
+    現在のスレッド用の読み取り専用接続を取得する
+    
+    接続はスレッドごとに1つ作成され、以降の呼び出しでは再利用される。
+    
+    Args:
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+    """
+    db_path = resolve_db_path(db_path)
+    connections = getattr(_thread_local, 'connections', None)
+    if connections is None or _thread_local.generation != _generation:
+        connections = _thread_local.connections = {}
+        _thread_local.generation = _generation
+    
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = open_read_only(db_path)
+        connections[db_path] = conn
+        with _all_connections_lock:
+            _all_connections.append(conn)
+    return conn
+
+def close_all_connections():
+    """全スレッドの読み取り専用接続を閉じる"""
+    global _generation
+    with _all_connections_lock:
+        _generation += 1
+        for conn in _all_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _all_connections.clear()
+
+def connect_writable(db_path=None):
+    """書き込み可能な接続を開く（インデックス作成などの管理操作用）"""
+    return sqlite3.connect(resolve_db_path(db_path))
+
+def execute_query(query, params=(), fetch_all=True, db_path=None):
+    """クエリを実行し結果を返す"""
+    cursor = get_connection(db_path).execute(query, params)
+    if fetch_all:
+        return cursor.fetchall()
+    return cursor.fetchone()
 
-def fetch_channel_data(conn, channel_id):
-    """Fetch channel data for a specific channel_id."""
+def has_latest_index(conn):
+    """channel_datas に (channel_id, date) で始まるインデックスがあるか確認する"""
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM channel_datas WHERE channel_id = ?", (channel_id,))
-    rows = cursor.fetchall()
-    return rows
+    cursor.execute("PRAGMA index_list(channel_datas)")
+    index_names = [row[1] for row in cursor.fetchall()]
+    for name in index_names:
+        cursor.execute(f"PRAGMA index_info(\"{name}\")")
+        columns = [row[2] for row in sorted(cursor.fetchall())]
+        if columns[:2] == ["channel_id", "date"]:
+            return True
+    return False
 
-def close_connection(conn):
-    """Close the database connection."""
-    conn.close()
\ No newline at end of file
+def create_latest_index(conn):
+    """チャンネルごとの最新行シークに使う (channel_id, date) インデックスを作成する"""
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {LATEST_INDEX_NAME} "
+        "ON channel_datas (channel_id, date)"
+    )
+    conn.commit()
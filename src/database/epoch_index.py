@@ -0,0 +1,163 @@
+"""
+channel_datas の date を整数（epoch マイクロ秒）で引くためのサイドカーDBのインデックス
+
+channel_datas.date は文字列のため、期間の絞り込みは文字列比較になり、読み込むたびに
+pd.to_datetime で解析し直す必要がある。channel_datas_epoch に (channel_id, ts, 元の rowid) を
+主キーとして数値カラム（読み込み時と同じくクリーニング済みの値）とともに新しい行だけ差分で追加し、
+期間の絞り込みは主キーの整数の範囲スキャン（チャンネルの行が連続したページに並ぶ）で行い、
+date は整数の配列から datetime64 を直接作る（文字列の解析なし）。
+"""
+import numpy as np
+import pandas as pd
+from config import DATABASE_CONFIG
+from database.channel_datas import CHANNEL_DATA_DTYPES, channel_data_select
+from database.sidecar import SidecarStore, SidecarRegistry
+from utils.metrics import span
+
+# インデックスに保持するカラム
+VALUE_COLUMNS = list(CHANNEL_DATA_DTYPES)
+
+def to_epoch_us(values):
+    """date の文字列（または datetime）を epoch マイクロ秒の int64 配列にする"""
+    dates = pd.to_datetime(pd.Series(values), format='ISO8601')
+    return dates.to_numpy().astype('datetime64[us]').astype(np.int64)
+
+def from_epoch_us(values):
+    """epoch マイクロ秒の int64 配列を datetime64[ns] の配列にする"""
+    return (np.asarray(values, dtype=np.int64) * 1000).view('datetime64[ns]')
+
+class EpochIndex(SidecarStore):
+    """
+    channel_datas の (channel_id, 整数の日時) インデックス
+
+    インデックスの作成・更新はバックグラウンド更新のジョブ（refresh()）だけが行い、
+    read_range() はインデックスが元の DB に追いついていなければ None を返す（呼び出し側は文字列の date で読む）。
+    """
+
+    NAME = "日時インデックス"
+    STATE_TABLE = 'channel_datas_epoch_state'
+    TABLES = ('channel_datas_epoch',)
+    ROWID_COLUMN = 'src_rowid'
+
+    def _create_tables(self):
+        """インデックスのテーブルを作成する"""
+        self._conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS channel_datas_epoch (
+            channel_id TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            src_rowid INTEGER NOT NULL,
+            {', '.join(f"{column} INTEGER" for column in VALUE_COLUMNS)},
+            PRIMARY KEY (channel_id, ts, src_rowid)
+        ) WITHOUT ROWID;
+        """)
+
+    def _read_new_rows(self, last_rowid, limit):
+        """前回より新しい行をクリーニング済みの値で rowid 順に最大 limit 行読む"""
+        query = f"""
+        SELECT
+            channel_id,
+            date,
+            rowid AS src_rowid,
+            {channel_data_select()}
+        FROM
+            src.channel_datas
+        WHERE
+            rowid > ?
+        ORDER BY
+            rowid
+        LIMIT ?
+        """
+        with span('sql', 'epoch_index'):
+            return pd.read_sql_query(query, self._conn, params=(last_rowid, limit))
+
+    def _ingest(self, rows):
+        """読み込んだ行をインデックスに追加する（トランザクション内で呼ぶ）"""
+        columns = ['channel_id', 'ts', 'src_rowid', *VALUE_COLUMNS]
+        with span('transform', 'epoch_index'):
+            rows = rows.assign(ts=to_epoch_us(rows['date']))
+        self._conn.executemany(
+            f"INSERT OR IGNORE INTO channel_datas_epoch ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            rows[columns].itertuples(index=False, name=None)
+        )
+        return len(rows)
+
+    def refresh(self):
+        """
+        新しい行をインデックスに追加する
+
+        Returns:
+            追加した行数
+        """
+        return self._ingest_new_rows(self._read_new_rows, self._ingest, DATABASE_CONFIG['epoch_chunk_rows'])
+
+    def is_current(self):
+        """インデックスが元の DB の最後の行まで追加済みか"""
+        last_rowid = self._read_state('last_rowid')
+        max_rowid = self._reader().execute("SELECT MAX(rowid) FROM src.channel_datas").fetchone()[0]
+        return last_rowid is not None and int(last_rowid) >= (max_rowid or 0)
+
+    def read_range(self, channel_id, start=None, end=None, after=None):
+        """
+        チャンネルの行を整数の日時の範囲で読む（インデックスが追いついていなければ None を返す）
+
+        Args:
+            channel_id: チャンネルID
+            start: この日時以上（文字列、None なら制限なし）
+            end: この日時未満（文字列、None なら制限なし）
+            after: この日時より後（文字列、None なら制限なし）
+
+        Returns:
+            (read_channel_datas と同じカラムの DataFrame, 最終行の date の文字列 または None)、
+            インデックスが元の DB に追いついていなければ None
+        """
+        conditions, params = ["channel_id = ?"], [channel_id]
+        for bound, operator in ((start, ">="), (end, "<"), (after, ">")):
+            if bound is not None:
+                conditions.append(f"ts {operator} ?")
+                params.append(int(to_epoch_us([bound])[0]))
+        query = f"""
+        SELECT
+            ts,
+            src_rowid,
+            {', '.join(VALUE_COLUMNS)}
+        FROM
+            channel_datas_epoch
+        WHERE
+            {' AND '.join(conditions)}
+        ORDER BY
+            ts
+        """
+        if not self.is_current():
+            return None
+
+        conn = self._reader()
+        with span('sql', 'time_series'):
+            dtype = {'ts': 'int64', 'src_rowid': 'int64', **CHANNEL_DATA_DTYPES}
+            chunk_rows = DATABASE_CONFIG['read_chunk_rows']
+            if chunk_rows:
+                frames = list(pd.read_sql_query(query, conn, params=params, dtype=dtype, chunksize=chunk_rows))
+                df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+            else:
+                df = pd.read_sql_query(query, conn, params=params, dtype=dtype)
+        last_date = None
+        if not df.empty:
+            last_date = conn.execute(
+                "SELECT date FROM src.channel_datas WHERE rowid = ?", (int(df['src_rowid'].iloc[-1]),)
+            ).fetchone()[0]
+
+        with span('transform', 'time_series'):
+            df.insert(0, 'date', from_epoch_us(df.pop('ts').to_numpy()))
+            df.pop('src_rowid')
+        return df, last_date
+
+# DB パスごとのインデックス
+_epoch_indexes = SidecarRegistry(EpochIndex)
+
+def epoch_index_enabled():
+    """整数の日時インデックスを使うか"""
+    return DATABASE_CONFIG.get('epoch_index', False) and bool(DATABASE_CONFIG.get('sidecar_path'))
+
+def get_epoch_index(db_path=None):
+    """DB パスに対応する整数の日時インデックスを取得する"""
+    return _epoch_indexes.get(db_path)
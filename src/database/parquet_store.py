@@ -0,0 +1,220 @@
+"""
+channel_datas の Parquet スナップショット（月・チャンネルごとのパーティション）
+
+締まった月（今月より前）の行を Parquet に書き出し、時系列データの読み込みでは
+書き出し済みの月を Arrow のメモリマップで読み、今月分だけを SQLite から読む。
+
+    <PARQUET_CONFIG['path']>/month=2024-05/channel_id=<チャンネルID>/part-<先頭rowid>.parquet
+    <PARQUET_CONFIG['path']>/_export_state.json
+
+書き出しは rowid の順に前回の続きから行う（lightning-node-db は行を時刻順に追記するため、
+rowid の順序は date の順序と一致するとみなす）。pyarrow がない環境では使用しない。
+"""
+import os
+import json
+import glob
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import PARQUET_CONFIG
+from database.connector import open_read_only, resolve_db_path
+from database.channel_datas import channel_data_select, read_channel_datas
+from utils.metrics import span
+
+STATE_FILE = '_export_state.json'
+
+def _month_start(date):
+    """日時を含む月の初日 ("%Y-%m-%d") を返す"""
+    return date.strftime("%Y-%m-01")
+
+def _partition_dir(root, month, channel_id):
+    """月・チャンネルのパーティションのディレクトリ"""
+    return os.path.join(root, f"month={month}", f"channel_id={channel_id}")
+
+def _months_between(start_date, end_date):
+    """start_date を含む月から end_date より前の月までの "%Y-%m" のリスト"""
+    months = pd.period_range(pd.Timestamp(start_date), pd.Timestamp(end_date) - pd.Timedelta(days=1), freq='M')
+    return [str(month) for month in months]
+
+def parquet_available():
+    """pyarrow が利用できるか"""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+# 書き出し状態のキャッシュ {root: (更新時刻, 状態)}
+_states = {}
+_states_lock = threading.Lock()
+
+def load_export_state(root=None):
+    """書き出し状態（db_path, last_rowid, exported_until）を読む（書き出していなければ None）"""
+    root = root or PARQUET_CONFIG['path']
+    path = os.path.join(root, STATE_FILE)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _states_lock:
+        cached = _states.get(root)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    with _states_lock:
+        _states[root] = (mtime, state)
+    return state
+
+def _save_export_state(root, state):
+    """書き出し状態を保存する（一時ファイルに書いてから置き換える）"""
+    path = os.path.join(root, STATE_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def get_parquet_boundary(db_path=None, root=None):
+    """
+    Parquet から読める範囲の終わり（この日付より前は書き出し済み）を返す
+
+    PARQUET_CONFIG['enabled'] が無効、pyarrow がない、または別の DB の書き出しの場合は None。
+    """
+    if not PARQUET_CONFIG['enabled'] or not parquet_available():
+        return None
+    state = load_export_state(root)
+    if state is None or state.get('db_path') != os.path.abspath(resolve_db_path(db_path)):
+        return None
+    return state.get('exported_until')
+
+def _write_month(root, month, rows):
+    """1か月分の行をチャンネルごとのパーティションに書き出す"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    first_rowid = int(rows['row_id'].iloc[0])
+    rows = rows.drop(columns='row_id')
+    for channel_id, group in rows.groupby('channel_id', sort=False):
+        directory = _partition_dir(root, month, channel_id)
+        os.makedirs(directory, exist_ok=True)
+        table = pa.Table.from_pandas(group.drop(columns='channel_id'), preserve_index=False)
+        pq.write_table(table, os.path.join(directory, f"part-{first_rowid:012d}.parquet"))
+
+def export_channel_datas(db_path=None, root=None, chunk_rows=None):
+    """
+    締まった月の channel_datas を Parquet に書き出す（前回の続きから追記する）
+
+    行は chunk_rows 行ずつ読み、1か月分がそろうたびにチャンネルごとのファイルに書き出すため、
+    メモリ使用量は1か月分の行数程度に収まる。
+
+    Args:
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+        root: 書き出し先（未指定なら PARQUET_CONFIG['path']）
+        chunk_rows: 1回に読み込む行数（未指定なら PARQUET_CONFIG['chunk_rows']）
+
+    Returns:
+        書き出した行数
+    """
+    db_path = os.path.abspath(resolve_db_path(db_path))
+    root = root or PARQUET_CONFIG['path']
+    chunk_rows = chunk_rows or PARQUET_CONFIG['chunk_rows']
+    os.makedirs(root, exist_ok=True)
+
+    state = load_export_state(root)
+    if state is not None and state.get('db_path') != db_path:
+        raise ValueError(f"{root} には別のデータベース ({state.get('db_path')}) が書き出されています")
+    last_rowid = state['last_rowid'] if state else 0
+
+    # 今月の行は書き出さない（月が締まってから書き出す）
+    boundary = _month_start(datetime.now())
+    query = f"""
+    SELECT
+        rowid AS row_id,
+        channel_id,
+        date,
+        {channel_data_select()}
+    FROM
+        channel_datas
+    WHERE
+        rowid > ? AND
+        date < ?
+    ORDER BY
+        rowid
+    LIMIT ?
+    """
+
+    conn = open_read_only(db_path)
+    total = 0
+    pending = []
+    try:
+        while True:
+            rows, _ = read_channel_datas(conn, query, (last_rowid, boundary, chunk_rows),
+                                         dtype={'row_id': 'int64'}, name='parquet_export')
+            if rows.empty:
+                break
+            last_rowid = int(rows['row_id'].iloc[-1])
+            total += len(rows)
+
+            with span('transform', 'parquet_export'):
+                months = rows['date'].to_numpy().astype('datetime64[M]')
+                starts = np.r_[0, np.flatnonzero(months[1:] != months[:-1]) + 1]
+                ends = np.r_[starts[1:], len(rows)]
+                for start, end in zip(starts, ends):
+                    month = str(months[start])
+                    if pending and pending[0][0] != month:
+                        _write_month(root, pending[0][0], pd.concat([part for _, part in pending], ignore_index=True))
+                        pending = []
+                    pending.append((month, rows.iloc[start:end]))
+
+        if pending:
+            _write_month(root, pending[0][0], pd.concat([part for _, part in pending], ignore_index=True))
+    finally:
+        conn.close()
+
+    _save_export_state(root, {'db_path': db_path, 'last_rowid': last_rowid, 'exported_until': boundary})
+    return total
+
+def read_channel_history(channel_id, start_date, end_date, root=None):
+    """
+    書き出し済みの月からチャンネルの行を読む（start_date 以上 end_date 未満）
+
+    ファイルは Arrow のメモリマップで開き、date 順に連結する。
+
+    Returns:
+        read_channel_datas と同じカラム（date と数値カラム）の DataFrame
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    root = root or PARQUET_CONFIG['path']
+    paths = []
+    for month in _months_between(start_date, end_date):
+        paths.extend(sorted(glob.glob(os.path.join(_partition_dir(root, month, channel_id), "*.parquet"))))
+    if not paths:
+        return pd.DataFrame()
+
+    with span('sql', 'parquet_history'):
+        table = pa.concat_tables([pq.read_table(path, memory_map=True) for path in paths])
+    with span('transform', 'parquet_history'):
+        df = table.to_pandas()
+        dates = df['date'].to_numpy()
+        start = dates.searchsorted(np.datetime64(pd.Timestamp(start_date)))
+        end = dates.searchsorted(np.datetime64(pd.Timestamp(end_date)))
+        if start > 0 or end < len(df):
+            df = df.iloc[start:end].reset_index(drop=True)
+    return df
+
+def iter_channel_history(channel_id, start_date, end_date, root=None):
+    """
+    書き出し済みの月からチャンネルの行を1か月ずつ読むジェネレータ（start_date 以上 end_date 未満）
+
+    Yields:
+        read_channel_history と同じカラムの DataFrame（行のない月は返さない）
+    """
+    for month in _months_between(start_date, end_date):
+        month_start = f"{month}-01"
+        month_end = (pd.Timestamp(month_start) + pd.offsets.MonthBegin(1)).strftime("%Y-%m-%d")
+        df = read_channel_history(channel_id, max(start_date, month_start), min(end_date, month_end), root)
+        if not df.empty:
+            yield df
@@ -0,0 +1,307 @@
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import DATABASE_CONFIG, ROLLUP_CONFIG
+from database.connector import get_connection
+from database.channel_datas import CHANNEL_DATA_DTYPES, channel_data_expr, read_channel_datas
+from database.sidecar import SidecarStore, SidecarRegistry
+from utils.metrics import span
+
+# 集計粒度ごとの date の切り捨て書式とサイドカーDBのテーブル名
+ROLLUP_BUCKETS = {
+    'hourly': ('%Y-%m-%d %H:00:00', 'channel_datas_hourly'),
+    'daily': ('%Y-%m-%d 00:00:00', 'channel_datas_daily'),
+}
+
+# 集計粒度ごとの切り捨て単位（読み込みながら集計する場合の pandas の頻度）
+ROLLUP_FREQS = {
+    'hourly': 'h',
+    'daily': 'D',
+}
+
+# 最後の値を取るカラム（バケット内で最新の行の値）
+LAST_VALUE_COLUMNS = list(CHANNEL_DATA_DTYPES)
+
+# バケットごとに集計するカラムと読み込み時の型
+AGGREGATE_DTYPES = {
+    'local_balance_avg': 'float64',
+    'local_balance_min': 'int64',
+    'local_balance_max': 'int64',
+    'samples': 'int64',
+}
+AGGREGATE_COLUMNS = list(AGGREGATE_DTYPES)
+
+def _bucket_query(bucket_format, source='channel_datas', channel_count=1):
+    """
+    バケット集計クエリを作成する
+    
+    バケットごとに local_balance の平均・最小・最大と件数を GROUP BY で求め、
+    バケット内の最新行を rowid で引き直して最後の値を取り出す。
+    channel_count 個の channel_id と開始日で絞り込む（0 なら rowid と開始日で絞り込む）。
+    """
+    last_values = ",\n        ".join(f"{channel_data_expr(col, 'cd')} AS {col}" for col in LAST_VALUE_COLUMNS)
+    local_balance = channel_data_expr('local_balance')
+    if channel_count:
+        where = f"channel_id IN ({', '.join('?' * channel_count)}) AND date >= ?"
+    else:
+        where = "rowid >= ? AND date >= ?"
+    return f"""
+    SELECT 
+        b.channel_id,
+        b.bucket AS date,
+        {last_values},
+        b.local_balance_avg,
+        b.local_balance_min,
+        b.local_balance_max,
+        b.samples
+    FROM 
+        (SELECT 
+             channel_id,
+             strftime('{bucket_format}', date) AS bucket,
+             AVG({local_balance}) AS local_balance_avg,
+             MIN({local_balance}) AS local_balance_min,
+             MAX({local_balance}) AS local_balance_max,
+             COUNT(*) AS samples,
+             MAX(date) AS last_date
+         FROM {source}
+         WHERE {where}
+         GROUP BY channel_id, bucket) b
+    JOIN 
+        {source} cd
+        ON cd.rowid = (SELECT cd1.rowid 
+                       FROM {source} cd1 
+                       WHERE cd1.channel_id = b.channel_id AND cd1.date = b.last_date 
+                       LIMIT 1)
+    ORDER BY 
+        b.channel_id, b.bucket
+    """
+
+def choose_bucket(start_date, end_date=None):
+    """
+    期間の長さから SQL 側の集計粒度を決める（ROLLUP_CONFIG['enabled'] が無効なら常に None）
+    
+    Args:
+        start_date: 開始日時（文字列または datetime）
+        end_date: 終了日時（省略時は現在）
+    
+    Returns:
+        None（生データ） / 'hourly' / 'daily'
+    """
+    if not ROLLUP_CONFIG['enabled']:
+        return None
+    return span_bucket(start_date, end_date)
+
+def span_bucket(start_date, end_date=None):
+    """
+    期間の長さから集計粒度を決める（raw_max_days / hourly_max_days による）
+    
+    Args:
+        start_date: 開始日時（文字列または datetime、None なら生データ）
+        end_date: 終了日時（省略時は現在）
+    
+    Returns:
+        None（生データ） / 'hourly' / 'daily'
+    """
+    if start_date is None:
+        return None
+    end = pd.Timestamp(end_date) if end_date is not None else pd.Timestamp(datetime.now())
+    span_days = (end - pd.Timestamp(start_date)).total_seconds() / 86400
+    if span_days <= ROLLUP_CONFIG['raw_max_days']:
+        return None
+    if span_days <= ROLLUP_CONFIG['hourly_max_days']:
+        return 'hourly'
+    return 'daily'
+
+def reduce_to_buckets(chunks, bucket):
+    """
+    date 順に読み込んだチャンクをバケット単位に集計する（SQL 側の集計と同じカラム）
+    
+    各チャンクをバケットごとの最後の値と local_balance の合計・最小・最大・件数に縮約してから
+    次のチャンクを読むため、保持するのは生データの1チャンクとバケット数分の行だけになる。
+    チャンクの境界をまたぐバケットは最後にまとめ直す。
+    
+    Args:
+        chunks: date 順の DataFrame（read_channel_datas と同じカラム）のイテラブル
+        bucket: 'hourly' または 'daily'
+    
+    Returns:
+        get_rollup_data と同じカラムの DataFrame
+    """
+    partials = []
+    for df in chunks:
+        if df.empty:
+            continue
+        with span('transform', f"reduce_{bucket}"):
+            keys = df['date'].dt.floor(ROLLUP_FREQS[bucket]).to_numpy()
+            starts = np.r_[0, np.flatnonzero(keys[1:] != keys[:-1]) + 1]
+            balance = df['local_balance'].to_numpy()
+            partial = df[LAST_VALUE_COLUMNS].iloc[np.r_[starts[1:], len(df)] - 1].reset_index(drop=True)
+            partial.insert(0, 'date', keys[starts])
+            partial['local_balance_sum'] = np.add.reduceat(balance, starts)
+            partial['local_balance_min'] = np.minimum.reduceat(balance, starts)
+            partial['local_balance_max'] = np.maximum.reduceat(balance, starts)
+            partial['samples'] = np.diff(np.r_[starts, len(df)])
+        partials.append(partial)
+    if not partials:
+        return pd.DataFrame()
+    
+    with span('transform', f"reduce_{bucket}"):
+        df = pd.concat(partials, ignore_index=True) if len(partials) > 1 else partials[0]
+        if df['date'].duplicated().any():
+            df = df.groupby('date', sort=False).agg({
+                **{column: 'last' for column in LAST_VALUE_COLUMNS},
+                'local_balance_sum': 'sum',
+                'local_balance_min': 'min',
+                'local_balance_max': 'max',
+                'samples': 'sum',
+            }).reset_index()
+        df['local_balance_avg'] = df.pop('local_balance_sum') / df['samples']
+        return df[['date', *LAST_VALUE_COLUMNS, *AGGREGATE_COLUMNS]].astype(AGGREGATE_DTYPES)
+
+def get_first_date(channel_id, db_path=None):
+    """チャンネルの最も古い行の date を取得する（データがなければ None）"""
+    conn = get_connection(db_path)
+    row = conn.execute(
+        "SELECT MIN(date) FROM channel_datas WHERE channel_id = ?", (channel_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+def get_rollup_data(channel_id, start_date, bucket, db_path=None):
+    """
+    チャンネルの時系列データをバケット単位に集計して取得する
+    
+    Args:
+        channel_id: チャンネルID
+        start_date: 取得開始日 ("%Y-%m-%d")
+        bucket: 'hourly' または 'daily'
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+    """
+    return get_multi_rollup_data([channel_id], start_date, bucket, db_path).drop(columns=['channel_id'])
+
+def get_multi_rollup_data(channel_ids, start_date, bucket, db_path=None):
+    """
+    複数チャンネルの時系列データをバケット単位に集計して1回のクエリで取得する
+    
+    ROLLUP_CONFIG['materialize'] が有効ならサイドカーDBの集計テーブルを差分更新して読み、
+    無効なら channel_datas に対して GROUP BY channel_id, バケット を実行する。
+    
+    Args:
+        channel_ids: チャンネルIDのリスト
+        start_date: 取得開始日 ("%Y-%m-%d")
+        bucket: 'hourly' または 'daily'
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+    
+    Returns:
+        channel_id, date 順の DataFrame（channel_id のカラムを含む）
+    """
+    bucket_format, table = ROLLUP_BUCKETS[bucket]
+    # 開始日を含むバケットから取得する
+    start_bucket = pd.Timestamp(start_date).strftime(bucket_format)
+    
+    if ROLLUP_CONFIG['materialize'] and DATABASE_CONFIG.get('sidecar_path'):
+        store = get_rollup_store(db_path)
+        store.refresh_if_stale()
+        return store.read(table, channel_ids, start_bucket)
+    
+    conn = get_connection(db_path)
+    df, _ = read_channel_datas(conn, _bucket_query(bucket_format, channel_count=len(channel_ids)),
+                               (*channel_ids, start_bucket), AGGREGATE_DTYPES, name=f"rollup_{bucket}")
+    return df
+
+class RollupStore(SidecarStore):
+    """
+    サイドカーDBに保持する集計テーブル（channel_datas_hourly / channel_datas_daily）
+    
+    rowid の順序を date の順序とみなし（SidecarStore を参照）、バケットの種類ごとに
+    最後に集計したバケットの先頭 rowid 以降だけを再集計して差分更新する（rollup_state）。
+    """
+    
+    NAME = "集計テーブル"
+    STATE_TABLE = 'rollup_store_state'
+    TABLES = tuple(table for _, table in ROLLUP_BUCKETS.values()) + ('rollup_state',)
+    
+    def __init__(self, db_path, sidecar_path):
+        self._last_refresh = 0.0
+        super().__init__(db_path, sidecar_path)
+    
+    def _create_tables(self):
+        """集計テーブルと状態テーブルを作成する"""
+        value_columns = ",\n                ".join(f"{col} INTEGER" for col in LAST_VALUE_COLUMNS)
+        for _, table in ROLLUP_BUCKETS.values():
+            self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                channel_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                {value_columns},
+                local_balance_avg REAL,
+                local_balance_min INTEGER,
+                local_balance_max INTEGER,
+                samples INTEGER,
+                PRIMARY KEY (channel_id, date)
+            )
+            """)
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            name TEXT PRIMARY KEY,
+            last_bucket TEXT NOT NULL,
+            bucket_start_rowid INTEGER NOT NULL
+        )
+        """)
+    
+    def refresh(self):
+        """新しい行を含むバケットだけを再集計する"""
+        with self._lock:
+            for name, (bucket_format, table) in ROLLUP_BUCKETS.items():
+                state = self._conn.execute(
+                    "SELECT last_bucket, bucket_start_rowid FROM rollup_state WHERE name = ?", (name,)
+                ).fetchone()
+                last_bucket, start_rowid = state if state else ("", 0)
+                
+                columns = ["channel_id", "date"] + LAST_VALUE_COLUMNS + AGGREGATE_COLUMNS
+                column_list = ", ".join(columns)
+                with self._conn:
+                    # 最後のバケットは集計途中の可能性があるため作り直す
+                    self._conn.execute(f"DELETE FROM {table} WHERE date >= ?", (last_bucket,))
+                    self._conn.execute(
+                        f"INSERT INTO {table} ({column_list}) "
+                        f"SELECT {column_list} FROM ({_bucket_query(bucket_format, 'src.channel_datas', channel_count=0)})",
+                        (start_rowid, last_bucket),
+                    )
+                    
+                    new_last_bucket = self._conn.execute(f"SELECT MAX(date) FROM {table}").fetchone()[0]
+                    if new_last_bucket is None:
+                        continue
+                    new_start_rowid = self._conn.execute(
+                        "SELECT MIN(rowid) FROM src.channel_datas WHERE rowid >= ? AND date >= ?",
+                        (start_rowid, new_last_bucket),
+                    ).fetchone()[0]
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO rollup_state (name, last_bucket, bucket_start_rowid) VALUES (?, ?, ?)",
+                        (name, new_last_bucket, new_start_rowid or start_rowid),
+                    )
+            self._last_refresh = time.monotonic()
+    
+    def refresh_if_stale(self):
+        """前回の更新から ROLLUP_CONFIG['refresh_interval'] 秒以上経っていれば更新する"""
+        if time.monotonic() - self._last_refresh >= ROLLUP_CONFIG['refresh_interval']:
+            self.refresh()
+    
+    def read(self, table, channel_ids, start_bucket):
+        """集計テーブルからチャンネルのデータを channel_id, date 順に読む（読み込み用の接続で、更新を待たない）"""
+        df, _ = read_channel_datas(
+            self._reader(),
+            f"SELECT * FROM {table} WHERE channel_id IN ({', '.join('?' * len(channel_ids))}) AND date >= ? "
+            f"ORDER BY channel_id, date",
+            (*channel_ids, start_bucket),
+            AGGREGATE_DTYPES,
+            name=f"{table}",
+        )
+        return df
+
+# DB パスごとの集計ストア
+_rollup_stores = SidecarRegistry(RollupStore)
+
+def get_rollup_store(db_path=None):
+    """DB パスに対応する集計ストアを取得する"""
+    return _rollup_stores.get(db_path)
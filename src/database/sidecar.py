@@ -0,0 +1,158 @@
+"""
+サイドカーDB（DATABASE_CONFIG['sidecar_path']）に保持するストアの共通部分
+
+各ストアは channel_datas から作った集計やインデックスをサイドカーDBのテーブルに保持し、
+元の DB を src として ATTACH して新しい行を取り込む。SidecarStore は接続・状態テーブル・
+rowid のウォーターマークによる差分取り込み・読み込み用の接続を、SidecarRegistry は
+DB パスごとのストアの管理をまとめる。
+"""
+import os
+import sqlite3
+import threading
+from config import DATABASE_CONFIG
+from database.connector import resolve_db_path, read_only_uri
+
+class SidecarStore:
+    """
+    サイドカーDBに保持するストアの基底クラス
+
+    lightning-node-db は行を時刻順に追記するため、rowid の順序は date の順序と一致するとみなし、
+    前回取り込んだ最後の rowid（状態テーブルの last_rowid）より新しい行だけを取り込む。
+    状態テーブルには元の DB のパスも保存し、別の DB を指している場合は
+    TABLES を空にして最初から取り込み直す（別の DB のウォーターマークから再開しないため）。
+
+    サブクラスは NAME / STATE_TABLE / TABLES を定義し、_create_tables() でテーブルを作成する。
+    """
+
+    NAME = "サイドカー"      # ログ表示用の名前
+    STATE_TABLE = None       # 状態テーブル (name TEXT PRIMARY KEY, value TEXT)
+    TABLES = ()              # 元の DB が変わったときに空にするテーブル
+    ROWID_COLUMN = 'row_id'  # 取り込むチャンクの rowid のカラム名
+
+    def __init__(self, db_path, sidecar_path):
+        self.db_path = db_path
+        self.sidecar_path = sidecar_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._refresh_thread = None
+        sidecar_dir = os.path.dirname(sidecar_path)
+        if sidecar_dir:
+            os.makedirs(sidecar_dir, exist_ok=True)
+        self._conn = sqlite3.connect(sidecar_path, uri=True, check_same_thread=False,
+                                     timeout=DATABASE_CONFIG['busy_timeout'])
+        self._conn.execute("ATTACH DATABASE ? AS src", (read_only_uri(db_path),))
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {self.STATE_TABLE} (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._create_tables()
+        self._conn.commit()
+        self._check_source()
+
+    def _create_tables(self):
+        """ストアのテーブルを作成する"""
+        raise NotImplementedError
+
+    def _check_source(self):
+        """状態が別の DB のものなら、ストアのテーブルと状態を空にする"""
+        source = os.path.abspath(self.db_path)
+        with self._lock, self._conn:
+            stored = self._get_state('db_path', None)
+            if stored == source:
+                return
+            if stored is not None or self._get_state('last_rowid', None) is not None:
+                print(f"{self.NAME}: 元の DB が変わったため作り直します（{stored or '不明'} → {source}）")
+            for table in self.TABLES:
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute(f"DELETE FROM {self.STATE_TABLE}")
+            self._set_state('db_path', source)
+
+    def _reader(self):
+        """
+        読み込み用の接続（スレッドごと）
+
+        サイドカーDBを読み取り専用・自動コミットで開き、元の DB を src として付ける。
+        更新中も書き込み用の接続のロックを待たずに読める。
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(read_only_uri(self.sidecar_path), uri=True, isolation_level=None,
+                                   check_same_thread=False, timeout=DATABASE_CONFIG['busy_timeout'])
+            conn.execute(f"PRAGMA mmap_size = {int(DATABASE_CONFIG.get('mmap_size', 0))}")
+            conn.execute("ATTACH DATABASE ? AS src", (read_only_uri(self.db_path),))
+            self._local.conn = conn
+        return conn
+
+    def _get_state(self, name, default):
+        row = self._conn.execute(f"SELECT value FROM {self.STATE_TABLE} WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def _set_state(self, name, value):
+        self._conn.execute(f"INSERT OR REPLACE INTO {self.STATE_TABLE} (name, value) VALUES (?, ?)", (name, str(value)))
+
+    def _read_state(self, name):
+        """状態を読み込み用の接続で読む（なければ None）"""
+        row = self._reader().execute(f"SELECT value FROM {self.STATE_TABLE} WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _ingest_new_rows(self, read_chunk, ingest, chunk_rows):
+        """
+        ウォーターマークより新しい行をチャンクごとに取り込む
+
+        ロックはチャンクごとに取り、ウォーターマークもロック内で状態テーブルから読み直すため、
+        取り込み中も読み込みや他の処理を長く待たせない。
+
+        Args:
+            read_chunk: (last_rowid, limit) を受け取り、rowid 順に最大 limit 行の DataFrame を返す関数
+            ingest: チャンクを取り込む関数（トランザクション内で呼ばれ、件数を返す）
+            chunk_rows: 1回に読み込む行数
+
+        Returns:
+            ingest が返した件数の合計
+        """
+        total = 0
+        while True:
+            with self._lock:
+                rows = read_chunk(int(self._get_state('last_rowid', 0)), chunk_rows)
+                if rows.empty:
+                    return total
+                with self._conn:
+                    total += ingest(rows)
+                    self._set_state('last_rowid', int(rows[self.ROWID_COLUMN].iloc[-1]))
+
+    def refresh(self):
+        """新しい行を取り込む"""
+        raise NotImplementedError
+
+    def refresh_in_background(self):
+        """
+        別スレッドで refresh() を始める（実行中なら何もしない）
+
+        バックグラウンド更新のスケジューラがない場合に、画面の表示を初回の取り込みで待たせないために使う。
+        """
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._refresh_quietly, name=f"{type(self).__name__}-refresh",
+                                                    daemon=True)
+            self._refresh_thread.start()
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"{self.NAME}の更新エラー: {e}")
+
+class SidecarRegistry:
+    """DB パスごとのストア（サイドカーDBは DATABASE_CONFIG['sidecar_path']）"""
+
+    def __init__(self, store_class):
+        self._store_class = store_class
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def get(self, db_path=None):
+        """DB パスに対応するストアを取得する（なければ作成）"""
+        db_path = resolve_db_path(db_path)
+        with self._lock:
+            store = self._stores.get(db_path)
+            if store is None:
+                store = self._stores[db_path] = self._store_class(db_path, DATABASE_CONFIG['sidecar_path'])
+            return store
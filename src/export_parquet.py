@@ -0,0 +1,42 @@
+"""
+channel_datas を月・チャンネルごとの Parquet に書き出す（前回の続きから追記）
+
+    python src/export_parquet.py [--db data/lightning_node.db] [--out data/parquet]
+
+締まった月（今月より前）の行だけを書き出す。cron 等で定期的に実行し、
+PARQUET_CONFIG['enabled'] を True にすると時系列データの読み込みで使用される。
+"""
+import os
+import sys
+import time
+import argparse
+from database.parquet_store import export_channel_datas, load_export_state, parquet_available
+from config import DATABASE_CONFIG, PARQUET_CONFIG
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export channel_datas to partitioned Parquet files')
+    parser.add_argument('--db', default=DATABASE_CONFIG['path'],
+                        help=f'Database to export (default: {DATABASE_CONFIG["path"]})')
+    parser.add_argument('--out', default=PARQUET_CONFIG['path'],
+                        help=f'Output directory (default: {PARQUET_CONFIG["path"]})')
+    parser.add_argument('--chunk-rows', type=int, default=PARQUET_CONFIG['chunk_rows'],
+                        help='Rows read from SQLite per query')
+    args = parser.parse_args()
+
+    if not parquet_available():
+        print("エラー: pyarrow がインストールされていません（pip install pyarrow）")
+        sys.exit(1)
+    if not os.path.exists(args.db):
+        print(f"エラー: データベースファイルが見つかりません: {args.db}")
+        sys.exit(1)
+
+    print(f"データベースパス: {args.db}")
+    print(f"書き出し先: {args.out}")
+    start = time.perf_counter()
+    try:
+        rows = export_channel_datas(args.db, args.out, args.chunk_rows)
+    except ValueError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+    state = load_export_state(args.out)
+    print(f"{rows} 行を書き出しました（{state['exported_until']} より前まで, {time.perf_counter() - start:.1f} 秒）")
@@ -0,0 +1,340 @@
+import gradio as gr
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from database.connector import get_connection
+from database.channel_datas import channel_data_expr
+from database.change_detector import cached_by_data_version
+from database.async_access import run_db
+from utils.plot_data import figure_to_plot_data
+from utils.metrics import span, timed
+from config import FLEET_CONFIG
+
+# ノード全体の集計に使うカラム
+FLEET_COLUMNS = ['local_balance', 'remote_balance', 'local_fee', 'remote_fee', 'active']
+
+# 推移チャートのバケット幅の候補 (秒)
+BUCKET_WIDTHS = [
+    (3600, "1時間"),
+    (6 * 3600, "6時間"),
+    (24 * 3600, "1日"),
+    (7 * 24 * 3600, "1週間"),
+]
+
+def get_fleet_start_date(period):
+    """
+    期間から集計開始日時 ("%Y-%m-%d %H:%M:%S") を計算する（"all" なら None）
+    """
+    now = datetime.now()
+    if period == "1week":
+        return (now - timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S")
+    elif period == "1month":
+        return (now - timedelta(days=30)).strftime("%Y-%m-%d %H:%M:%S")
+    return None
+
+def _get_fleet_range(conn, start_date):
+    """期間内の最初と最後の行の epoch 秒を取得する（行がなければ None）"""
+    query = f"""
+    SELECT
+        CAST(strftime('%s', MIN(date)) AS INTEGER),
+        CAST(strftime('%s', MAX(date)) AS INTEGER)
+    FROM
+        channel_datas
+    {"WHERE date >= ?" if start_date else ""}
+    """
+    with span('sql', 'fleet_range'):
+        first_sec, last_sec = conn.execute(query, (start_date,) if start_date else ()).fetchone()
+    return (first_sec, last_sec) if first_sec is not None else None
+
+def _load_fleet_buckets(conn, start_date, start_sec, width):
+    """
+    (チャンネル, バケット) ごとの集計を SQL で求める（期間全体の行は Python に読み込まない）
+
+    各 (チャンネル, バケット) について、バケット内の最後の行の残高・アクティブ状態と、
+    同じチャンネルの直前の行（期間内）からの手数料変更・非アクティブ化の回数を返す。
+    最後の行の値は SQLite の MAX() と同じ行の値を返すカラム（bare column）で取り出す。
+    """
+    columns = ",\n            ".join(f"{channel_data_expr(column)} AS {column}" for column in FLEET_COLUMNS)
+    query = f"""
+    WITH fleet_rows AS (
+        SELECT
+            channel_id,
+            date,
+            CAST(strftime('%s', date) AS INTEGER) AS sec,
+            {columns}
+        FROM
+            channel_datas
+        {"WHERE date >= ?" if start_date else ""}
+    ), fleet_changes AS (
+        SELECT
+            channel_id,
+            sec,
+            (sec - ?) / ? AS bucket,
+            local_balance,
+            remote_balance,
+            active,
+            local_fee != LAG(local_fee) OVER w AS local_fee_changed,
+            remote_fee != LAG(remote_fee) OVER w AS remote_fee_changed,
+            LAG(active) OVER w = 1 AND active = 0 AS went_inactive
+        FROM
+            fleet_rows
+        WINDOW w AS (PARTITION BY channel_id ORDER BY date)
+    )
+    SELECT
+        channel_id,
+        bucket,
+        MAX(sec) AS last_sec,
+        local_balance,
+        remote_balance,
+        active,
+        COALESCE(SUM(local_fee_changed), 0) AS local_fee_changes,
+        COALESCE(SUM(remote_fee_changed), 0) AS remote_fee_changes,
+        COALESCE(SUM(went_inactive), 0) AS went_inactive
+    FROM
+        fleet_changes
+    GROUP BY
+        channel_id, bucket
+    ORDER BY
+        channel_id, bucket
+    """
+    params = ((start_date,) if start_date else ()) + (start_sec, width)
+    with span('sql', 'fleet'):
+        return pd.read_sql_query(query, conn, params=params, dtype={
+            'bucket': 'int64', 'last_sec': 'int64', 'local_balance': 'int64', 'remote_balance': 'int64',
+            'active': 'bool', 'local_fee_changes': 'int64', 'remote_fee_changes': 'int64', 'went_inactive': 'int64',
+        })
+
+def _choose_bucket_width(first_sec, last_sec, max_buckets):
+    """バケット数が max_buckets 以下になる最小のバケット幅 (秒, 表示名) を返す"""
+    for width, label in BUCKET_WIDTHS:
+        if (last_sec - first_sec) // width + 1 <= max_buckets:
+            return width, label
+    return BUCKET_WIDTHS[-1]
+
+def _bucket_matrix(codes, buckets, values, last_buckets, num_channels, num_buckets):
+    """
+    (チャンネル, バケット) ごとの値を並べ、値のないバケットは直前の値で埋めた行列を返す
+
+    codes / buckets は (チャンネル, バケット) ごとに1行であること。
+    最初の値より前のバケットと、チャンネルの最後のバケット (last_buckets) より後は
+    NaN のまま残す（閉じた・削除されたチャンネルの残高を最新まで数えないため）。
+    """
+    matrix = np.full((num_channels, num_buckets), np.nan)
+    matrix[codes, buckets] = values
+
+    # 前方埋め: 各位置で直前に値があったバケット番号を累積最大で求める
+    filled = np.where(np.isnan(matrix), 0, np.arange(num_buckets))
+    np.maximum.accumulate(filled, axis=1, out=filled)
+    matrix = matrix[np.arange(num_channels)[:, None], filled]
+    matrix[np.arange(num_buckets)[None, :] > last_buckets[:, None]] = np.nan
+    return matrix
+
+def compute_fleet_overview(df, capacities, start_sec, width, width_label, ratio_bins=None):
+    """
+    (チャンネル, バケット) ごとの集計からノード全体の集計を計算する
+
+    Args:
+        df: _load_fleet_buckets() の結果（チャンネル・バケット順）
+        capacities: {channel_id: 容量}
+        start_sec: 最初のバケットの開始 epoch 秒
+        width: バケット幅 (秒)
+        width_label: バケット幅の表示名
+        ratio_bins: 残高比率の分布のビン数
+
+    Returns:
+        集計結果の dict（df が空なら None）
+    """
+    if df.empty:
+        return None
+    if ratio_bins is None:
+        ratio_bins = FLEET_CONFIG['ratio_bins']
+
+    with span('transform', 'fleet'):
+        codes, channel_ids = pd.factorize(df['channel_id'], sort=False)
+        buckets = df['bucket'].to_numpy()
+        last_secs = df['last_sec'].to_numpy()
+        num_channels = len(channel_ids)
+        num_buckets = int(buckets.max()) + 1
+
+        # 各チャンネルの最後の (チャンネル, バケット) 行
+        last_rows = np.flatnonzero(np.append(codes[1:] != codes[:-1], True))
+        last_buckets = np.empty(num_channels, dtype=np.int64)
+        last_buckets[codes[last_rows]] = buckets[last_rows]
+
+        # 残高と非アクティブ数の推移（各チャンネルの最新値を最後の行まで前方埋めして合計）
+        def matrix(column):
+            return _bucket_matrix(codes, buckets, df[column].to_numpy(dtype=np.float64), last_buckets,
+                                  num_channels, num_buckets)
+        local_total = np.nansum(matrix('local_balance'), axis=0)
+        remote_total = np.nansum(matrix('remote_balance'), axis=0)
+        inactive_count = np.sum(matrix('active') == 0, axis=0)
+
+        # 手数料変更の回数（バケットごと）と非アクティブ化したチャンネル
+        local_fee_changes = np.bincount(buckets, weights=df['local_fee_changes'].to_numpy(), minlength=num_buckets)
+        remote_fee_changes = np.bincount(buckets, weights=df['remote_fee_changes'].to_numpy(), minlength=num_buckets)
+        changed = (df['local_fee_changes'].to_numpy() + df['remote_fee_changes'].to_numpy()) > 0
+        went_inactive = df['went_inactive'].to_numpy() > 0
+
+        # 現在の値は期間の最後まで記録のあるチャンネル（最新行から present_hours 以内）だけで求める
+        last_rows = last_rows[last_secs[last_rows] >= last_secs.max() - FLEET_CONFIG['present_hours'] * 3600]
+        capacity = pd.Series(channel_ids).map(capacities).to_numpy(dtype=np.float64)[codes[last_rows]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = df['local_balance'].to_numpy()[last_rows] / capacity * 100
+        ratios = np.clip(ratios[np.isfinite(ratios) & (capacity > 0)], 0, 100)
+        ratio_counts, ratio_edges = np.histogram(ratios, bins=ratio_bins, range=(0, 100))
+
+        return {
+            'bucket_times': (start_sec + np.arange(num_buckets) * width) * 1000.0,  # epoch ミリ秒
+            'bucket_label': width_label,
+            'local_total': local_total,
+            'remote_total': remote_total,
+            'inactive_count': inactive_count,
+            'local_fee_changes': local_fee_changes.astype(np.int64),
+            'remote_fee_changes': remote_fee_changes.astype(np.int64),
+            'ratio_counts': ratio_counts,
+            'ratio_edges': ratio_edges,
+            'num_channels': len(last_rows),
+            'active_now': int(np.sum(df['active'].to_numpy()[last_rows])),
+            'went_inactive': int(np.unique(codes[went_inactive]).size),
+            'fee_changes': int(local_fee_changes.sum() + remote_fee_changes.sum()),
+            'channels_with_fee_changes': int(np.unique(codes[changed]).size),
+        }
+
+@cached_by_data_version
+def _get_fleet_overview_cached(db_path, period):
+    conn = get_connection(db_path)
+    capacities = dict(conn.execute("SELECT channel_id, capacity FROM channel_lists").fetchall())
+    start_date = get_fleet_start_date(period)
+    date_range = _get_fleet_range(conn, start_date)
+    if date_range is None:
+        return None
+    first_sec, last_sec = date_range
+    width, width_label = _choose_bucket_width(first_sec, last_sec, FLEET_CONFIG['max_buckets'])
+    start_sec = first_sec - first_sec % width
+    df = _load_fleet_buckets(conn, start_date, start_sec, width)
+    return compute_fleet_overview(df, capacities, start_sec, width, width_label)
+
+def get_fleet_overview(period="1week", db_path=None):
+    """
+    期間内のノード全体の集計を取得する（DB に変更がなければ前回の結果を返す）
+
+    Args:
+        period: 期間 ("1week" または "1month" または "all")
+        db_path: データベースのパス
+    """
+    return _get_fleet_overview_cached(db_path, period)
+
+def _fleet_layout(title, y_title, x_type='date'):
+    """フリートタブのチャート共通のレイアウト"""
+    return {
+        'title': {'text': title},
+        'margin': {'l': 10, 'r': 10, 't': 40, 'b': 10},
+        'plot_bgcolor': 'white',
+        'paper_bgcolor': 'white',
+        'hovermode': 'x unified',
+        'xaxis': {'type': x_type, 'showgrid': True, 'gridcolor': 'lightgray', 'showline': True, 'linecolor': 'black'},
+        'yaxis': {'title': {'text': y_title}, 'showgrid': True, 'gridcolor': 'lightgray', 'showline': True,
+                  'linecolor': 'black', 'rangemode': 'tozero'},
+        'legend': {'orientation': 'h', 'y': 1.1},
+    }
+
+def create_fleet_plots(overview):
+    """集計結果から (サマリー, 残高推移, 残高比率分布, 手数料変更, 非アクティブ数) を作成する"""
+    if overview is None:
+        return ("データがありません",) + (None,) * 4
+
+    x = overview['bucket_times']
+    bucket = overview['bucket_label']
+
+    summary = (
+        f"**チャンネル数**: {overview['num_channels']:,}　"
+        f"**アクティブ**: {overview['active_now']:,}　"
+        f"**期間中に非アクティブ化**: {overview['went_inactive']:,}　"
+        f"**手数料変更**: {overview['fee_changes']:,} 回（{overview['channels_with_fee_changes']:,} チャンネル）"
+    )
+
+    with span('plot', 'fleet_liquidity'):
+        liquidity = figure_to_plot_data({
+            'data': [
+                {'type': 'scatter', 'x': x, 'y': overview['local_total'], 'mode': 'lines', 'name': 'ローカル残高',
+                 'line': {'color': 'blue'}, 'hovertemplate': '%{y:,.0f} sat<extra>ローカル</extra>'},
+                {'type': 'scatter', 'x': x, 'y': overview['remote_total'], 'mode': 'lines', 'name': 'リモート残高',
+                 'line': {'color': 'orange'}, 'hovertemplate': '%{y:,.0f} sat<extra>リモート</extra>'},
+            ],
+            'layout': _fleet_layout(f"ノード全体の残高推移（{bucket}ごと）", "残高 (sat)"),
+        })
+
+    with span('plot', 'fleet_ratio'):
+        edges = overview['ratio_edges']
+        ratio = figure_to_plot_data({
+            'data': [{
+                'type': 'bar',
+                'x': [f"{low:.0f}-{high:.0f}%" for low, high in zip(edges[:-1], edges[1:])],
+                'y': overview['ratio_counts'],
+                'marker': {'color': 'teal'},
+                'hovertemplate': '%{x}: %{y} チャンネル<extra></extra>',
+            }],
+            'layout': _fleet_layout("ローカル残高比率の分布（最新）", "チャンネル数", x_type='category'),
+        })
+
+    with span('plot', 'fleet_fee_changes'):
+        fee_changes = figure_to_plot_data({
+            'data': [
+                {'type': 'bar', 'x': x, 'y': overview['local_fee_changes'], 'name': 'ローカル手数料',
+                 'marker': {'color': 'red'}},
+                {'type': 'bar', 'x': x, 'y': overview['remote_fee_changes'], 'name': 'リモート手数料',
+                 'marker': {'color': 'purple'}},
+            ],
+            'layout': {**_fleet_layout(f"手数料変更回数（{bucket}ごと）", "変更回数"), 'barmode': 'stack'},
+        })
+
+    with span('plot', 'fleet_inactive'):
+        inactive = figure_to_plot_data({
+            'data': [{'type': 'scatter', 'x': x, 'y': overview['inactive_count'], 'mode': 'lines',
+                      'line': {'color': 'darkblue', 'shape': 'hv'}, 'name': '非アクティブ'}],
+            'layout': _fleet_layout(f"非アクティブなチャンネル数（{bucket}ごと）", "チャンネル数"),
+        })
+
+    return summary, liquidity, ratio, fee_changes, inactive
+
+@timed('handler', 'update_fleet')
+def build_fleet_view(period, db_path=None):
+    """フリートタブの表示内容を作成する"""
+    return create_fleet_plots(get_fleet_overview(period, db_path))
+
+def create_fleet_tab(db_path=None):
+    """
+    ノード全体（フリート）タブを作成する
+
+    Args:
+        db_path: データベースのパス
+    """
+    with gr.Blocks() as fleet_tab:
+        gr.Markdown("## ノード全体の推移")
+
+        with gr.Row():
+            period_radio = gr.Radio(
+                choices=["1week", "1month", "all"],
+                value="1week",
+                label="集計期間"
+            )
+            refresh_btn = gr.Button("更新", variant="primary")
+
+        summary = gr.Markdown()
+        liquidity_chart = gr.Plot(label="残高推移")
+        with gr.Row():
+            ratio_chart = gr.Plot(label="残高比率の分布")
+            inactive_chart = gr.Plot(label="非アクティブ数")
+        fee_chart = gr.Plot(label="手数料変更回数")
+
+        outputs = [summary, liquidity_chart, ratio_chart, fee_chart, inactive_chart]
+
+        async def update_fleet(period):
+            return await run_db(build_fleet_view, period, db_path)
+
+        # 画面を開いたとき、期間変更時、更新ボタン押下時に集計する
+        fleet_tab.load(fn=update_fleet, inputs=[period_radio], outputs=outputs)
+        period_radio.change(fn=update_fleet, inputs=[period_radio], outputs=outputs)
+        refresh_btn.click(fn=update_fleet, inputs=[period_radio], outputs=outputs)
+
+    return fleet_tab
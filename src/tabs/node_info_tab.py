@@ -1,44 +1,193 @@
 import gradio as gr
-import sqlite3
 import pandas as pd
 import numpy as np
+from database.connector import get_connection, has_latest_index, resolve_db_path
+from database.column_store import get_column_store
+from database.change_detector import cached_by_data_version
+from database.channel_stats import SUMMARY_COLUMNS, get_channel_stats_store
+from database.async_access import run_db
+from utils.metrics import span, timed
+from utils.scheduler import get_scheduler, get_data_version
+from config import CACHE_CONFIG, DATABASE_CONFIG, SCHEDULER_CONFIG, STATS_CONFIG, TABLE_CONFIG
 
-def get_latest_node_info():
+# 最新行の取得（インデックスなし）: channel_datas 全体を GROUP BY で走査する
+LATEST_SNAPSHOT_SCAN_QUERY = """
+SELECT 
+    cl.channel_name,
+    cl.channel_id,
+    cl.capacity,
+    cd.date,
+    cd.local_balance,
+    cd.local_fee,
+    cd.local_infee,
+    cd.remote_balance,
+    cd.remote_fee,
+    cd.remote_infee,
+    cd.num_updates,
+    cd.amboss_fee,
+    cd.active
+FROM 
+    channel_lists cl
+LEFT JOIN 
+    (SELECT * FROM channel_datas cd1
+     WHERE (cd1.channel_id, cd1.date) IN 
+         (SELECT channel_id, MAX(date) 
+          FROM channel_datas 
+          GROUP BY channel_id)) cd
+    ON cl.channel_id = cd.channel_id
+"""
+
+# 最新行の取得（インデックスあり）: チャンネルごとに (channel_id, date) インデックスを
+# 末尾から1件だけシークするため、履歴の長さに依存しない
+LATEST_SNAPSHOT_SEEK_QUERY = """
+SELECT 
+    cl.channel_name,
+    cl.channel_id,
+    cl.capacity,
+    cd.date,
+    cd.local_balance,
+    cd.local_fee,
+    cd.local_infee,
+    cd.remote_balance,
+    cd.remote_fee,
+    cd.remote_infee,
+    cd.num_updates,
+    cd.amboss_fee,
+    cd.active
+FROM 
+    channel_lists cl
+LEFT JOIN 
+    channel_datas cd
+    ON cd.rowid = (SELECT cd1.rowid 
+                   FROM channel_datas cd1 
+                   WHERE cd1.channel_id = cl.channel_id 
+                   ORDER BY cd1.date DESC 
+                   LIMIT 1)
+"""
+
+def _get_latest_from_column_store(conn, db_path=None):
+    """列指向ストアの最新行と channel_lists を結合する（SQL 版と同じカラム構成）"""
+    channels = pd.read_sql_query("SELECT channel_name, channel_id, capacity FROM channel_lists", conn)
+    latest = get_column_store(db_path).latest_frame()
+    latest['date'] = latest['date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    latest['active'] = latest['active'].astype(np.int64)
+    return channels.merge(latest, on='channel_id', how='left')
+
+def get_latest_node_info(db_path=None):
+    """
+    最新のノード情報を取得する
+    
+    channel_datas(channel_id, date) のインデックスがあればチャンネルごとのシーク、
+    なければ従来の全件集計クエリを使用する
+    （CACHE_CONFIG['column_store'] が有効な場合は列指向ストアから取得する）
+    チャンネル統計の列は含まない（get_latest_snapshot() で表示のたびに結合する）。
+    
+    Args:
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+    """
+    # スレッドごとの読み取り専用接続を使用
+    conn = get_connection(db_path)
+    
+    with span('sql', 'latest_snapshot'):
+        if CACHE_CONFIG['column_store']:
+            # 列指向ストアの各チャンネル末尾の行を使う
+            df = _get_latest_from_column_store(conn, db_path)
+        else:
+            # インデックスの有無でクエリを切り替える
+            if has_latest_index(conn):
+                query = LATEST_SNAPSHOT_SEEK_QUERY
+            else:
+                query = LATEST_SNAPSHOT_SCAN_QUERY
+            
+            df = pd.read_sql_query(query, conn)
+    
+    with span('transform', 'latest_snapshot'):
+        return _format_latest_node_info(df)
+
+def stats_enabled():
+    """チャンネル統計の列を表示するか"""
+    return STATS_CONFIG['enabled'] and bool(DATABASE_CONFIG.get('sidecar_path'))
+
+def _add_channel_stats(df, db_path=None):
+    """
+    サイドカーDBのチャンネル統計を結合する
+
+    バックグラウンド更新がなければ別スレッドで差分の取り込みを始め、取り込み済みの統計を表示する。
+    """
+    store = get_channel_stats_store(db_path)
+    if get_scheduler() is None:
+        store.refresh_in_background()
+    stats = store.summary().rename(columns={'channel_id': "チャンネルID", **SUMMARY_COLUMNS})
+    return df.merge(stats, on="チャンネルID", how='left')
+
+def sort_and_filter(df, sort_by=None, descending=False, filter_column=None, min_value=None, max_value=None):
     """
-    最新のノード情報を取得する（毎回新しい接続を作成）
+    一覧をサーバー側で並べ替え・絞り込みする
+    
+    絞り込み・並べ替えの対象は各チャンネルの最新行の値のため、SQL で行っても使えるインデックスはなく、
+    操作のたびに全チャンネルの最新行を求め直すことになる。ここでは DB に変更があったときだけ
+    作り直す最新スナップショットを pandas で処理する（benchmarks/bench_channel_table.py）。
+    
+    Args:
+        df: チャンネル一覧
+        sort_by: 並べ替えに使う列（None なら並べ替えない）
+        descending: 降順にするか
+        filter_column: 絞り込みに使う数値の列（None なら絞り込まない）
+        min_value / max_value: filter_column の範囲（None なら制限なし）
     """
-    # 毎回新しい接続を作成
-    conn = sqlite3.connect('data/lightning_node.db')
-    
-    # 最新のノード情報を取得するSQLクエリ
-    query = """
-    SELECT 
-        cl.channel_name,
-        cl.channel_id,
-        cl.capacity,
-        cd.date,
-        cd.local_balance,
-        cd.local_fee,
-        cd.local_infee,
-        cd.remote_balance,
-        cd.remote_fee,
-        cd.remote_infee,
-        cd.num_updates,
-        cd.amboss_fee,
-        cd.active
-    FROM 
-        channel_lists cl
-    LEFT JOIN 
-        (SELECT * FROM channel_datas cd1
-         WHERE (cd1.channel_id, cd1.date) IN 
-             (SELECT channel_id, MAX(date) 
-              FROM channel_datas 
-              GROUP BY channel_id)) cd
-        ON cl.channel_id = cd.channel_id
+    if filter_column and filter_column in df.columns:
+        values = df[filter_column]
+        mask = values.notna()
+        if min_value is not None:
+            mask &= values >= min_value
+        if max_value is not None:
+            mask &= values <= max_value
+        df = df[mask]
+    if sort_by and sort_by in df.columns:
+        df = df.sort_values(sort_by, ascending=not descending, na_position='last', kind='stable')
+    return df
+
+def filter_channels(df, active_only=False, min_ratio=None, max_ratio=None, search=None):
     """
+    チャンネル一覧を状態・残高比率・名前で絞り込む
     
-    df = pd.read_sql_query(query, conn)
+    Args:
+        df: チャンネル一覧
+        active_only: アクティブなチャンネルだけにするか
+        min_ratio / max_ratio: ローカル残高比率 (%) の範囲（None なら制限なし）
+        search: チャンネル名またはチャンネルIDに含まれる文字列（大文字・小文字は区別しない）
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if active_only:
+        mask &= (df["NodeActive"] == 1).to_numpy()
+    ratio = df["ﾛｰｶﾙ残高比率"]
+    if min_ratio is not None:
+        mask &= (ratio >= min_ratio).to_numpy()
+    if max_ratio is not None:
+        mask &= (ratio <= max_ratio).to_numpy()
+    if search and search.strip():
+        needle = search.strip()
+        mask &= (
+            df["チャンネル名"].str.contains(needle, case=False, regex=False, na=False)
+            | df["チャンネルID"].str.contains(needle, case=False, regex=False, na=False)
+        ).to_numpy()
+    return df if mask.all() else df[mask]
+
+def get_table_page(df, page=1, page_size=None):
+    """
+    並べ替え・絞り込み済みの一覧から1ページ分を切り出す
     
+    Returns:
+        (ページの DataFrame, 範囲内に補正したページ番号, ページ数)
+    """
+    page_size = int(page_size or TABLE_CONFIG['page_size'])
+    page_count = max(1, -(-len(df) // page_size))
+    page = min(max(1, int(page or 1)), page_count)
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size], page, page_count
+
+def _format_latest_node_info(df):
+    """最新スナップショットの列名を日本語にし、残高比率を追加する"""
     # 列名を日本語に変換
     df.columns = [
         "チャンネル名", "チャンネルID", "容量", "最終更新日",
@@ -65,12 +214,39 @@ def get_latest_node_info():
     ]
     df = df[column_order]
     
-    # 接続を閉じる
-    conn.close()
-        
     return df
 
-def create_node_info_tab(db_path='data/lightning_node.db'):
+# バックグラウンド更新で作成した最新スナップショット {db_path: DataFrame}
+_latest_snapshots = {}
+
+def refresh_latest_snapshot(db_path=None):
+    """最新スナップショットを作り直す（バックグラウンド更新のジョブ）"""
+    _latest_snapshots[resolve_db_path(db_path)] = get_latest_node_info(db_path)
+
+# DB に変更がない間は前回の結果を再利用する get_latest_node_info()
+_get_latest_node_info_cached = cached_by_data_version(get_latest_node_info)
+
+def get_latest_snapshot(db_path=None):
+    """
+    最新スナップショットを取得する
+    
+    バックグラウンド更新が動作していれば事前に作成した結果を返す。
+    動作していなければ get_latest_node_info() を実行するが、DB に変更がなければ
+    （PRAGMA data_version が同じなら）前回の結果を返す。
+    STATS_CONFIG['enabled'] ならサイドカーDBのチャンネル統計の列をその後で結合するため、
+    元の DB に変更がなくてもバックグラウンドで更新された統計が表示される。
+    """
+    df = None
+    if get_scheduler() is not None:
+        df = _latest_snapshots.get(resolve_db_path(db_path))
+    if df is None:
+        df = _get_latest_node_info_cached(db_path)
+    
+    if stats_enabled():
+        df = _add_channel_stats(df, db_path)
+    return df
+
+def create_node_info_tab(db_path=None):
     """
     ノード情報タブを作成する
     
@@ -88,6 +264,14 @@ def create_node_info_tab(db_path='data/lightning_node.db'):
             "ﾘﾓｰﾄ残高", "ﾘﾓｰﾄ手数料", "ﾘﾓｰﾄ入金手数料",
             "更新回数", "Amboss手数料", "NodeActive"
         ]
+        if stats_enabled():
+            columns += list(SUMMARY_COLUMNS.values())
+        
+        # 数値で並べ替え・絞り込みできる列
+        numeric_columns = [
+            column for column in columns
+            if column not in ("チャンネル名", "チャンネルID", "最終更新日")
+        ]
         
         # デフォルトで表示する列
         default_columns = ["チャンネル名", "容量", "ﾛｰｶﾙ残高比率", "ﾛｰｶﾙ手数料", "ﾛｰｶﾙ入金手数料", "ﾘﾓｰﾄ手数料", "ﾘﾓｰﾄ入金手数料", "更新回数", "Amboss手数料", "NodeActive"]
@@ -96,8 +280,8 @@ def create_node_info_tab(db_path='data/lightning_node.db'):
         def filter_data(df, selected_columns):
             if not selected_columns:  # 何も選択されていない場合は全列表示
                 return df
-            # 選択された列だけを表示
-            return df[selected_columns]
+            # 選択された列だけを表示（統計が未作成の列は除く）
+            return df[[column for column in selected_columns if column in df.columns]]
         
         # コントロールエリア（上部）
         with gr.Row():
@@ -110,6 +294,20 @@ def create_node_info_tab(db_path='data/lightning_node.db'):
                     interactive=True
                 )
                 
+                # 並べ替え・絞り込み（サーバー側で適用する）
+                with gr.Row():
+                    sort_by = gr.Dropdown(choices=numeric_columns, value=None, label="並べ替え", interactive=True)
+                    descending = gr.Checkbox(value=True, label="降順")
+                with gr.Row():
+                    filter_column = gr.Dropdown(choices=numeric_columns, value=None, label="絞り込み", interactive=True)
+                    min_value = gr.Number(value=None, label="最小値")
+                    max_value = gr.Number(value=None, label="最大値")
+                with gr.Row():
+                    search = gr.Textbox(value="", label="チャンネル名・ID検索", placeholder="部分一致")
+                    active_only = gr.Checkbox(value=False, label="アクティブのみ")
+                    min_ratio = gr.Number(value=None, label="残高比率の下限 (%)")
+                    max_ratio = gr.Number(value=None, label="残高比率の上限 (%)")
+                
                 # 更新ボタン
                 refresh_btn = gr.Button("データを更新", variant="primary", size="lg")
         
@@ -118,36 +316,121 @@ def create_node_info_tab(db_path='data/lightning_node.db'):
             # テーブルの表示（幅いっぱいに表示）
             table = gr.DataFrame(interactive=False)
         
+        # ページ送り（表示中のページだけをブラウザに送る）
+        with gr.Row():
+            prev_btn = gr.Button("前へ", size="sm")
+            page = gr.Number(value=1, precision=0, minimum=1, label="ページ")
+            next_btn = gr.Button("次へ", size="sm")
+            page_size = gr.Dropdown(choices=TABLE_CONFIG['page_sizes'], value=TABLE_CONFIG['page_size'], label="表示件数")
+            page_info = gr.Markdown()
+        
+        # 画面ごとに表示済みのデータバージョン
+        seen_version = gr.State(None)
+        
+        # バックグラウンド更新の結果を定期的に反映するタイマー
+        refresh_timer = gr.Timer(SCHEDULER_CONFIG['interval'], active=SCHEDULER_CONFIG['enabled'])
+        
         # 初期データの表示
-        def update_table(selected_columns=None):
+        @timed('handler', 'update_table')
+        def load_table(selected_columns=None, refresh=False, view=()):
             if selected_columns is None:
                 selected_columns = default_columns
+            (sort_column, sort_descending, filter_by, min_filter, max_filter,
+             search_text, active, ratio_low, ratio_high, size, page_number) = view or (None,) * 11
+            
+            # 更新ボタン押下時は新しいデータがないか確認してから読む
+            scheduler = get_scheduler()
+            if refresh and scheduler is not None:
+                scheduler.run_once()
                 
-            df = get_latest_node_info()
+            df = get_latest_snapshot(db_path)
+            df = filter_channels(df, active, ratio_low, ratio_high, search_text)
+            df = sort_and_filter(df, sort_column, sort_descending, filter_by, min_filter, max_filter)
+            matched = len(df)
+            df, page_number, page_count = get_table_page(df, page_number, size)
+            info = f"{page_number} / {page_count} ページ（{matched} チャンネル）"
             
             # フィルタリングを適用
             if selected_columns:  # 選択された列がある場合
-                filtered_df = filter_data(df, selected_columns)
-                return filtered_df
-            return df  # 何も選択されていない場合は全て表示
+                df = filter_data(df, selected_columns)
+            return df, page_number, info
+        
+        # DB アクセスはスレッドプールで実行する
+        async def update_table(selected_columns=None, refresh=False, view=()):
+            return await run_db(load_table, selected_columns, refresh, view)
+        
+        # カラム選択・ページ移動時の処理
+        async def update_with_columns(selected_columns, *view):
+            return await update_table(selected_columns, view=view)
         
-        # 起動時に初期データを表示
-        table.value = update_table()
+        # 並べ替え・絞り込みの変更時は先頭ページに戻る
+        async def update_from_first_page(selected_columns, *view):
+            return await update_table(selected_columns, view=(*view[:-1], 1))
         
-        # カラム選択または更新ボタン押下時の処理
-        def update_with_columns(selected_columns):
-            return update_table(selected_columns)
+        async def move_page(step, selected_columns, *view):
+            return await update_table(selected_columns, view=(*view[:-1], (view[-1] or 1) + step))
+        
+        async def prev_page(selected_columns, *view):
+            return await move_page(-1, selected_columns, *view)
+        
+        async def next_page(selected_columns, *view):
+            return await move_page(1, selected_columns, *view)
+        
+        async def refresh_table(selected_columns, *view):
+            return await update_table(selected_columns, refresh=True, view=view)
+        
+        table_inputs = [column_selector, sort_by, descending, filter_column, min_value, max_value,
+                        search, active_only, min_ratio, max_ratio, page_size, page]
+        table_outputs = [table, page, page_info]
         
         column_selector.change(
             fn=update_with_columns,
-            inputs=[column_selector],
-            outputs=table
+            inputs=table_inputs,
+            outputs=table_outputs
         )
         
-        refresh_btn.click(
+        for control in [sort_by, descending, filter_column, min_value, max_value,
+                        search, active_only, min_ratio, max_ratio, page_size]:
+            control.change(
+                fn=update_from_first_page,
+                inputs=table_inputs,
+                outputs=table_outputs
+            )
+        
+        # ページ番号は出力でも更新されるため、ユーザーの入力時だけ読み直す
+        page.input(
             fn=update_with_columns,
-            inputs=[column_selector],
-            outputs=table
+            inputs=table_inputs,
+            outputs=table_outputs
+        )
+        prev_btn.click(fn=prev_page, inputs=table_inputs, outputs=table_outputs)
+        next_btn.click(fn=next_page, inputs=table_inputs, outputs=table_outputs)
+        
+        # 初期データは画面を開いたときに読み込む（UI 構築時にはクエリを実行しない）
+        node_info_tab.load(
+            fn=update_with_columns,
+            inputs=table_inputs,
+            outputs=table_outputs
+        )
+        
+        refresh_btn.click(
+            fn=refresh_table,
+            inputs=table_inputs,
+            outputs=table_outputs
+        )
+        
+        # 新しいデータを検出した場合のみ表示を更新
+        async def refresh_on_timer(selected_columns, *view_and_version):
+            *view, version = view_and_version
+            current_version = get_data_version()
+            if current_version is None or current_version == version:
+                return gr.update(), gr.update(), gr.update(), version
+            return *await update_table(selected_columns, view=view), current_version
+        
+        refresh_timer.tick(
+            fn=refresh_on_timer,
+            inputs=[*table_inputs, seen_version],
+            outputs=[*table_outputs, seen_version]
         )
     
     return node_info_tab
\ No newline at end of file
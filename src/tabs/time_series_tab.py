@@ -1,149 +1,562 @@
 import gradio as gr
-import sqlite3
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go  # これを追加
 import numpy as np
 from datetime import datetime, timedelta
-import matplotlib.colors as mcolors  # これを追加
+from database.connector import get_connection
+from database.channel_datas import channel_data_select, iter_channel_datas, read_channel_datas
+from database.column_store import get_column_store
+from database.change_detector import cached_by_data_version, get_db_version
+from database.async_access import run_db
+from database.rollups import choose_bucket, span_bucket, get_first_date, get_multi_rollup_data, get_rollup_data, reduce_to_buckets
+from database.parquet_store import get_parquet_boundary, iter_channel_history, read_channel_history
+from database.channel_events import EVENT_TYPES, get_channel_event_store
+from database.epoch_index import epoch_index_enabled, get_epoch_index
+from utils.series_cache import SeriesCache, SeriesCacheEntry
+from utils.figure_cache import FigureCache
+from utils.downsample import downsample_frame, downsample_indices
+from utils.plot_data import figure_to_plot_data, plotly_figure_to_plot_data, plot_values
+from utils.metrics import span, timed
+from utils.scheduler import get_scheduler, get_data_version
+from config import CACHE_CONFIG, CHART_CONFIG, DATABASE_CONFIG, EVENTS_CONFIG, SCHEDULER_CONFIG
 
-def get_channel_names(db_path='data/lightning_node.db'):
+def get_channel_names(db_path=None):
     """
     チャンネル名の一覧を取得する
     """
-    conn = sqlite3.connect(db_path)
+    conn = get_connection(db_path)
     cursor = conn.cursor()
     cursor.execute("SELECT channel_name, channel_id FROM channel_lists")
     channels = cursor.fetchall()
-    conn.close()
     return channels
 
-def get_channel_info(channel_name, db_path='data/lightning_node.db'):
+def get_channel_info(channel_name, db_path=None):
     """
     チャンネル名からチャンネル情報（ID、容量）を取得する
     """
-    conn = sqlite3.connect(db_path)
+    conn = get_connection(db_path)
     cursor = conn.cursor()
     cursor.execute("SELECT channel_id, capacity FROM channel_lists WHERE channel_name = ?", (channel_name,))
     result = cursor.fetchone()
-    conn.close()
     
     if result:
         return {"id": result[0], "capacity": result[1]}
     return {"id": None, "capacity": 0}
 
-def get_channel_id_by_name(channel_name):
+def get_channel_id_by_name(channel_name, db_path=None):
     """
     チャンネル名からチャンネルIDを取得する
     """
-    conn = sqlite3.connect('data/lightning_node.db')
+    conn = get_connection(db_path)
     cursor = conn.cursor()
     cursor.execute("SELECT channel_id FROM channel_lists WHERE channel_name = ?", (channel_name,))
     result = cursor.fetchone()
-    conn.close()
     
     if result:
         return result[0]
     return None
 
-def get_time_series_data(channel_id, period="1week"):
+# チャンネルごとのクリーニング済み時系列データ
+_series_cache = SeriesCache(max_channels=CACHE_CONFIG['series_max_channels'])
+
+# 作成済みのチャート（キー: チャンネルID, 期間, 開始日, 最新行の date, 統合表示か, イベントの抽出が最新行まで済んでいるか）
+_figure_cache = FigureCache(max_entries=CACHE_CONFIG['figure_max_entries'],
+                            max_bytes=CACHE_CONFIG['figure_max_bytes'])
+
+@cached_by_data_version
+def get_latest_channel_date(db_path, channel_id):
+    """チャンネルの最新行の date を取得する（DB に変更がなければ前回の値を返す）"""
+    row = get_connection(db_path).execute(
+        "SELECT MAX(date) FROM channel_datas WHERE channel_id = ?", (channel_id,)
+    ).fetchone()
+    return row[0] if row else None
+
+def get_period_start_date(period):
     """
-    特定チャンネルの時系列データを取得する
+    期間から取得開始日 ("%Y-%m-%d") を計算する
     
     Args:
-        channel_id: チャンネルID
         period: 期間 ("1week" または "1month" または "all")
     """
-    conn = sqlite3.connect('data/lightning_node.db')
-    
-    # チャンネル容量を取得
-    capacity_query = "SELECT capacity FROM channel_lists WHERE channel_id = ?"
-    capacity_result = conn.execute(capacity_query, (channel_id,)).fetchone()
-    capacity = capacity_result[0] if capacity_result else 0
-    
-    # 期間に応じて日付範囲を計算
     today = datetime.now()
     if period == "1week":
-        start_date = (today - timedelta(days=7)).strftime("%Y-%m-%d")
+        return (today - timedelta(days=7)).strftime("%Y-%m-%d")
     elif period == "1month":
-        start_date = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+        return (today - timedelta(days=30)).strftime("%Y-%m-%d")
     else:  # "all" - すべてのデータを取得
-        start_date = "2000-01-01"  # 十分に過去
-    
-    query = """
+        return "2000-01-01"  # 十分に過去
+
+def _time_series_query(channel_id, start=None, end=None, after=None):
+    """チャンネルの期間内の行を date 順に読むクエリとパラメータ（期間の指定は _fetch_time_series と同じ）"""
+    conditions, params = ["channel_id = ?"], [channel_id]
+    for bound, operator in ((start, ">="), (end, "<"), (after, ">")):
+        if bound is not None:
+            conditions.append(f"date {operator} ?")
+            params.append(bound)
+    query = f"""
     SELECT 
         date,
-        local_balance,
-        local_fee,
-        local_infee,
-        remote_balance,
-        remote_fee,
-        remote_infee,
-        num_updates,
-        amboss_fee,
-        active
+        {channel_data_select()}
     FROM 
         channel_datas
     WHERE 
-        channel_id = ? AND
-        date >= ?
+        {' AND '.join(conditions)}
     ORDER BY 
         date ASC
     """
+    return query, params
+
+def _fetch_time_series(conn, channel_id, start=None, end=None, after=None, db_path=None):
+    """
+    channel_datas から期間内の行を日付順に型付きで取得する
+    
+    DATABASE_CONFIG['epoch_index'] が有効で、インデックスがバックグラウンド更新で最新の行まで
+    作成済みなら、サイドカーDBの整数の日時インデックスで範囲を絞り込み、date も文字列を解析せずに作成する。
+    
+    Args:
+        conn: データベース接続
+        channel_id: チャンネルID
+        start: この日時以上（None なら制限なし）
+        end: この日時未満（None なら制限なし）
+        after: この日時より後（None なら制限なし）
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+    
+    Returns:
+        (DataFrame, 取得した最新行の date 文字列 または None)
+    """
+    query, params = _time_series_query(channel_id, start, end, after)
     
     # クエリ実行
     try:
-        df = pd.read_sql_query(query, conn, params=(channel_id, start_date))
-        
-        # デバッグ出力
-        #print(f"取得したデータ行数: {len(df)}")
-        #if not df.empty:
-            #print(f"データ期間: {df['date'].min()} から {df['date'].max()}")
+        if epoch_index_enabled():
+            result = get_epoch_index(db_path).read_range(channel_id, start, end, after)
+            if result is not None:
+                return result
+        return read_channel_datas(conn, query, params, name='time_series')
     except Exception as e:
         print(f"データ取得エラー: {e}")
-        df = pd.DataFrame()  # 空のデータフレームを返す
-    
-    conn.close()
+        return pd.DataFrame(), None  # 空のデータフレームを返す
+
+def _add_balance_ratio(df, capacity):
+    """容量と残高比率のカラムを設定する"""
+    with span('transform', 'balance_ratio'):
+        # 容量情報を追加
+        df['capacity'] = capacity
+        
+        # 残高比率を計算（ゼロ除算を回避）
+        if capacity > 0:
+            df['local_balance_ratio'] = np.round(df['local_balance'].to_numpy() / capacity * 100, 2)
+        else:
+            df['local_balance_ratio'] = 0.0
+        return df
+
+def _get_capacity(conn, channel_id):
+    """チャンネル容量を取得する"""
+    capacity_query = "SELECT capacity FROM channel_lists WHERE channel_id = ?"
+    capacity_result = conn.execute(capacity_query, (channel_id,)).fetchone()
+    return capacity_result[0] if capacity_result and capacity_result[0] else 0
+
+def _load_time_series(conn, channel_id, capacity, start=None, end=None, after=None, db_path=None):
+    """
+    期間内の行を取得して残高比率を追加する（期間の指定は _fetch_time_series と同じ）
     
+    Returns:
+        (DataFrame, 取得した最新行の date 文字列 または None)
+    """
+    df, last_date = _fetch_time_series(conn, channel_id, start, end, after, db_path)
     if df.empty:
-        return df
+        return df, None
+    return _add_balance_ratio(df, capacity), last_date
+
+def _load_time_series_range(conn, channel_id, start_date, end_date, capacity, db_path=None):
+    """
+    start_date 以上 end_date 未満（end_date が None なら最新まで）の行を取得して残高比率を追加する
     
-    # 日付を日時型に変換
-    df['date'] = pd.to_datetime(df['date'])
+    PARQUET_CONFIG['enabled'] が有効で、範囲に Parquet へ書き出し済みの月が含まれる場合は
+    その部分を Parquet から読み、残り（今月分など）だけを SQLite から読む。
     
-    # データの前処理 - 数値カラムの型変換を確実に行う
-    numeric_cols = ['local_balance', 'local_fee', 'local_infee', 
-                    'remote_balance', 'remote_fee', 'remote_infee',
-                    'num_updates', 'amboss_fee', 'active']
+    Returns:
+        (DataFrame, 取得した最新行の date 文字列 または None)
+    """
+    boundary = get_parquet_boundary(db_path)
+    if boundary is not None and start_date < boundary:
+        try:
+            history = read_channel_history(channel_id, start_date, boundary if end_date is None else min(boundary, end_date))
+        except Exception as e:
+            print(f"Parquet 読み込みエラー: {e}")
+            history = None
+        
+        if history is not None:
+            if end_date is None:
+                recent, last_date = _fetch_time_series(conn, channel_id, start=boundary, db_path=db_path)
+            elif end_date > boundary:
+                recent, last_date = _fetch_time_series(
+                    conn, channel_id, start=boundary, end=end_date, db_path=db_path)
+            else:
+                recent, last_date = pd.DataFrame(), None
+            if last_date is None and not history.empty:
+                last_date = history['date'].iloc[-1].strftime("%Y-%m-%d %H:%M:%S")
+            
+            df = _concat_frames(history, recent)
+            if df.empty:
+                return df, None
+            return _add_balance_ratio(df, capacity), last_date
     
-    for col in numeric_cols:
-        if col in df.columns:
-            # 文字列から数値に変換
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return _load_time_series(conn, channel_id, capacity, start=start_date, end=end_date, db_path=db_path)
+
+def _concat_frames(*frames):
+    """空でない DataFrame だけを連結する"""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+def get_time_series_data(channel_id, period="1week", db_path=None, refresh=True):
+    """
+    特定チャンネルの時系列データを取得する
+    
+    クリーニング済みデータをチャンネルごとにキャッシュし、DB からは未取得の範囲だけを読む。
+    PARQUET_CONFIG['enabled'] なら Parquet に書き出し済みの月は Parquet から読む。
+    refresh=True なら前回取得した最新行より新しい行を追加取得し（DB のデータバージョンが
+    前回から変わっていなければ取得しない）、refresh=False ならキャッシュ済みの範囲から
+    期間分を切り出すだけにする。
+    データの期間が ROLLUP_CONFIG['raw_max_days'] を超える場合は
+    get_time_series_rollup() のバケット集計データを返す（ROLLUP_CONFIG['enabled'] が無効なら
+    get_time_series_reduced() で読み込みながら集計したデータ）。どちらも書き出し済みの月は
+    Parquet から読む。
+    CACHE_CONFIG['column_store'] が有効な場合は、どちらも使わず列指向ストアから切り出す。
+    
+    Args:
+        channel_id: チャンネルID
+        period: 期間 ("1week" または "1month" または "all")
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+        refresh: 新しい行を DB から追加取得するか
+    """
+    conn = get_connection(db_path)
+    start_date = get_period_start_date(period)
+    
+    # 列指向ストアが有効なら、ストアのビューから期間分を切り出す
+    if CACHE_CONFIG['column_store']:
+        store = get_column_store(db_path, refresh=refresh)
+        df = store.channel_frame(channel_id, start_date)
+        if df.empty:
+            return df
+        return _add_balance_ratio(df, _get_capacity(conn, channel_id))
+    
+    # 長期間はバケット集計したデータを使う（SQL 側の集計が無効なら読み込みながら集計する）
+    if span_bucket(start_date) is not None:
+        first_date = get_first_date(channel_id, db_path)
+        bucket = span_bucket(max(start_date, first_date) if first_date else None)
+        if bucket is not None:
+            if choose_bucket(start_date) is not None:
+                return get_time_series_rollup(channel_id, start_date, bucket, db_path)
+            return get_time_series_reduced(channel_id, start_date, bucket, db_path)
+    
+    with _series_cache.lock_for(channel_id):
+        entry = _series_cache.get(channel_id)
+        
+        # DB に変更がなければ新しい行の確認を省略する（PRAGMA data_version 1回のみ）
+        data_version = None
+        if entry is None or refresh:
+            data_version = get_db_version(db_path)
+            if entry is not None and entry.data_version == data_version:
+                refresh = False
+        
+        if entry is None or refresh or start_date < entry.start_date:
+            # チャンネル容量を取得
+            capacity = _get_capacity(conn, channel_id)
             
-            # NULL値を0に変換
-            df[col] = df[col].fillna(0)
+            if entry is None:
+                # 初回は期間全体を取得
+                df, last_date = _load_time_series_range(conn, channel_id, start_date, None, capacity, db_path)
+                entry = SeriesCacheEntry(df, start_date, last_date, capacity, data_version)
+            else:
+                if capacity != entry.capacity and not entry.df.empty:
+                    entry.df = _add_balance_ratio(entry.df.copy(), capacity)
+                entry.capacity = capacity
+                
+                # キャッシュ済み範囲より前の期間が必要なら、その部分だけを取得して前に追加
+                if start_date < entry.start_date:
+                    older, older_last_date = _load_time_series_range(
+                        conn, channel_id, start_date, entry.start_date, capacity, db_path)
+                    entry.df = _concat_frames(older, entry.df)
+                    entry.start_date = start_date
+                    if entry.last_date is None:
+                        entry.last_date = older_last_date
+                
+                # 前回の最新行より新しい行だけを取得して後ろに追加
+                if refresh:
+                    if entry.last_date is None:
+                        newer, newer_last_date = _load_time_series(
+                            conn, channel_id, capacity, start=entry.start_date, db_path=db_path)
+                    else:
+                        newer, newer_last_date = _load_time_series(
+                            conn, channel_id, capacity, after=entry.last_date, db_path=db_path)
+                    if newer_last_date is not None:
+                        entry.df = _concat_frames(entry.df, newer)
+                        entry.last_date = newer_last_date
+                    entry.data_version = data_version
             
-            # 異常な極端値を除去
-            if 'fee' in col:
-                if 'infee' in col:
-                    # 入金/出金手数料はマイナス値も許容（出金の場合）
-                    df[col] = df[col].clip(-1000000, 1000000)  # マイナスも許容
-                else:
-                    # 手数料率はゼロ以上、100万ppm(100%)以下
-                    df[col] = df[col].clip(0, 1000000)
+            _series_cache.put(channel_id, entry)
+        
+        df = entry.df
     
-    # 容量情報を追加
-    df['capacity'] = capacity
+    if df.empty:
+        return df
     
-    # 残高比率を計算（ゼロ除算を回避）
-    df['local_balance_ratio'] = np.where(df['capacity'] > 0, 
-                                         np.round((df['local_balance'] / df['capacity']) * 100, 2),
-                                         0)
+    # キャッシュから期間分を切り出す（date 昇順なので二分探索）
+    # 返す DataFrame はキャッシュと配列を共有するため、呼び出し側で変更しないこと
+    start_pos = df['date'].searchsorted(pd.Timestamp(start_date))
+    return df.iloc[start_pos:]
+
+def warm_series_cache(db_path=None):
+    """
+    キャッシュ済みチャンネルに新しい行を取り込む（バックグラウンド更新のジョブ）
+    
+    列指向ストアが有効な場合はストアを更新する。
+    """
+    if CACHE_CONFIG['column_store']:
+        get_column_store(db_path, refresh=True)
+        return
+    for channel_id in _series_cache.channel_ids():
+        get_time_series_data(channel_id, "1week", db_path, refresh=True)
+
+def get_time_series_rollup(channel_id, start_date, bucket, db_path=None):
+    """
+    バケット単位に集計した時系列データを取得する
+    
+    各バケットの値はバケット内の最新行の値で、local_balance については
+    local_balance_avg / local_balance_min / local_balance_max も含む。
+    PARQUET_CONFIG['enabled'] が有効で、期間に Parquet へ書き出し済みの月が含まれる場合は
+    その部分を Parquet から読みながら集計し、残り（今月分など）だけを SQL 側で集計する
+    （月の境界は時間・日のバケットの境界と一致するため、境界をまたぐバケットはない）。
     
+    Args:
+        channel_id: チャンネルID
+        start_date: 取得開始日 ("%Y-%m-%d")
+        bucket: 'hourly' または 'daily'
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+    """
+    conn = get_connection(db_path)
+    capacity = _get_capacity(conn, channel_id)
+    
+    df = None
+    boundary = get_parquet_boundary(db_path)
+    if boundary is not None and start_date < boundary:
+        try:
+            history = reduce_to_buckets(iter_channel_history(channel_id, start_date, boundary), bucket)
+        except Exception as e:
+            print(f"Parquet 読み込みエラー: {e}")
+        else:
+            try:
+                df = _concat_frames(history, get_rollup_data(channel_id, boundary, bucket, db_path))
+            except Exception as e:
+                print(f"集計データ取得エラー: {e}")
+                return pd.DataFrame()
+    
+    if df is None:
+        try:
+            df = get_rollup_data(channel_id, start_date, bucket, db_path)
+        except Exception as e:
+            print(f"集計データ取得エラー: {e}")
+            return pd.DataFrame()
+    
+    if df.empty:
+        return df
+    
+    return _add_balance_ratio(df, capacity)
+
+def _iter_time_series_chunks(conn, channel_id, start_date, db_path=None):
+    """
+    start_date 以降の行を date 順にチャンクごとに返すジェネレータ
+    
+    Parquet に書き出し済みの月は1か月ずつ Parquet から読み、残りは SQLite から
+    DATABASE_CONFIG['read_chunk_rows'] 行ずつ読む。
+    """
+    boundary = get_parquet_boundary(db_path)
+    if boundary is not None and start_date < boundary:
+        yield from iter_channel_history(channel_id, start_date, boundary)
+        start_date = boundary
+    query, params = _time_series_query(channel_id, start=start_date)
+    for df, _ in iter_channel_datas(conn, query, params, name='time_series'):
+        yield df
+
+def get_time_series_reduced(channel_id, start_date, bucket, db_path=None):
+    """
+    生データを読み込みながらバケット単位に集計した時系列データを取得する
+    
+    SQL 側の集計（ROLLUP_CONFIG['enabled']）が無効な場合の長期間の経路。チャンクごとに
+    バケットへ縮約するため、履歴が長くても生データ全体をメモリに保持しない。
+    カラムは get_time_series_rollup と同じ。
+    
+    Args:
+        channel_id: チャンネルID
+        start_date: 取得開始日 ("%Y-%m-%d")
+        bucket: 'hourly' または 'daily'
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+    """
+    conn = get_connection(db_path)
+    capacity = _get_capacity(conn, channel_id)
+    
+    try:
+        df = reduce_to_buckets(_iter_time_series_chunks(conn, channel_id, start_date, db_path), bucket)
+    except Exception as e:
+        print(f"集計データ取得エラー: {e}")
+        return pd.DataFrame()
+    
+    if df.empty:
+        return df
+    
+    return _add_balance_ratio(df, capacity)
+
+def _split_by_channel(df):
+    """
+    channel_id 順に並んだ DataFrame をチャンネルごとに分割する
+    
+    channel_id が変わる位置を NumPy で求め、各チャンネルの行範囲を iloc で切り出す。
+    
+    Returns:
+        {channel_id: DataFrame}
+    """
+    if df.empty:
+        return {}
+    channel_ids = df['channel_id'].to_numpy()
+    starts = np.r_[0, np.flatnonzero(channel_ids[1:] != channel_ids[:-1]) + 1]
+    ends = np.r_[starts[1:], len(df)]
+    df = df.drop(columns='channel_id')
+    return {
+        channel_ids[start]: df.iloc[start:end].reset_index(drop=True)
+        for start, end in zip(starts, ends)
+    }
+
+def _read_multi_channel_raw(conn, channel_ids, start_date):
+    """複数チャンネルの生データを channel_id IN (...) の1回のクエリで (channel_id, date) 順に読む"""
+    query = f"""
+    SELECT 
+        channel_id,
+        date,
+        {channel_data_select()}
+    FROM 
+        channel_datas
+    WHERE 
+        channel_id IN ({', '.join('?' * len(channel_ids))}) AND
+        date >= ?
+    ORDER BY 
+        channel_id, date ASC
+    """
+    df, _ = read_channel_datas(conn, query, (*channel_ids, start_date), name='multi_channel')
     return df
 
-def update_capacity(channel_name, db_path='data/lightning_node.db'):
+def get_multi_channel_data(channel_names, period="1week", db_path=None):
+    """
+    複数チャンネルの時系列データをまとめて取得する
+    
+    channel_id IN (...) のクエリで (channel_id, date) 順に読み、チャンネルごとに分割する。
+    集計粒度は1チャンネルの表示と同じくチャンネルごとに選び（生データ / 1時間 / 1日）、
+    粒度ごとに1回のクエリ（集計は GROUP BY channel_id, バケット）で読む。
+    CACHE_CONFIG['column_store'] が有効な場合は列指向ストアのデータを使う。
+    
+    Args:
+        channel_names: チャンネル名のリスト
+        period: 期間 ("1week" または "1month" または "all")
+        db_path: データベースのパス（未指定なら DATABASE_CONFIG['path']）
+    
+    Returns:
+        [(チャンネル名, DataFrame)] のリスト（channel_names の順、データがないチャンネルは除く）
+    """
+    if not channel_names:
+        return []
+    conn = get_connection(db_path)
+    start_date = get_period_start_date(period)
+    
+    placeholders = ", ".join("?" * len(channel_names))
+    channels = conn.execute(
+        f"SELECT channel_name, channel_id, capacity FROM channel_lists WHERE channel_name IN ({placeholders})",
+        tuple(channel_names)
+    ).fetchall()
+    info = {name: (channel_id, capacity or 0) for name, channel_id, capacity in channels}
+    channel_ids = [info[name][0] for name in channel_names if name in info]
+    if not channel_ids:
+        return []
+    id_placeholders = ", ".join("?" * len(channel_ids))
+    
+    if CACHE_CONFIG['column_store']:
+        store = get_column_store(db_path, refresh=False)
+        frames = {channel_id: store.channel_frame(channel_id, start_date) for channel_id in channel_ids}
+    else:
+        # 長期間は SQL 側でバケット集計したデータを使う（粒度はチャンネルごとの最初の行から選ぶ）
+        buckets = {channel_id: None for channel_id in channel_ids}
+        if choose_bucket(start_date) is not None:
+            first_dates = conn.execute(
+                f"SELECT channel_id, MIN(date) FROM channel_datas WHERE channel_id IN ({id_placeholders}) "
+                f"GROUP BY channel_id",
+                tuple(channel_ids)
+            ).fetchall()
+            for channel_id, first_date in first_dates:
+                buckets[channel_id] = choose_bucket(max(start_date, first_date) if first_date else None)
+        
+        frames = {}
+        for bucket in dict.fromkeys(buckets.values()):
+            bucket_ids = [channel_id for channel_id in channel_ids if buckets[channel_id] == bucket]
+            try:
+                if bucket is None:
+                    df = _read_multi_channel_raw(conn, bucket_ids, start_date)
+                else:
+                    df = get_multi_rollup_data(bucket_ids, start_date, bucket, db_path)
+            except Exception as e:
+                print(f"データ取得エラー: {e}")
+                continue
+            frames.update(_split_by_channel(df))
+    
+    series = []
+    for name in channel_names:
+        if name not in info:
+            continue
+        channel_id, capacity = info[name]
+        df = frames.get(channel_id)
+        if df is not None and not df.empty:
+            series.append((name, _add_balance_ratio(df, capacity)))
+    return series
+
+def events_enabled():
+    """チャートにイベントの注釈を表示するか"""
+    return EVENTS_CONFIG['enabled'] and bool(DATABASE_CONFIG.get('sidecar_path'))
+
+def get_channel_events(channel_id, start_date, db_path=None):
+    """
+    チャンネルのイベントを取得する（サイドカーDBの channel_events から、無効なら None）
+    
+    バックグラウンド更新が動作していなければ、別スレッドで新しい行からのイベントの抽出を始め、
+    抽出済みのイベントを返す。
+    """
+    if not events_enabled():
+        return None
+    try:
+        store = get_channel_event_store(db_path)
+        if get_scheduler() is None:
+            store.refresh_in_background()
+        return store.events(channel_id, start_date)
+    except Exception as e:
+        print(f"イベント取得エラー: {e}")
+        return None
+
+def _events_current(latest_date, db_path=None):
+    """
+    イベントの抽出がチャンネルの最新行まで済んでいるか（チャートのキャッシュキーに使う）
+
+    抽出が遅れている間に作成したチャートは、抽出が追いついた後に作り直されるようにする。
+    """
+    if not events_enabled() or latest_date is None:
+        return True
+    try:
+        ingested = get_channel_event_store(db_path).ingested_until()
+    except Exception:
+        return False
+    return ingested is not None and ingested >= latest_date
+
+@timed('handler', 'update_capacity')
+def update_capacity(channel_name, db_path=None):
     if not channel_name:
         return ""
     
@@ -155,29 +568,111 @@ def update_capacity(channel_name, db_path='data/lightning_node.db'):
     
     return formatted_capacity
 
-def create_custom_plot(df, x_col, y_col, title, y_label, color='blue', allow_negative=False):
-    """カスタムプロット作成関数 - マイナス値にも対応"""
-    fig = go.Figure()
+# 時系列チャートの定義 (y列, タイトル, Y軸ラベル, 色, マイナス値を許容するか)
+CHART_SPECS = [
+    ("local_balance_ratio", "ローカル残高比率推移", "ローカル残高比率 (%)", 'blue', False),
+    ("local_fee", "ローカル手数料率推移", "手数料率 (ppm)", 'red', False),
+    ("local_infee", "ローカル入金手数料推移", "入金手数料 (sat)", 'green', True),
+    ("remote_fee", "リモート手数料率推移", "手数料率 (ppm)", 'purple', False),
+    ("remote_infee", "リモート入金手数料推移", "入金手数料 (sat)", 'orange', True),
+    ("amboss_fee", "Amboss手数料推移", "手数料 (sat)", 'teal', False),
+    ("active", "チャンネル状態推移", "状態 (0=無効, 1=有効)", 'darkblue', False),
+]
+
+# 補助線の色に使う名前付きの色 (R, G, B)（CSS の色名と同じ値）
+NAMED_COLORS = {
+    'blue': (0, 0, 255),
+    'red': (255, 0, 0),
+    'green': (0, 128, 0),
+    'purple': (128, 0, 128),
+    'orange': (255, 165, 0),
+    'teal': (0, 128, 128),
+    'darkblue': (0, 0, 139),
+}
+
+def _rgba(color, alpha):
+    """色名または #rrggbb を rgba() 形式の文字列にする（変換できなければそのまま返す）"""
+    rgb = NAMED_COLORS.get(color)
+    if rgb is None and color.startswith('#') and len(color) == 7:
+        rgb = tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+    if rgb is None:
+        return color
+    return f'rgba({",".join(str(c) for c in rgb)},{alpha})'
+
+def _to_plot_x(values):
+    """
+    x 値を間引き用の NumPy 配列に変換する
     
-    # データが存在するか確認
-    if df.empty or x_col not in df.columns or y_col not in df.columns:
-        # 空のグラフを返す
-        fig.update_layout(title=f"{title} (データなし)")
-        return fig
+    datetime は epoch ミリ秒の float64 にする（date 軸は数値をミリ秒として扱う）。
+    図に格納するときは plot_values() でリストにする。
+    """
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+    return values
+
+# チャートごとに注釈として表示するイベントの種類
+CHART_EVENTS = {
+    'local_balance_ratio': ['balance_jump'],
+    'local_fee': ['local_fee'],
+    'local_infee': ['local_infee'],
+    'active': ['offline', 'online'],
+}
+
+def _thin_events(dates, max_points):
+    """
+    イベントが max_points を超える場合に、期間を max_points 個の等間隔のバケットに分け、
+    バケットごとに最新のイベントだけを残す位置の配列を返す（間引かない場合は None）
+    """
+    if len(dates) <= max_points:
+        return None
+    times = dates.astype('datetime64[ns]').astype(np.int64)
+    span_ns = max(int(times[-1] - times[0]), 1)
+    buckets = ((times - times[0]) * (max_points - 1) // span_ns)
+    return np.flatnonzero(np.append(buckets[1:] != buckets[:-1], True))
+
+def chart_events(events, y_col, capacity=0, max_points=None):
+    """
+    チャートに重ねるイベントの点（date, y, event_type, old_value, new_value）を作成する
     
-    # 明示的にx列とy列を抽出
-    x_values = df[x_col].tolist()
-    y_values = df[y_col].tolist()
+    y はイベント後の値（残高比率のチャートでは容量に対する割合）。
+    イベント数は本体のトレースと同じく max_points（省略時は CHART_CONFIG['max_points']）までにし、
+    超える場合は期間を等分したバケットごとに最新のイベントだけを残す。
     
-    # デバッグ出力
-    #print(f"\n{title}のデータ確認:")
-    #print(f"x列({x_col})の最初の5つの値: {x_values[:5]} ...")
-    #print(f"y列({y_col})の最初の5つの値: {y_values[:5]} ...")
-    #print(f"y列の最小値: {min(y_values)}, 最大値: {max(y_values)}")
+    Returns:
+        DataFrame（表示するイベントがなければ None）
+    """
+    if events is None or events.empty or y_col not in CHART_EVENTS:
+        return None
+    events = events[events['event_type'].isin(CHART_EVENTS[y_col])]
+    if events.empty:
+        return None
     
-    # Y軸の範囲を計算
-    y_min = min(y_values) if y_values else 0
-    y_max = max(y_values) if y_values else 1
+    if max_points is None:
+        max_points = CHART_CONFIG['max_points']
+    keep = _thin_events(events['date'].to_numpy(), max_points)
+    if keep is not None:
+        events = events.iloc[keep]
+    
+    new_values = events['new_value'].to_numpy()
+    if y_col == 'local_balance_ratio':
+        y = np.round(new_values / capacity * 100, 2) if capacity > 0 else np.zeros(len(events))
+    else:
+        y = new_values
+    return pd.DataFrame({
+        'date': events['date'].to_numpy(),
+        'y': y,
+        'event_type': events['event_type'].to_numpy(),
+        'old_value': events['old_value'].to_numpy(),
+        'new_value': new_values,
+    })
+
+def _y_axis_range(y_min, y_max, allow_negative=False):
+    """
+    Y軸の表示範囲を計算する
+    
+    Returns:
+        (Y軸の最小値, Y軸の最大値, rangemode)
+    """
     y_range = y_max - y_min
     
     # マージンを追加
@@ -199,71 +694,383 @@ def create_custom_plot(df, x_col, y_col, title, y_label, color='blue', allow_neg
         rangemode = "tozero"
         
     y_axis_max = y_max + margin
+    return y_axis_min, y_axis_max, rangemode
+
+def custom_plot_figure(df, x_col, y_col, title, y_label, color='blue', allow_negative=False,
+                       max_points=None, downsample=None, events=None):
+    """
+    カスタムプロットの図を Plotly の JSON 形式の dict として作成する（検証なし）
+    
+    max_points / downsample を省略した場合は CHART_CONFIG の
+    'max_points' と 'downsample'[y_col] に従って表示点数を間引く。
+    x / y は間引き後の配列を plot_values() でリストにして格納する（go.Figure でも typed array にならない）。
+    events（chart_events() の DataFrame）を指定するとイベントの点を重ねて表示する。
+    """
+    # データが存在するか確認
+    if df.empty or x_col not in df.columns or y_col not in df.columns:
+        # 空のグラフを返す
+        return {'data': [], 'layout': {'title': {'text': f"{title} (データなし)"}}}
+    
+    # Y軸の範囲は間引く前の全データから求める
+    y_all = df[y_col].to_numpy()
+    y_min = y_all.min().item()
+    y_max = y_all.max().item()
+    
+    # 表示点数を間引く
+    if max_points is None:
+        max_points = CHART_CONFIG['max_points']
+    if downsample is None:
+        downsample = CHART_CONFIG['downsample'].get(y_col, 'lttb')
+    df = downsample_frame(df, x_col, y_col, max_points, downsample)
+    
+    # 明示的にx列とy列を抽出（間引き後の配列をリストにして渡す。同梱の plotly.js は typed array を解釈できない）
+    x_values = plot_values(df[x_col].to_numpy())
+    y_values = plot_values(df[y_col].to_numpy())
+    
+    # デバッグ出力
+    #print(f"\n{title}のデータ確認:")
+    #print(f"x列({x_col})の最初の5つの値: {x_values[:5]} ...")
+    #print(f"y列({y_col})の最初の5つの値: {y_values[:5]} ...")
+    #print(f"y列の最小値: {y_min}, 最大値: {y_max}")
+    
+    # Y軸の範囲を計算
+    y_axis_min, y_axis_max, rangemode = _y_axis_range(y_min, y_max, allow_negative)
+    
+    # 点数が多い場合は WebGL で描画する
+    trace_type = 'scattergl' if len(x_values) > CHART_CONFIG['webgl_threshold'] else 'scatter'
     
     # 明示的にxとyを指定して散布図を追加
-    fig.add_trace(go.Scatter(
-        x=x_values,
-        y=y_values,
-        mode='markers',
-        name='データ点',
-        marker=dict(
-            size=6,
-            color=color,
-            opacity=0.7
-        ),
-        hovertemplate='%{x}<br>値: %{y:.2f}<extra></extra>'
-    ))
-    
-    # データ点が30以上なら補助線も追加
-    if len(df) > 30:
-        fig.add_trace(go.Scatter(
-            x=x_values,
-            y=y_values,
-            mode='lines',
-            name='トレンド',
-            line=dict(
-                width=1,
-                color=f'rgba({",".join([str(int(x*255)) for x in mcolors.to_rgb(color)])},0.3)',
-                dash='dot'
-            ),
-            hoverinfo='skip'
-        ))
+    trace = {
+        'type': trace_type,
+        'x': x_values,
+        'y': y_values,
+        'name': 'データ点',
+        'marker': {'size': 6, 'color': color, 'opacity': 0.7},
+        'hovertemplate': '%{x|%Y-%m-%d %H:%M}<br>値: %{y:.2f}<extra></extra>',
+    }
+    
+    # データ点が30以上なら点を補助線でつなぐ（1つのトレースで点と線を描画）
+    if len(x_values) > 30:
+        trace['mode'] = 'lines+markers'
+        trace['line'] = {
+            'width': 1,
+            'color': _rgba(color, 0.3),
+            'dash': 'dot',
+        }
+    else:
+        trace['mode'] = 'markers'
     
     # レイアウト設定
-    fig.update_layout(
-        title=title,
-        margin=dict(l=10, r=10, t=40, b=10),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        hovermode='x unified',
-        xaxis=dict(
-            title="日付",
-            showgrid=True,
-            gridcolor='lightgray',
-            showline=True,
-            linecolor='black',
-            tickformat='%m/%d %H:%M'
-        ),
-        yaxis=dict(
-            title=y_label,
+    layout = {
+        'title': {'text': title},
+        'margin': {'l': 10, 'r': 10, 't': 40, 'b': 10},
+        'plot_bgcolor': 'white',
+        'paper_bgcolor': 'white',
+        'hovermode': 'x unified',
+        'xaxis': {
+            'title': {'text': "日付"},
+            'type': 'date',
+            'showgrid': True,
+            'gridcolor': 'lightgray',
+            'showline': True,
+            'linecolor': 'black',
+            'tickformat': '%m/%d %H:%M',
+        },
+        'yaxis': {
+            'title': {'text': y_label},
+            'range': [y_axis_min, y_axis_max],
+            'showgrid': True,
+            'gridcolor': 'lightgray',
+            'showline': True,
+            'linecolor': 'black',
+            'rangemode': rangemode,  # "normal" または "tozero"
+            # ゼロラインを強調表示（特にマイナス値がある場合）
+            'zeroline': True,
+            'zerolinecolor': 'darkgray',
+            'zerolinewidth': 1,
+        },
+        'showlegend': False,
+    }
+    
+    data = [trace]
+    
+    # イベント（chart_events で max_points までに間引き済み）は種類ごとに別トレースの点として重ねる
+    # ホバーの変更前後の値は文字列ではなく customdata の数値の組のリストで渡す
+    if events is not None and not events.empty:
+        event_types = events['event_type'].to_numpy()
+        for event_type in pd.unique(event_types):
+            mask = event_types == event_type
+            data.append({
+                'type': 'scatter',
+                'x': plot_values(events['date'].to_numpy()[mask]),
+                'y': plot_values(events['y'].to_numpy()[mask]),
+                'customdata': plot_values(np.column_stack((events['old_value'].to_numpy()[mask],
+                                                           events['new_value'].to_numpy()[mask]))),
+                'name': EVENT_TYPES[event_type],
+                'mode': 'markers',
+                'marker': {'size': 10, 'symbol': 'diamond-open', 'color': 'black'},
+                'hovertemplate': f'{EVENT_TYPES[event_type]}: %{{customdata[0]:,}} → %{{customdata[1]:,}}<extra></extra>',
+            })
+    
+    #print(f"{title} Y軸範囲: {y_axis_min}-{y_axis_max}")
+    return {'data': data, 'layout': layout}
+
+def create_custom_plot(df, x_col, y_col, title, y_label, color='blue', allow_negative=False,
+                       max_points=None, downsample=None, events=None):
+    """
+    カスタムプロット作成関数 - マイナス値にも対応
+    
+    引数は custom_plot_figure と同じ。Plotly の検証を通した go.Figure を返す。
+    """
+    import plotly.graph_objects as go
+    
+    return go.Figure(custom_plot_figure(df, x_col, y_col, title, y_label, color, allow_negative,
+                                        max_points, downsample, events))
+
+def create_custom_plot_data(df, x_col, y_col, title, y_label, color='blue', allow_negative=False,
+                            max_points=None, downsample=None, events=None):
+    """
+    カスタムプロットを Plotly の検証なしで gr.Plot 用の PlotData として作成する
+    
+    引数は custom_plot_figure と同じ。go.Figure を経由しないため、点数が多い場合も
+    図の作成はシリアライズのみで済む。
+    """
+    return figure_to_plot_data(custom_plot_figure(df, x_col, y_col, title, y_label, color, allow_negative,
+                                                  max_points, downsample, events))
+
+# 比較チャートの系列の色（チャンネルの選択順に割り当てる）
+COMPARE_COLORS = ['#1f77b4', '#d62728', '#2ca02c', '#9467bd', '#ff7f0e', '#17becf', '#8c564b', '#e377c2']
+
+def comparison_plot_figure(series, x_col, y_col, title, y_label, allow_negative=False, max_points=None):
+    """
+    複数チャンネルの同じ系列を1つの図に重ねた比較チャートを dict として作成する
+    
+    各チャンネルのトレースは custom_plot_figure で作成するため、間引きはチャンネルごとに行われる。
+    Y軸の範囲は全チャンネルの値から求める。
+    
+    Args:
+        series: [(チャンネル名, DataFrame)] のリスト
+        max_points: チャンネルごとの最大点数（省略時は CHART_CONFIG['max_points']）
+    """
+    traces = []
+    layout = None
+    y_min = y_max = None
+    for index, (name, df) in enumerate(series):
+        figure = custom_plot_figure(df, x_col, y_col, title, y_label,
+                                    COMPARE_COLORS[index % len(COMPARE_COLORS)], allow_negative, max_points)
+        if not figure['data']:
+            continue
+        trace = figure['data'][0]
+        trace['name'] = name
+        trace['hovertemplate'] = f'{name}: %{{y:.2f}}<extra></extra>'
+        traces.append(trace)
+        layout = figure['layout']
+        
+        values = df[y_col].to_numpy()
+        y_min = values.min().item() if y_min is None else min(y_min, values.min().item())
+        y_max = values.max().item() if y_max is None else max(y_max, values.max().item())
+    
+    if not traces:
+        return {'data': [], 'layout': {'title': {'text': f"{title} (データなし)"}}}
+    
+    y_axis_min, y_axis_max, rangemode = _y_axis_range(y_min, y_max, allow_negative)
+    layout['yaxis']['range'] = [y_axis_min, y_axis_max]
+    layout['yaxis']['rangemode'] = rangemode
+    layout['showlegend'] = True
+    layout['legend'] = {'orientation': 'h', 'yanchor': 'bottom', 'y': 1.02, 'x': 0}
+    layout['margin'] = {**layout['margin'], 't': 80}
+    return {'data': traces, 'layout': layout}
+
+def create_combined_plot(df, x_col, chart_specs=CHART_SPECS, max_points=None):
+    """
+    複数のチャートを x 軸共有の1つの図にまとめて作成する
+    
+    日付は epoch ミリ秒の float64 配列に一度だけ変換し、パネルごとに間引いた配列を
+    リストにして Scattergl トレースに渡す（同梱の plotly.js は typed array を解釈できない）。
+    
+    Args:
+        df: 時系列データ
+        x_col: x 軸のカラム名
+        chart_specs: (y列, タイトル, Y軸ラベル, 色, マイナス値を許容するか) のリスト
+        max_points: パネルごとの最大点数（省略時は CHART_CONFIG['max_points']）
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    
+    fig = make_subplots(
+        rows=len(chart_specs),
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.03,
+        subplot_titles=[spec[1] for spec in chart_specs]
+    )
+    
+    # データが存在するか確認
+    if df.empty or x_col not in df.columns:
+        fig.update_layout(title="時系列データ (データなし)")
+        return fig
+    
+    if max_points is None:
+        max_points = CHART_CONFIG['max_points']
+    
+    # 日付は一度だけ epoch ミリ秒に変換
+    x_all = _to_plot_x(df[x_col].to_numpy())
+    
+    for row, (y_col, title, y_label, color, allow_negative) in enumerate(chart_specs, start=1):
+        if y_col not in df.columns:
+            continue
+        
+        y_all = df[y_col].to_numpy(dtype=np.float64)
+        y_axis_min, y_axis_max, rangemode = _y_axis_range(y_all.min(), y_all.max(), allow_negative)
+        
+        # パネルごとに表示点数を間引く
+        indices = downsample_indices(x_all, y_all, max_points, CHART_CONFIG['downsample'].get(y_col, 'lttb'))
+        x_values = x_all if indices is None else x_all[indices]
+        y_values = y_all if indices is None else y_all[indices]
+        
+        fig.add_trace(go.Scattergl(
+            x=plot_values(x_values),
+            y=plot_values(y_values),
+            mode='lines+markers',
+            name=title,
+            marker=dict(size=4, color=color),
+            line=dict(width=1, color=color),
+            hovertemplate='%{x|%Y-%m-%d %H:%M}<br>値: %{y:.2f}<extra></extra>'
+        ), row=row, col=1)
+        
+        fig.update_yaxes(
+            title_text=y_label,
             range=[y_axis_min, y_axis_max],
+            rangemode=rangemode,
             showgrid=True,
             gridcolor='lightgray',
             showline=True,
             linecolor='black',
-            rangemode=rangemode,  # "normal" または "tozero"
-            # ゼロラインを強調表示（特にマイナス値がある場合）
             zeroline=True,
             zerolinecolor='darkgray',
-            zerolinewidth=1
-        ),
+            zerolinewidth=1,
+            row=row,
+            col=1
+        )
+    
+    fig.update_xaxes(
+        type='date',
+        showgrid=True,
+        gridcolor='lightgray',
+        showline=True,
+        linecolor='black',
+        tickformat='%m/%d %H:%M'
+    )
+    fig.update_layout(
+        height=260 * len(chart_specs),
+        margin=dict(l=10, r=10, t=40, b=10),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        hovermode='x unified',
         showlegend=False
     )
-    
-    #print(f"{title} Y軸範囲: {y_axis_min}-{y_axis_max}")
     return fig
 
-def create_time_series_tab(db_path='data/lightning_node.db'):
+def _series_behind(channel_id, latest_date):
+    """
+    キャッシュ済みの時系列データが latest_date の行まで含んでいないか
+    
+    キャッシュがなければ False（初回の取得で最新行まで読むため）。
+    """
+    entry = _series_cache.get(channel_id)
+    if entry is None or latest_date is None:
+        return False
+    return entry.last_date is None or entry.last_date < latest_date
+
+@timed('handler', 'update_charts')
+def build_charts(channel_name, period, combined=False, refresh=True, db_path=None):
+    """
+    チャンネルの時系列チャートを作成する
+    
+    CACHE_CONFIG['figure_cache'] が有効なら、チャンネル・期間・チャンネルの最新行の date が
+    同じ場合は作成済みのチャートを返す（SQL もチャート作成も行わない）。
+    イベントの抽出が最新行まで済んでいない間に作成したチャートは、抽出が追いつくと作り直す。
+    
+    Returns:
+        個別表示の7つの図と統合表示の図のタプル（使わない側は None）
+    """
+    empty_charts = (None,) * (len(CHART_SPECS) + 1)
+    if not channel_name:
+        return empty_charts
+    
+    channel_info = get_channel_info(channel_name, db_path)
+    channel_id = channel_info["id"]
+    
+    if not channel_id:
+        return empty_charts
+    
+    cache_key = None
+    if CACHE_CONFIG['figure_cache']:
+        latest_date = get_latest_channel_date(db_path, channel_id)
+        cache_key = (channel_id, period, get_period_start_date(period), latest_date, bool(combined),
+                     _events_current(latest_date, db_path))
+        figures = _figure_cache.get(cache_key)
+        if figures is not None:
+            return figures
+        # キーの最新行まで含めるため、キャッシュの時系列データが古い場合だけ新しい行を確認する
+        # （期間の切り替えはキャッシュ済みデータの切り出しで済み、DB を読まない）
+        refresh = CACHE_CONFIG['column_store'] or _series_behind(channel_id, latest_date)
+    
+    # 時系列データを取得
+    df = get_time_series_data(channel_id, period, db_path, refresh=refresh)
+    
+    if df.empty:
+        print(f"データが取得できませんでした: {channel_name, channel_id}")
+        return empty_charts
+    
+    if combined:
+        # 統合表示: 1つの図にまとめる
+        with span('plot', 'combined'):
+            # キャッシュできるように JSON にしてから返す（figure_cache は PlotData だけを保持する）
+            figures = (None,) * len(CHART_SPECS) + (plotly_figure_to_plot_data(create_combined_plot(df, "date")),)
+    else:
+        # チャートに重ねるイベント
+        events = get_channel_events(channel_id, get_period_start_date(period), db_path)
+        
+        # チャート作成（'dict' なら Plotly の検証を省いて JSON を直接作る）
+        create_plot = create_custom_plot_data if CHART_CONFIG['figure_builder'] == 'dict' else create_custom_plot
+        figures = []
+        for y_col, title, y_label, color, allow_negative in CHART_SPECS:
+            with span('plot', y_col):
+                figures.append(create_plot(df, "date", y_col, title, y_label, color, allow_negative=allow_negative,
+                                           events=chart_events(events, y_col, channel_info["capacity"])))
+        figures = (*figures, None)
+    
+    if cache_key is not None:
+        _figure_cache.put(cache_key, figures)
+    return figures
+
+@timed('handler', 'update_comparison')
+def build_comparison_chart(channel_names, y_col, period, db_path=None):
+    """
+    選択した複数チャンネルの系列を重ねた比較チャートを作成する
+    
+    Args:
+        channel_names: チャンネル名のリスト（CHART_CONFIG['compare_max_channels'] 件まで使う）
+        y_col: 比較する系列（CHART_SPECS の y列）
+        period: 期間 ("1week" または "1month" または "all")
+    """
+    if not channel_names or not y_col:
+        return None
+    
+    channel_names = list(channel_names)[:CHART_CONFIG['compare_max_channels']]
+    series = get_multi_channel_data(channel_names, period, db_path)
+    
+    spec = next(spec for spec in CHART_SPECS if spec[0] == y_col)
+    _, title, y_label, _, allow_negative = spec
+    with span('plot', 'comparison'):
+        figure = comparison_plot_figure(series, "date", y_col, f"{title}（比較）", y_label, allow_negative)
+        if CHART_CONFIG['figure_builder'] == 'dict':
+            return figure_to_plot_data(figure)
+        import plotly.graph_objects as go
+        return go.Figure(figure)
+
+def create_time_series_tab(db_path=None):
     """
     時系列データタブを作成する
     
@@ -304,8 +1111,14 @@ def create_time_series_tab(db_path='data/lightning_node.db'):
                 # 更新ボタン
                 update_btn = gr.Button("チャート更新", variant="primary", size="lg")
         
+                # 表示モード
+                combined_checkbox = gr.Checkbox(
+                    label="1つの図にまとめて表示",
+                    value=CHART_CONFIG['render_mode'] == 'combined'
+                )
+        
         # チャートエリア
-        with gr.Column():
+        with gr.Column(visible=CHART_CONFIG['render_mode'] != 'combined') as separate_charts:
             balance_ratio_chart = gr.Plot(label="ローカル残高比率")
             local_fee_chart = gr.Plot(label="ローカル手数料率推移")
             local_infee_chart = gr.Plot(label="ローカル入金手数料推移")
@@ -314,6 +1127,36 @@ def create_time_series_tab(db_path='data/lightning_node.db'):
             amboss_chart = gr.Plot(label="Amboss手数料推移")
             active_chart = gr.Plot(label="チャンネル状態推移")  # アクティブステータス追加
         
+        # 統合表示用チャートエリア
+        with gr.Column(visible=CHART_CONFIG['render_mode'] == 'combined') as combined_charts:
+            combined_chart = gr.Plot(label="時系列チャート")
+        
+        # 複数チャンネルの比較チャート
+        with gr.Accordion("チャンネル比較", open=False):
+            with gr.Row():
+                compare_dropdown = gr.Dropdown(
+                    choices=channel_names,
+                    multiselect=True,
+                    max_choices=CHART_CONFIG['compare_max_channels'],
+                    label="比較するチャンネル"
+                )
+                compare_series = gr.Dropdown(
+                    choices=[(spec[1], spec[0]) for spec in CHART_SPECS],
+                    value=CHART_SPECS[0][0],
+                    label="比較する系列"
+                )
+            compare_btn = gr.Button("比較チャートを表示")
+            compare_chart = gr.Plot(label="比較チャート")
+        
+        # 画面ごとに表示済みのデータバージョン
+        seen_version = gr.State(None)
+        
+        # バックグラウンド更新の結果を定期的に反映するタイマー
+        refresh_timer = gr.Timer(SCHEDULER_CONFIG['interval'], active=SCHEDULER_CONFIG['enabled'])
+        
+        chart_outputs = [balance_ratio_chart, local_fee_chart, local_infee_chart, remote_fee_chart,
+                         remote_infee_chart, amboss_chart, active_chart, combined_chart]
+        
         # データテーブル表示エリア
         #with gr.Accordion("ローカル残高比率の時系列データ", open=False):
             #data_table = gr.DataFrame(
@@ -322,109 +1165,88 @@ def create_time_series_tab(db_path='data/lightning_node.db'):
                 #interactive=False
             #)
         
-        # チャートを更新する関数
-        def update_charts(channel_name, period):
-            if not channel_name:
-                return None, None, None, None, None, None, None
-            
-            channel_info = get_channel_info(channel_name, db_path)
-            channel_id = channel_info["id"]
-            capacity = channel_info["capacity"]
-            
-            if not channel_id:
-                return None, None, None, None, None, None, None
-            
-            # 時系列データを取得
-            df = get_time_series_data(channel_id, period)
-            
-            if df.empty:
-                print(f"データが取得できませんでした: {channel_name, channel_id}")
-                return None, None, None, None, None, None, None
-            
-            # データの検証 - より詳細なデバッグ出力
-            #print(f"生のデータ最初の5行:\n{df.head().to_string()}")
-            
-            # 重要なカラムのデータ型を確認
-            #print("\nデータ型確認:")
-            #for col in df.columns:
-                #print(f"{col}: {df[col].dtype}")
-            
-            # データのクリーニングを徹底する
-            # 数値カラムを明示的に浮動小数点型に変換
-            numeric_cols = ['local_balance', 'local_fee', 'local_infee', 
-                           'remote_balance', 'remote_fee', 'remote_infee',
-                           'num_updates', 'amboss_fee', 'active']
-            
-            for col in numeric_cols:
-                if col in df.columns:
-                    # 文字列や異常値を適切に処理
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                    
-                    # NaN値を0に置換
-                    df[col] = df[col].fillna(0)
-                    
-                    # 型変換後の最小値、最大値を確認
-                    #print(f"{col} の変換後統計: 最小={df[col].min()}, 最大={df[col].max()}, 平均={df[col].mean()}")
-            
-            # ローカル残高比率を改めて計算
-            df['local_balance_ratio'] = np.where(df['capacity'] > 0, 
-                                               (df['local_balance'] / df['capacity']) * 100,
-                                               0)
-            
-            # 日付フォーマットをしっかり確認
-            #print(f"日付カラム型: {df['date'].dtype}")
-            #print(f"日付範囲: {df['date'].min()} - {df['date'].max()}")
-            
-            # テーブルデータの準備
-            #table_df = df.sort_values('date', ascending=False).copy()
-            #table_df['formatted_date'] = table_df['date'].dt.strftime('%Y-%m-%d %H:%M')
-            #table_data = table_df[['formatted_date', 'local_balance', 'capacity', 'local_balance_ratio']].values.tolist()
-            
-            #dfの値
-            #print("##### dfの値 #####")
-            #print(f"df: {df}")
-
-            # チャート作成
-            balance_ratio_fig = create_custom_plot(df, "date", "local_balance_ratio", "ローカル残高比率推移", "ローカル残高比率 (%)", 'blue')
-            local_fee_fig = create_custom_plot(df, "date", "local_fee", "ローカル手数料率推移", "手数料率 (ppm)", 'red')
-            local_infee_fig = create_custom_plot(df, "date", "local_infee", "ローカル入金手数料推移", "入金手数料 (sat)", 'green', allow_negative=True)
-            remote_fee_fig = create_custom_plot(df, "date", "remote_fee", "リモート手数料率推移", "手数料率 (ppm)", 'purple')
-            remote_infee_fig = create_custom_plot(df, "date", "remote_infee", "リモート入金手数料推移", "入金手数料 (sat)", 'orange', allow_negative=True)
-            amboss_fig = create_custom_plot(df, "date", "amboss_fee", "Amboss手数料推移", "手数料 (sat)", 'teal')
-            active_fig = create_custom_plot(df, "date", "active", "チャンネル状態推移", "状態 (0=無効, 1=有効)", 'darkblue')
-            
-            return balance_ratio_fig, local_fee_fig, local_infee_fig, remote_fee_fig, remote_infee_fig, amboss_fig, active_fig
+        # チャートを更新する関数（DB アクセスと図の作成はスレッドプールで実行する）
+        async def update_charts(channel_name, period, combined=False, refresh=True):
+            return await run_db(build_charts, channel_name, period, combined, refresh, db_path)
         
         # ボタンクリック時のイベント
         update_btn.click(
             fn=update_charts,
-            inputs=[channel_dropdown, period_radio],
-            outputs=[balance_ratio_chart, local_fee_chart, local_infee_chart, remote_fee_chart, remote_infee_chart, amboss_chart, active_chart]
+            inputs=[channel_dropdown, period_radio, combined_checkbox],
+            outputs=chart_outputs
         )
 
         # ドロップダウンまたは期間変更時に自動更新
+        # （バックグラウンド更新が動作中ならキャッシュは更新済みのため DB を確認しない）
+        async def update_charts_on_select(channel_name, period, combined):
+            return await update_charts(channel_name, period, combined, refresh=get_scheduler() is None)
+        
         channel_dropdown.change(
-            fn=update_charts,
-            inputs=[channel_dropdown, period_radio],
-            outputs=[balance_ratio_chart, local_fee_chart, local_infee_chart, remote_fee_chart, remote_infee_chart, amboss_chart, active_chart]
+            fn=update_charts_on_select,
+            inputs=[channel_dropdown, period_radio, combined_checkbox],
+            outputs=chart_outputs
         )
 
+        # 期間変更はキャッシュ済みデータの切り出しのみ（DB から再取得しない）
+        async def update_charts_from_cache(channel_name, period, combined):
+            return await update_charts(channel_name, period, combined, refresh=False)
+        
         period_radio.change(
-            fn=update_charts,
-            inputs=[channel_dropdown, period_radio],
-            outputs=[balance_ratio_chart, local_fee_chart, local_infee_chart, remote_fee_chart, remote_infee_chart, amboss_chart, active_chart]
+            fn=update_charts_from_cache,
+            inputs=[channel_dropdown, period_radio, combined_checkbox],
+            outputs=chart_outputs
+        )
+        
+        # 表示モード切り替え時はチャートエリアを切り替えて再描画
+        combined_checkbox.change(
+            fn=lambda combined: (gr.update(visible=not combined), gr.update(visible=combined)),
+            inputs=[combined_checkbox],
+            outputs=[separate_charts, combined_charts]
+        )
+        combined_checkbox.change(
+            fn=update_charts_from_cache,
+            inputs=[channel_dropdown, period_radio, combined_checkbox],
+            outputs=chart_outputs
         )
         
+        # 新しいデータを検出した場合のみチャートを更新
+        async def refresh_on_timer(channel_name, period, combined, version):
+            current_version = get_data_version()
+            if current_version is None or current_version == version:
+                return (gr.update(),) * len(chart_outputs) + (version,)
+            return (*await update_charts(channel_name, period, combined, refresh=False), current_version)
+        
+        refresh_timer.tick(
+            fn=refresh_on_timer,
+            inputs=[channel_dropdown, period_radio, combined_checkbox, seen_version],
+            outputs=chart_outputs + [seen_version]
+        )
+        
+        # 比較チャート（選択・系列・期間の変更時も再描画する）
+        async def update_comparison(channel_names, y_col, period):
+            return await run_db(build_comparison_chart, channel_names, y_col, period, db_path)
+        
+        compare_inputs = [compare_dropdown, compare_series, period_radio]
+        compare_btn.click(fn=update_comparison, inputs=compare_inputs, outputs=compare_chart)
+        compare_dropdown.change(fn=update_comparison, inputs=compare_inputs, outputs=compare_chart)
+        compare_series.change(fn=update_comparison, inputs=compare_inputs, outputs=compare_chart)
+        period_radio.change(fn=update_comparison, inputs=compare_inputs, outputs=compare_chart)
+        
         # チャンネル選択時に容量を更新
+        async def update_capacity_async(channel_name):
+            return await run_db(update_capacity, channel_name, db_path)
+        
         channel_dropdown.change(
-            fn=update_capacity,
+            fn=update_capacity_async,
             inputs=[channel_dropdown],
             outputs=[capacity_text]
         )
         
-        # 初期値を設定
-        if channel_names:
-            initial_capacity = update_capacity(channel_names[0])
-            capacity_text.value = initial_capacity
+        # 初期値は画面を開いたときに設定する
+        time_series_tab.load(
+            fn=update_capacity_async,
+            inputs=[channel_dropdown],
+            outputs=[capacity_text]
+        )
         
     return time_series_tab
\ No newline at end of file
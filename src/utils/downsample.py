@@ -0,0 +1,136 @@
+import numpy as np
+
+# 間引き方式
+#   'lttb'   : Largest-Triangle-Three-Buckets（連続値向け。形状とスパイクを保つ）
+#   'minmax' : 変化点とバケットごとの最小・最大（手数料などのステップ系列向け）
+#   'none'   : 間引きしない
+DOWNSAMPLE_METHODS = ('lttb', 'minmax', 'none')
+
+def _as_float_array(values):
+    """datetime を含む配列を float64 に変換する"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ns]').astype(np.int64)
+    return values.astype(np.float64)
+
+def lttb_indices(x, y, n_out):
+    """
+    LTTB で残す点のインデックスを返す
+    
+    先頭と末尾の点は必ず残し、残りを n_out - 2 個のバケットに分けて
+    「前に選んだ点」「次のバケットの平均点」と作る三角形の面積が最大の点を選ぶ。
+    
+    Args:
+        x: x 値（昇順）
+        y: y 値
+        n_out: 出力点数
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    x = _as_float_array(x)
+    y = _as_float_array(y)
+    
+    # 先頭と末尾を除いた点を n_out - 2 個のバケットに分割
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    
+    # 各バケットの平均点を累積和からまとめて計算
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = edges[1:] - edges[:-1]
+    avg_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / counts
+    avg_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts
+    
+    # バケット i の「次のバケット」の平均点（最後のバケットは末尾の点）
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+    
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    
+    return selected
+
+def minmax_indices(y, n_out):
+    """
+    ステップ系列で残す点のインデックスを返す
+    
+    値が変わる点とその直前の点を残せばステップ形状は完全に再現できるため、
+    変化点が n_out 以内ならそれをそのまま返す。多すぎる場合は
+    バケットごとの先頭・最小・最大・末尾の点を残す。
+    
+    Args:
+        y: y 値
+        n_out: 出力点数の目安
+    """
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    
+    y = np.asarray(y)
+    
+    # 値の変化点（変化後の点と変化前の点）
+    change = np.flatnonzero(y[1:] != y[:-1]) + 1
+    edge_indices = np.unique(np.concatenate(([0, n - 1], change - 1, change)))
+    if len(edge_indices) <= n_out:
+        return edge_indices
+    
+    # 1バケットあたり最大4点（先頭・最小・最大・末尾）
+    n_buckets = max(1, n_out // 4)
+    bucket = (np.arange(n) * n_buckets) // n
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    ends = np.append(starts[1:], n)
+    
+    # バケット内を y でソートすると、先頭が最小・末尾が最大になる
+    order = np.lexsort((y, bucket))
+    min_indices = order[starts]
+    max_indices = order[ends - 1]
+    
+    return np.unique(np.concatenate((starts, ends - 1, min_indices, max_indices)))
+
+def downsample_indices(x, y, max_points, method='lttb'):
+    """
+    表示用に残す点のインデックスを返す（間引かない場合は None）
+    
+    Args:
+        x: x 値（昇順）
+        y: y 値
+        max_points: 最大点数（None または 0 以下なら間引かない）
+        method: 'lttb' / 'minmax' / 'none'
+    """
+    if not max_points or max_points <= 0 or len(y) <= max_points or method == 'none':
+        return None
+    
+    if method == 'minmax':
+        return minmax_indices(y, max_points)
+    elif method == 'lttb':
+        return lttb_indices(x, y, max_points)
+    raise ValueError(f"Unknown downsample method: {method}")
+
+def downsample_frame(df, x_col, y_col, max_points, method='lttb'):
+    """
+    表示用に DataFrame の行を間引く
+    
+    Args:
+        df: 元データ（x_col 昇順）
+        x_col: x 軸のカラム名
+        y_col: y 軸のカラム名
+        max_points: 最大点数（None または 0 以下なら間引かない）
+        method: 'lttb' / 'minmax' / 'none'
+    """
+    if not max_points or max_points <= 0 or len(df) <= max_points or method == 'none':
+        return df
+    
+    indices = downsample_indices(df[x_col].to_numpy(), df[y_col].to_numpy(), max_points, method)
+    return df.iloc[indices]
@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+from utils.metrics import increment, set_gauge
+
+def figure_size(figures):
+    """
+    作成済みチャートの組の JSON のサイズ（バイト数）を返す
+    
+    gr.Plot 用の PlotData（JSON 文字列）と None 以外が含まれる場合は None（キャッシュしない）。
+    """
+    size = 0
+    for figure in figures:
+        if figure is None:
+            continue
+        plot = getattr(figure, 'plot', None)
+        if not isinstance(plot, str):
+            return None
+        size += len(plot)
+    return size
+
+class FigureCache:
+    """
+    作成済みチャートの LRU キャッシュ
+    
+    キーごとに1回の表示分のチャート（PlotData のタプル）を保持し、件数または JSON の合計サイズが
+    上限を超えたら最も古く使われたものから破棄する。ヒット・ミス・破棄の回数は
+    メトリクス（lnv_figure_cache_*）にも記録する。
+    """
+    
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """キャッシュを取得する（なければ None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        increment('figure_cache_misses' if entry is None else 'figure_cache_hits')
+        return None if entry is None else entry[0]
+    
+    def put(self, key, figures):
+        """
+        チャートの組を登録する
+        
+        Returns:
+            登録した場合は True（PlotData 以外を含む、または1組で上限を超える場合は登録しない）
+        """
+        size = figure_size(figures)
+        if size is None or size > self.max_bytes:
+            return False
+        
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self._entries[key] = (figures, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                evicted += 1
+            self.evictions += evicted
+            entries, total_bytes = len(self._entries), self.total_bytes
+        
+        if evicted:
+            increment('figure_cache_evictions', evicted)
+        set_gauge('figure_cache_entries', entries)
+        set_gauge('figure_cache_bytes', total_bytes)
+        return True
+    
+    def stats(self):
+        """ヒット数・ミス数・破棄数・件数・合計サイズを返す"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+            }
+    
+    def clear(self):
+        """キャッシュを破棄する"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+        set_gauge('figure_cache_entries', 0)
+        set_gauge('figure_cache_bytes', 0)
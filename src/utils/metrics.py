@@ -0,0 +1,151 @@
+"""
+処理時間の計測（タイミングスパン）と Prometheus 形式のメトリクス
+
+span() で囲んだ区間の処理時間を段階 (stage) と名前 (name) ごとのヒストグラムに記録し、
+ロガー 'lightning_node_viewer.timing' にも出力する。
+increment() / set_gauge() はキャッシュのヒット数などのカウンタ・ゲージを記録する。
+render_metrics() は Prometheus のテキスト形式で全メトリクスを返す。
+
+    with span("sql", "time_series"):
+        df = pd.read_sql_query(...)
+"""
+import time
+import bisect
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from config import METRICS_CONFIG
+
+logger = logging.getLogger('lightning_node_viewer.timing')
+
+METRIC_NAME = 'lnv_stage_duration_seconds'
+
+# ハンドラ全体の処理時間は INFO、内部の段階は DEBUG で出力する
+_LOG_LEVELS = {'handler': logging.INFO}
+
+class Histogram:
+    """累積バケット付きのヒストグラム（スレッドセーフ）"""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def snapshot(self):
+        """(累積バケット数のリスト, 件数, 合計) を返す"""
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.total
+        cumulative = []
+        running = 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, count, total
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+def get_histogram(stage, name):
+    """段階と名前に対応するヒストグラムを取得する（なければ作成）"""
+    key = (stage, name)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(key, Histogram(METRICS_CONFIG['buckets']))
+    return histogram
+
+def observe(stage, name, seconds):
+    """処理時間を記録してログに出力する"""
+    get_histogram(stage, name).observe(seconds)
+    logger.log(_LOG_LEVELS.get(stage, logging.DEBUG), "%s %s %.1fms", stage, name, seconds * 1000)
+
+@contextmanager
+def span(stage, name):
+    """
+    with ブロックの処理時間を記録する
+
+    Args:
+        stage: 処理の段階 ('sql', 'transform', 'plot', 'handler' など)
+        name: 対象の名前（クエリやチャートの種類）
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, name, time.perf_counter() - start)
+
+def timed(stage, name=None):
+    """関数全体の処理時間を記録するデコレータ（name を省略すると関数名）"""
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# カウンタとゲージ {メトリクス名: 値}
+_counters = {}
+_gauges = {}
+_values_lock = threading.Lock()
+
+def increment(metric, amount=1):
+    """カウンタ（lnv_<metric>_total）を増やす"""
+    with _values_lock:
+        _counters[metric] = _counters.get(metric, 0) + amount
+
+def set_gauge(metric, value):
+    """ゲージ（lnv_<metric>）の値を設定する"""
+    with _values_lock:
+        _gauges[metric] = value
+
+def _format_bound(bound):
+    return f"{bound:g}"
+
+def render_metrics():
+    """全ヒストグラムを Prometheus のテキスト形式で返す"""
+    lines = [
+        f"# HELP {METRIC_NAME} Time spent in each stage of the dashboard handlers.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    for (stage, name), histogram in items:
+        labels = f'stage="{stage}",name="{name}"'
+        cumulative, count, total = histogram.snapshot()
+        for bound, value in zip(histogram.buckets, cumulative):
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{_format_bound(bound)}"}} {value}')
+        lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f'{METRIC_NAME}_sum{{{labels}}} {total}')
+        lines.append(f'{METRIC_NAME}_count{{{labels}}} {count}')
+    
+    with _values_lock:
+        counters, gauges = sorted(_counters.items()), sorted(_gauges.items())
+    for metric, value in counters:
+        lines.append(f"# TYPE lnv_{metric}_total counter")
+        lines.append(f"lnv_{metric}_total {value}")
+    for metric, value in gauges:
+        lines.append(f"# TYPE lnv_{metric} gauge")
+        lines.append(f"lnv_{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+def reset_metrics():
+    """記録済みのヒストグラム・カウンタ・ゲージをすべて削除する"""
+    with _histograms_lock:
+        _histograms.clear()
+    with _values_lock:
+        _counters.clear()
+        _gauges.clear()
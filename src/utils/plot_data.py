@@ -0,0 +1,59 @@
+"""
+Plotly の図を検証なしの dict から直接 JSON にする
+
+go.Figure はトレースやレイアウトのプロパティを1つずつ検証するため、点数が多いと
+図の作成に時間がかかる。ここでは Plotly の JSON 形式の dict を直接組み立て、
+NumPy 配列は通常の JSON のリストとして埋め込み、gr.Plot に PlotData として渡す。
+"""
+import json
+import functools
+import numpy as np
+from gradio.components.plot import PlotData
+
+def plot_values(values):
+    """
+    NumPy 配列を plotly.js に渡す JSON のリストにする
+
+    gradio 4.44 に同梱の plotly.js 2.10 は typed array（{'dtype', 'bdata'}）を解釈できないため、
+    間引き後の配列は通常のリストで渡す（go.Figure に NumPy 配列を渡すと plotly 6 の to_json が
+    typed array にする）。datetime は epoch ミリ秒（date 軸は数値をミリ秒として扱う）、
+    bool は 0/1 にし、NaN は null にする。
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        values = values.astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+    elif values.dtype.kind == 'b':
+        values = values.astype(np.int8)
+    if values.dtype.kind == 'f' and np.isnan(values).any():
+        return np.where(np.isnan(values), None, values).tolist()
+    return values.tolist()
+
+@functools.lru_cache(maxsize=1)
+def _default_template():
+    """go.Figure と同じ既定テンプレート（一度だけ作成）"""
+    import plotly.io as pio
+
+    return pio.templates[pio.templates.default].to_plotly_json()
+
+def _encode(value):
+    """json.dumps で扱えない NumPy の値を変換する"""
+    if isinstance(value, np.ndarray):
+        return plot_values(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def figure_to_plot_data(figure):
+    """
+    {'data': [...], 'layout': {...}} 形式の dict を gr.Plot 用の PlotData にする
+
+    レイアウトに template がなければ go.Figure と同じ既定テンプレートを付ける。
+    """
+    layout = figure.get('layout', {})
+    if 'template' not in layout:
+        layout = {**layout, 'template': _default_template()}
+    return PlotData(type='plotly', plot=json.dumps({'data': figure.get('data', []), 'layout': layout}, default=_encode))
+
+def plotly_figure_to_plot_data(figure):
+    """go.Figure を gr.Plot 用の PlotData にする（gr.Plot と同じく to_json でシリアライズする）"""
+    return PlotData(type='plotly', plot=figure.to_json())
@@ -0,0 +1,99 @@
+import threading
+
+class RefreshScheduler:
+    """
+    DB を定期的にポーリングし、新しいデータがあれば登録されたジョブを実行するバックグラウンドスレッド
+    
+    ジョブで最新スナップショットやチャート用キャッシュを事前に作っておき、
+    Gradio のハンドラはその結果を読むだけにする。
+    """
+    
+    def __init__(self, poll, interval=60):
+        """
+        Args:
+            poll: データの変化を表す値を返す関数（前回と値が変われば新しいデータがあるとみなす）
+            interval: ポーリング間隔 (秒)
+        """
+        self.poll = poll
+        self.interval = interval
+        self.version = 0  # 新しいデータを検出してジョブを実行するたびに増える
+        self._jobs = []
+        self._last_token = None
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def add_job(self, name, fn):
+        """新しいデータを検出したときに実行するジョブを登録する"""
+        self._jobs.append((name, fn))
+    
+    def run_once(self):
+        """
+        データの変化を確認し、変化があればジョブを実行する
+        
+        Returns:
+            ジョブを実行した場合は True
+        """
+        with self._run_lock:
+            try:
+                token = self.poll()
+            except Exception as e:
+                print(f"更新確認エラー: {e}")
+                return False
+            
+            if token == self._last_token:
+                return False
+            
+            for name, fn in self._jobs:
+                try:
+                    fn()
+                except Exception as e:
+                    print(f"バックグラウンド更新エラー ({name}): {e}")
+            
+            self._last_token = token
+            self.version += 1
+            return True
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._stop_event.wait(self.interval)
+    
+    @property
+    def running(self):
+        """スレッドが動作中か"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """バックグラウンドスレッドを開始する"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """バックグラウンドスレッドを停止する"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+# アプリケーション全体で使うスケジューラ
+_scheduler = None
+
+def set_scheduler(scheduler):
+    """アプリケーション全体で使うスケジューラを設定する"""
+    global _scheduler
+    _scheduler = scheduler
+
+def get_scheduler():
+    """動作中のスケジューラを返す（動作していなければ None）"""
+    if _scheduler is not None and _scheduler.running:
+        return _scheduler
+    return None
+
+def get_data_version():
+    """スケジューラが検出したデータのバージョンを返す（スケジューラが動作していなければ None）"""
+    scheduler = get_scheduler()
+    return scheduler.version if scheduler is not None else None
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+class SeriesCacheEntry:
+    """1チャンネル分のキャッシュ内容"""
+    
+    def __init__(self, df, start_date, last_date, capacity, data_version=None):
+        self.df = df                      # クリーニング済みの DataFrame（date 昇順）
+        self.start_date = start_date      # 取得済み範囲の開始日 ("%Y-%m-%d")
+        self.last_date = last_date        # 取得済みの最新行の date（DB 上の文字列）
+        self.capacity = capacity          # local_balance_ratio の計算に使った容量
+        self.data_version = data_version  # 最後に新しい行を確認したときの DB のデータバージョン
+
+class SeriesCache:
+    """
+    チャンネルごとのクリーニング済み時系列データのキャッシュ
+    
+    channel_id をキーに保持し、上限を超えたら最も古く使われたチャンネルから破棄する。
+    取得処理はチャンネル単位のロックで直列化し、同じチャンネルを同時に読み込まないようにする。
+    ロックはエントリを破棄しても残す（保持中・待機中のロックを捨てると、次の呼び出しが
+    別のロックを作って同じチャンネルを同時に読み込むため。ロック自体は小さい）。
+    """
+    
+    def __init__(self, max_channels=32):
+        self.max_channels = max_channels
+        self._entries = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+    
+    def lock_for(self, channel_id):
+        """チャンネル単位のロックを取得する"""
+        with self._lock:
+            lock = self._locks.get(channel_id)
+            if lock is None:
+                lock = self._locks[channel_id] = threading.Lock()
+            return lock
+    
+    def get(self, channel_id):
+        """キャッシュを取得する（なければ None）"""
+        with self._lock:
+            entry = self._entries.get(channel_id)
+            if entry is not None:
+                self._entries.move_to_end(channel_id)
+            return entry
+    
+    def put(self, channel_id, entry):
+        """キャッシュを登録する"""
+        with self._lock:
+            self._entries[channel_id] = entry
+            self._entries.move_to_end(channel_id)
+            while len(self._entries) > self.max_channels:
+                self._entries.popitem(last=False)
+    
+    def channel_ids(self):
+        """キャッシュ済みのチャンネルID一覧を返す"""
+        with self._lock:
+            return list(self._entries)
+    
+    def clear(self, channel_id=None):
+        """キャッシュを破棄する（channel_id 未指定なら全て）"""
+        with self._lock:
+            if channel_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(channel_id, None)